@@ -0,0 +1,353 @@
+"""
+Benchmarks of the client hot paths and of fleet polling.
+
+These suites are run:
+
+- `latency`: round-trip time of each command against the pyvisa-mock mocker used by
+  the tests (with a configurable `call_delay`), or against the in-process simulator
+  if pyvisa-mock is not installed.
+- `parse`: decode throughput of the `TEMP?`, `HUMI?`, `MON?` and `%?` responses.
+- `fleet`: polling throughput of fleets of simulated chambers of growing size.
+- `replay`: exchange throughput of a session recorded with a `RecordingTransport`,
+  replayed as fast as possible and decoded (only run when `--replay` is given).
+
+The results are written as JSON, and can be compared with a previous run (the
+comparison is printed to the standard error):
+
+    python benchmarks/benchmark.py --output results.json
+    python benchmarks/benchmark.py --baseline results.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from espec_pr3j import (
+    ChamberFleet,
+    ChamberSimulator,
+    CommandPacer,
+    EspecPr3j,
+    HeatersStatus,
+    HumidityStatus,
+    OperationMode,
+    RecordKind,
+    ReplayTransport,
+    TemperatureStatus,
+    TestAreaState,
+    VirtualClock,
+    protocol,
+)
+from espec_pr3j.recording import read_session
+
+MOCK_RESOURCE_PATH = "MOCK0::benchmark::INSTR"
+
+LATENCY_COMMANDS: dict[str, Callable[[EspecPr3j], Any]] = {
+    "TEMP?": EspecPr3j.get_temperature_status,
+    "HUMI?": EspecPr3j.get_humidity_status,
+    "MON?": EspecPr3j.get_test_area_state,
+    "%?": EspecPr3j.get_heater_percentage,
+    "MODE?": EspecPr3j.get_mode,
+    "TEMP, S": lambda chamber: chamber.set_target_temperature(25.0),
+}
+"""The commands whose latency is measured, with the call sending them"""
+
+PARSE_SAMPLES: dict[str, tuple[protocol.Command, Any]] = {
+    "TEMP?": (
+        protocol.TEMPERATURE_STATUS,
+        TemperatureStatus(23.4, 25.0, 100.0, -40.0),
+    ),
+    "HUMI?": (protocol.HUMIDITY_STATUS, HumidityStatus(45.0, 50.0, 100.0, 0.0)),
+    "MON?": (
+        protocol.TEST_AREA_STATE,
+        TestAreaState(23.4, 45.0, OperationMode.CONSTANT, 0),
+    ),
+    "%?": (protocol.HEATERS_STATUS, HeatersStatus(12.5, 30.0)),
+}
+"""The monitor commands whose decoding is measured, with a sample response value"""
+
+
+def _summary(samples: list[float]) -> dict[str, float]:
+    """
+    Summarizes latency samples in seconds, in milliseconds.
+    """
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[max(round(0.95 * len(ordered)) - 1, 0)] * 1000,
+        "min_ms": ordered[0] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def _mocker_chamber(call_delay: float, pacer: Optional[CommandPacer]) -> EspecPr3j:
+    """
+    Creates a chamber connected to the pyvisa-mock mocker of the tests.
+    """
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+
+    from espec_pr3j_mocker import EspecPr3jMocker
+    from pyvisa import ResourceManager
+    from pyvisa_mock.base.register import register_resource
+
+    register_resource(MOCK_RESOURCE_PATH, EspecPr3jMocker(call_delay=call_delay))
+    return EspecPr3j(
+        resource_path=MOCK_RESOURCE_PATH,
+        resource_manager=ResourceManager(visa_library="@mock"),
+        pacer=pacer,
+    )
+
+
+def benchmark_latency(
+    iterations: int, call_delay: float, adaptive: bool
+) -> dict[str, Any]:
+    """
+    Measures the round-trip time of each command, from the call to the decoded value.
+    """
+    pacer = CommandPacer() if adaptive else None
+    try:
+        chamber = _mocker_chamber(call_delay, pacer)
+        target = "pyvisa-mock"
+    except ImportError:
+        chamber = EspecPr3j(transport=ChamberSimulator().transport(), pacer=pacer)
+        target = "simulator"
+
+    commands = {}
+    for name, call in LATENCY_COMMANDS.items():
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            call(chamber)
+            samples.append(time.perf_counter() - start)
+        commands[name] = _summary(samples)
+
+    chamber.close()
+    return {
+        "target": target,
+        "call_delay": call_delay,
+        "adaptive_pacing": adaptive,
+        "commands": commands,
+    }
+
+
+def benchmark_parse(count: int) -> dict[str, Any]:
+    """
+    Measures the decode throughput of monitor responses, one at a time and in batch.
+    """
+    results = {}
+    for name, (command, value) in PARSE_SAMPLES.items():
+        responses = [command.format_response(value)] * count
+
+        start = time.perf_counter()
+        for response in responses:
+            command.decode(response)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        command.decode_many(responses)
+        batch = time.perf_counter() - start
+
+        results[name] = {
+            "responses_per_s": count / single,
+            "batch_responses_per_s": count / batch,
+        }
+
+    return {"count": count, "commands": results}
+
+
+def benchmark_fleet(sizes: list[int], polls: int) -> dict[str, Any]:
+    """
+    Measures the polling throughput of fleets of simulated chambers. Every chamber
+    runs on its own virtual clock, so the command delays cost no time and the client
+    and thread pool overhead is measured.
+    """
+    results = {}
+    for size in sizes:
+        chambers = {}
+        for index in range(size):
+            clock = VirtualClock()
+            simulator = ChamberSimulator(clock=clock)
+            chambers[f"chamber{index}"] = EspecPr3j(
+                transport=simulator.transport(f"chamber{index}"), clock=clock
+            )
+
+        with ChamberFleet(chambers) as fleet:
+            samples = []
+            for _ in range(polls):
+                start = time.perf_counter()
+                snapshot = fleet.poll()
+                samples.append(time.perf_counter() - start)
+                assert not snapshot.errors
+
+        results[str(size)] = {
+            **_summary(samples),
+            "chambers_per_s": size / statistics.median(samples),
+        }
+        for chamber in chambers.values():
+            chamber.close()
+
+    return {"polls": polls, "sizes": results}
+
+
+def benchmark_replay(path: Path, repeats: int) -> dict[str, Any]:
+    """
+    Measures the exchange throughput of a recorded session replayed as fast as
+    possible, decoding the responses as the client would.
+    """
+    _, records = read_session(path)
+    commands = [record.message for record in records if record.kind == RecordKind.WRITE]
+
+    samples = []
+    for _ in range(repeats):
+        transport = ReplayTransport(path)
+        start = time.perf_counter()
+        for command in commands:
+            try:
+                response = transport.query(command)
+                protocol.parse_request(command)[0].decode(response)
+            except Exception:
+                # recorded errors are part of the session
+                pass
+        samples.append(time.perf_counter() - start)
+        transport.close()
+
+    return {
+        "exchanges": len(commands),
+        **_summary(samples),
+        "exchanges_per_s": len(commands) / statistics.median(samples),
+    }
+
+
+def _environment() -> dict[str, Any]:
+    try:
+        version = metadata.version("espec-pr3j")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+
+    return {
+        "version": version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+    }
+
+
+def _flatten(results: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any]):
+    """
+    Prints the relative change of every metric with respect to a baseline to the
+    standard error, so the standard output stays a JSON document.
+    """
+    current = _flatten({k: v for k, v in results.items() if k != "environment"})
+    previous = _flatten({k: v for k, v in baseline.items() if k != "environment"})
+
+    for name, value in current.items():
+        reference = previous.get(name)
+        if not reference or name.endswith("count"):
+            continue
+        print(
+            f"{name}: {reference:.4g} -> {value:.4g} ({value / reference - 1:+.1%})",
+            file=sys.stderr,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--suites",
+        default="latency,parse,fleet",
+        help="Comma separated suites to run (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=20,
+        help="Calls per command in the latency suite (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--call-delay",
+        type=float,
+        default=0.0,
+        help="Response delay of the mocker in seconds (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Use a CommandPacer in the latency suite",
+    )
+    parser.add_argument(
+        "--parse-count",
+        type=int,
+        default=100_000,
+        help="Responses decoded per command in the parse suite (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--fleet-sizes",
+        default="1,10,100,1000",
+        help="Comma separated fleet sizes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--fleet-polls",
+        type=int,
+        default=5,
+        help="Polls per fleet size (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--replay", type=Path, help="Session recorded with a RecordingTransport"
+    )
+    parser.add_argument(
+        "--replay-repeats",
+        type=int,
+        default=5,
+        help="Replays of the recorded session (default: %(default)s)",
+    )
+    parser.add_argument("--output", type=Path, help="Where to write the JSON results")
+    parser.add_argument(
+        "--baseline", type=Path, help="JSON results of a previous run to compare with"
+    )
+    args = parser.parse_args()
+
+    suites = args.suites.split(",")
+    results: dict[str, Any] = {"environment": _environment()}
+
+    if "latency" in suites:
+        results["latency"] = benchmark_latency(
+            args.iterations, args.call_delay, args.adaptive
+        )
+    if "parse" in suites:
+        results["parse"] = benchmark_parse(args.parse_count)
+    if "fleet" in suites:
+        sizes = [int(size) for size in args.fleet_sizes.split(",")]
+        results["fleet"] = benchmark_fleet(sizes, args.fleet_polls)
+    if args.replay is not None:
+        results["replay"] = benchmark_replay(args.replay, args.replay_repeats)
+
+    output = json.dumps(results, indent=2)
+    if args.output is not None:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline is not None:
+        compare(results, json.loads(args.baseline.read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,177 @@
+import importlib
+from typing import TYPE_CHECKING, Any
+
 from .data_classes import (
+    ChamberSettings,
+    ChamberSnapshot,
+    CommandEvent,
+    CommandStatistics,
+    ConditionProgress,
+    FleetSnapshot,
     HeatersStatus,
     HumidityStatus,
     OperationMode,
+    ProfileStep,
+    ProgramState,
+    ProgramStep,
+    RecordKind,
+    RollupBucket,
+    SessionRecord,
+    SetpointChange,
+    StateChange,
+    TelemetryRecord,
     TemperatureStatus,
     TestAreaState,
 )
 from .espec_pr3j import EspecPr3j
 from .exceptions import SettingError
 
+if TYPE_CHECKING:
+    from .async_espec_pr3j import AsyncEspecPr3j
+    from .cache import ResponseCache
+    from .clock import Clock, SystemClock, VirtualClock
+    from .conditions import ConditionFuture, ConditionWaiter
+    from .dispatcher import CommandDispatcher
+    from .fleet import ChamberFleet
+    from .hooks import CommandHook
+    from .metrics import CommandMetrics, MetricsServer
+    from .multiplexer import ChamberMultiplexer
+    from .pacing import CommandPacer
+    from .profiles import Profile, ProfileExecutor
+    from .programs import Program
+    from .recording import RecordingTransport, ReplayTransport
+    from .rollups import LttbDownsampler, TelemetryRollups
+    from .scheduler import PollScheduler
+    from .simulator import ChamberSimulator
+    from .spans import Span
+    from .stability import (
+        BandStabilityDetector,
+        StabilityDetector,
+        WindowStabilityDetector,
+    )
+    from .telemetry import TelemetryBuffer, TelemetrySampler
+    from .telemetry_log import TelemetryLogReader, TelemetryLogWriter
+    from .transports import (
+        InProcessTransport,
+        SocketTransport,
+        Transport,
+        VisaTransport,
+    )
+    from .watcher import ChamberWatcher
+
+_LAZY_EXPORTS = {
+    "AsyncEspecPr3j": "async_espec_pr3j",
+    "ResponseCache": "cache",
+    "Clock": "clock",
+    "SystemClock": "clock",
+    "VirtualClock": "clock",
+    "ConditionFuture": "conditions",
+    "ConditionWaiter": "conditions",
+    "CommandDispatcher": "dispatcher",
+    "ChamberFleet": "fleet",
+    "CommandHook": "hooks",
+    "CommandMetrics": "metrics",
+    "MetricsServer": "metrics",
+    "ChamberMultiplexer": "multiplexer",
+    "CommandPacer": "pacing",
+    "Profile": "profiles",
+    "ProfileExecutor": "profiles",
+    "Program": "programs",
+    "RecordingTransport": "recording",
+    "ReplayTransport": "recording",
+    "LttbDownsampler": "rollups",
+    "TelemetryRollups": "rollups",
+    "PollScheduler": "scheduler",
+    "ChamberSimulator": "simulator",
+    "Span": "spans",
+    "BandStabilityDetector": "stability",
+    "StabilityDetector": "stability",
+    "WindowStabilityDetector": "stability",
+    "TelemetryBuffer": "telemetry",
+    "TelemetrySampler": "telemetry",
+    "TelemetryLogReader": "telemetry_log",
+    "TelemetryLogWriter": "telemetry_log",
+    "InProcessTransport": "transports",
+    "SocketTransport": "transports",
+    "Transport": "transports",
+    "VisaTransport": "transports",
+    "ChamberWatcher": "watcher",
+}
+"""The exports imported on first access, by name, with their module. Keeps `import
+espec_pr3j` fast, as e.g. asyncio or concurrent.futures are only loaded when used"""
+
+
 __all__ = [
+    "AsyncEspecPr3j",
     "EspecPr3j",
+    "ChamberFleet",
+    "ChamberSnapshot",
+    "CommandPacer",
+    "FleetSnapshot",
     "HumidityStatus",
     "TemperatureStatus",
     "SettingError",
     "HeatersStatus",
     "OperationMode",
     "TestAreaState",
+    "TelemetryBuffer",
+    "TelemetrySampler",
+    "ResponseCache",
+    "Transport",
+    "VisaTransport",
+    "SocketTransport",
+    "InProcessTransport",
+    "Clock",
+    "SystemClock",
+    "VirtualClock",
+    "ChamberSimulator",
+    "ConditionFuture",
+    "ConditionProgress",
+    "ConditionWaiter",
+    "PollScheduler",
+    "StabilityDetector",
+    "BandStabilityDetector",
+    "WindowStabilityDetector",
+    "Profile",
+    "ProfileExecutor",
+    "ProfileStep",
+    "SetpointChange",
+    "Program",
+    "ProgramState",
+    "ProgramStep",
+    "CommandMetrics",
+    "CommandStatistics",
+    "MetricsServer",
+    "CommandEvent",
+    "CommandHook",
+    "Span",
+    "CommandDispatcher",
+    "ChamberMultiplexer",
+    "ChamberSettings",
+    "RecordingTransport",
+    "ReplayTransport",
+    "RecordKind",
+    "SessionRecord",
+    "TelemetryLogReader",
+    "TelemetryLogWriter",
+    "TelemetryRecord",
+    "TelemetryRollups",
+    "LttbDownsampler",
+    "RollupBucket",
+    "ChamberWatcher",
+    "StateChange",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
@@ -0,0 +1,389 @@
+import asyncio
+import logging
+import time
+from typing import Any, Optional, TypeVar
+
+from . import protocol
+from .data_classes import (
+    HeatersStatus,
+    HumidityStatus,
+    OperationMode,
+    TemperatureStatus,
+    TestAreaState,
+)
+from .espec_pr3j import (
+    EspecPr3j,
+    _setpoints_reached,
+    _verify_mode_response,
+    _verify_setpoints,
+)
+from .transports import ENCODING
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+class AsyncEspecPr3j:
+    """
+    Implements the basic operation of the environmental chamber on top of asyncio.
+
+    Mirrors the API of `EspecPr3j`, but every command is a coroutine that talks to
+    the chamber over a raw TCP stream, so a single event loop can drive many
+    chambers at once. Commands sent through the same instance are serialized, as the
+    chamber answers them in order.
+
+    Args:
+        `hostname (str)`: Host name of the environmental chamber. It can be an IP
+            address.
+        `temperature_accuracy (Optional[float])`: The accuracy considered when setting
+            the temperature. Default is 0.5.
+        `humidity_accuracy (Optional[float])`: The accuracy considered when setting the
+            humidity. Default is 3.0.
+        `port (Optional[int])`: The TCP port of the environmental chamber. Default is
+            `TCP_PORT`.
+        `communication_timeout (Optional[int])`: The communication timeout in
+            milliseconds. Default is 5000.
+    """
+
+    MONITOR_COMMAND_DELAY = EspecPr3j.MONITOR_COMMAND_DELAY
+    """Delay in seconds when sending a command to the environmental chamber"""
+
+    SETTING_COMMAND_DELAY = EspecPr3j.SETTING_COMMAND_DELAY
+    """Delay in seconds when sending a setting command to the environmental chamber"""
+
+    LINE_TERMINATION = EspecPr3j.LINE_TERMINATION
+    """The line termination character used by the environmental chamber"""
+
+    TCP_PORT = EspecPr3j.TCP_PORT
+    """The TCP port of the environmental chamber"""
+
+    ENCODING = ENCODING
+    """The encoding of the messages exchanged with the environmental chamber"""
+
+    def __init__(
+        self,
+        hostname: str,
+        temperature_accuracy: Optional[float] = None,
+        humidity_accuracy: Optional[float] = None,
+        port: Optional[int] = None,
+        communication_timeout: Optional[int] = None,
+    ):
+        self.hostname = hostname
+        """The IP address of the environmental chamber"""
+
+        self.port = port or self.TCP_PORT
+        """The TCP port of the environmental chamber"""
+
+        self.temperature_accuracy = temperature_accuracy or 0.5
+        """The accuracy considered when setting the temperature"""
+
+        self.humidity_accuracy = humidity_accuracy or 3.0
+        """The accuracy considered when setting the humidity"""
+
+        self.communication_timeout = communication_timeout or 5000
+        """The communication timeout in milliseconds"""
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+        self._target_temperature: Optional[float] = None
+        self._target_humidity: Optional[float] = None
+
+    async def __aenter__(self) -> "AsyncEspecPr3j":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def connect(self):
+        """
+        Opens the connection to the environmental chamber. It is called automatically
+        on the first command if the connection is not open yet.
+        """
+        if self._writer is not None:
+            return
+
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.hostname, self.port),
+            timeout=self.communication_timeout / 1000,
+        )
+        _LOGGER.debug(
+            f"Connected to the environmental chamber at {self.hostname}:{self.port}"
+        )
+
+    async def close(self):
+        """
+        Closes the connection to the environmental chamber.
+        """
+        if self._writer is None:
+            return
+
+        _LOGGER.debug("Closing the connection to the environmental chamber")
+        writer = self._writer
+        self._reader = None
+        self._writer = None
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def _query(self, command: str, delay: float = 0.0) -> str:
+        """
+        Sends a command and waits for its response.
+
+        Args:
+            `command`: The command to send, without line termination.
+            `delay`: The time in seconds to wait between writing the command and
+                reading the response.
+        """
+        async with self._lock:
+            await self.connect()
+            assert self._reader is not None and self._writer is not None
+
+            termination = self.LINE_TERMINATION.encode(self.ENCODING)
+            try:
+                self._writer.write(
+                    f"{command}{self.LINE_TERMINATION}".encode(self.ENCODING)
+                )
+                await self._writer.drain()
+
+                if delay:
+                    await asyncio.sleep(delay)
+
+                raw = await asyncio.wait_for(
+                    self._reader.readuntil(termination),
+                    timeout=self.communication_timeout / 1000,
+                )
+            except (
+                asyncio.TimeoutError,
+                asyncio.CancelledError,
+                asyncio.IncompleteReadError,
+                OSError,
+            ):
+                # a late response would be taken as the one of the next command, so
+                # the next command reconnects instead
+                await self.close()
+                raise
+
+        return raw[: -len(termination)].decode(self.ENCODING)
+
+    async def _execute(
+        self, command: protocol.Command[_T], delay: float, value: Any = None
+    ) -> _T:
+        """
+        Sends a command of the protocol table and decodes its response.
+
+        Args:
+            `command`: The command to send.
+            `delay`: The time in seconds to wait between writing the command and
+                reading the response.
+            `value`: The parameter of the command, if any.
+        """
+        return command.decode(await self._query(command.encode(value), delay))
+
+    async def _setpoints_reached(self) -> bool:
+        """
+        Checks with a single `MON?` query if the current temperature and humidity are
+        within the ranges of the cached setpoints. If the humidity control is disabled,
+        only the temperature is checked.
+        """
+        assert self._target_temperature is not None
+
+        return _setpoints_reached(
+            await self.get_test_area_state(),
+            self._target_temperature,
+            self._target_humidity,
+            self.temperature_accuracy,
+            self.humidity_accuracy,
+        )
+
+    async def _verify_setpoints(self):
+        """
+        Verifies that the chamber reports the cached setpoints as its targets.
+
+        Raises:
+            `SettingError`: If a target does not match its setpoint.
+        """
+        assert self._target_temperature is not None
+
+        _verify_setpoints(
+            await self.get_temperature_status(),
+            await self.get_humidity_status(),
+            self._target_temperature,
+            self._target_humidity,
+        )
+
+    async def get_temperature_status(self) -> TemperatureStatus:
+        """
+        Gets the temperature status of the environmental chamber. This includes the
+        current temperature, set temperature, upper limit, and lower limit.
+
+        Raises:
+            `MonitorError`: If an error occurred when getting the temperature status.
+        """
+        return await self._execute(
+            protocol.TEMPERATURE_STATUS, self.MONITOR_COMMAND_DELAY
+        )
+
+    async def get_humidity_status(self) -> HumidityStatus:
+        """
+        Gets the humidity status of the environmental chamber. This includes the current
+        humidity, set humidity, upper limit, and lower limit.
+
+        Raises:
+            `MonitorError`: If an error occurred when getting the humidity status.
+        """
+        return await self._execute(protocol.HUMIDITY_STATUS, self.MONITOR_COMMAND_DELAY)
+
+    async def set_target_temperature(self, temperature: float):
+        """
+        Sets the target temperature of the environmental chamber.
+
+        Args:
+            `temperature`: The target temperature to set in Celsius.
+
+        Raises:
+            `SettingError`: If an error occurred when setting the target temperature.
+        """
+        _LOGGER.debug(f"Setting target temperature to {temperature}°C")
+        await self._execute(
+            protocol.SET_TARGET_TEMPERATURE, self.SETTING_COMMAND_DELAY, temperature
+        )
+        self._target_temperature = temperature
+
+    async def set_target_humidity(self, humidity: Optional[float] = None):
+        """
+        Sets the target humidity of the environmental chamber.
+
+        Args:
+            `humidity`: The target humidity to set in percentage. If None, the humidity
+                control is disabled.
+
+        Raises:
+            `SettingError`: If an error occurred when setting the target humidity.
+        """
+        if humidity is None:
+            _LOGGER.debug("Disabling humidity control")
+            await self._execute(protocol.DISABLE_HUMIDITY, self.SETTING_COMMAND_DELAY)
+        else:
+            _LOGGER.debug(f"Setting target humidity to {humidity}%")
+            await self._execute(
+                protocol.SET_TARGET_HUMIDITY, self.SETTING_COMMAND_DELAY, humidity
+            )
+        self._target_humidity = humidity
+
+    async def get_test_area_state(self) -> TestAreaState:
+        """
+        Get the chamber test area state.
+        """
+        return await self._execute(protocol.TEST_AREA_STATE, self.MONITOR_COMMAND_DELAY)
+
+    async def set_temperature_limits(self, upper_limit: float, lower_limit: float):
+        """
+        Sets the upper and lower temperature limits for the chamber.
+
+        Args:
+            `upper_limit`: The temperature upper limit in Celsius.
+            `lower_limit`: The temperature lower limit in Celsius.
+
+        Raises:
+            `SettingError`: If an error occurred when setting the temperature limits.
+        """
+        _LOGGER.debug(
+            f"Setting temperature limits to {upper_limit}°C and {lower_limit}°C"
+        )
+        await self._execute(protocol.SET_UPPER_TEMPERATURE_LIMIT, 0.0, upper_limit)
+        await self._execute(protocol.SET_LOWER_TEMPERATURE_LIMIT, 0.0, lower_limit)
+
+    async def set_humidity_limits(self, upper_limit: float, lower_limit: float):
+        """
+        Sets the upper and lower humidity limits for the chamber
+
+        Args:
+            `upper_limit`: The humidity upper limit.
+            `lower_limit`: The humidity lower limit.
+
+        Raises:
+            `SettingError`: If an error occurred when setting the humidity limits.
+        """
+        _LOGGER.debug(f"Setting humidity limits to {upper_limit}% and {lower_limit}%")
+        await self._execute(protocol.SET_UPPER_HUMIDITY_LIMIT, 0.0, upper_limit)
+        await self._execute(protocol.SET_LOWER_HUMIDITY_LIMIT, 0.0, lower_limit)
+
+    async def get_mode(self) -> OperationMode:
+        """
+        Gets the operation mode of the environmental chamber.
+        """
+        return await self._execute(protocol.MODE, self.MONITOR_COMMAND_DELAY)
+
+    async def set_mode(self, mode: OperationMode):
+        """
+        Sets the operation mode of the environmental chamber.
+
+        Args:
+            `mode`: The operation mode to set.
+        """
+        _LOGGER.debug(f"Setting operation mode to {mode}")
+        response = await self._query(
+            protocol.SET_MODE.encode(mode), self.SETTING_COMMAND_DELAY
+        )
+        return _verify_mode_response(response, mode)
+
+    async def set_constant_condition(
+        self,
+        temperature: float,
+        humidity: Optional[float] = None,
+        stable_time=60.0,
+        poll_interval=1.0,
+    ):
+        """
+        Sets the environmental chamber to a constant temperature and humidity condition
+        and waits until the setpoints are reached and stable. Each check takes a single
+        `MON?` query, and other coroutines keep running while waiting.
+
+        Args:
+            `temperature`: The temperature to set in Celsius.
+            `humidity`: The humidity to set in percentage. Default is None (humidity
+                control is disabled)
+            `stable_time`: The time in seconds to wait until the setpoints are stable.
+                Default is 60.
+            `poll_interval`: The time in seconds to wait between each check.
+                Default is 1.
+
+        Raises:
+            `SettingError`: If an error occurred when setting the condition, or the
+                chamber does not report the setpoints as its targets.
+        """
+        _LOGGER.debug(f"Setting constant condition {temperature}°C, {humidity}%")
+
+        await self.set_target_temperature(temperature)
+        await self.set_target_humidity(humidity)
+        await self.set_mode(OperationMode.CONSTANT)
+
+        # the targets are verified once, the polling only checks the current values
+        await self._verify_setpoints()
+
+        start_time = time.monotonic()
+
+        _LOGGER.debug("Waiting for the setpoints to be reached")
+
+        while True:
+            if not await self._setpoints_reached():
+                _LOGGER.debug("Setpoints not reached yet")
+                start_time = time.monotonic()
+
+            if time.monotonic() - start_time >= stable_time:
+                _LOGGER.debug("Setpoints reached and stable")
+                break
+
+            await asyncio.sleep(poll_interval)
+
+    async def get_heater_percentage(self) -> HeatersStatus:
+        """
+        Gets the output of the heaters
+        """
+        return await self._execute(protocol.HEATERS_STATUS, self.MONITOR_COMMAND_DELAY)
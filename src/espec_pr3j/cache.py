@@ -0,0 +1,121 @@
+import logging
+from typing import Mapping, Optional
+
+from . import protocol
+from .clock import Clock, SystemClock
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    A read-through cache of the responses to monitor commands, with a time to live
+    per command.
+
+    Setting commands sent through the same chamber invalidate the cached responses
+    they may change (e.g. `TEMP, S23.0` invalidates `TEMP?`), so long time to live
+    values are safe for values that only change when set, like the limits and
+    targets. Changes made from other connections or from the chamber panel are only
+    seen once the cached response expires.
+
+    Args:
+        `ttl (Mapping[str, float])`: The time to live in seconds of the responses, by
+            monitor command (e.g. `{"TEMP?": 5.0, "MODE?": 60.0}`). Commands not listed
+            are never cached. Default is `DEFAULT_TTL`.
+        `clock (Optional[Clock])`: The clock measuring the time to live. If None, the
+            clock of the chamber the cache is given to is used, or the system clock
+            until then. Default is None.
+    """
+
+    DEFAULT_TTL: Mapping[str, float] = {
+        "TEMP?": 1.0,
+        "HUMI?": 1.0,
+        "MODE?": 1.0,
+    }
+    """The default time to live in seconds of the responses, by command"""
+
+    INVALIDATIONS: Mapping[str, tuple[str, ...]] = {
+        "TEMP": ("TEMP?",),
+        "HUMI": ("HUMI?",),
+        "MODE": ("MODE?", "MON?", "%?"),
+    }
+    """The monitor commands invalidated by each type of setting command"""
+
+    def __init__(
+        self,
+        ttl: Optional[Mapping[str, float]] = None,
+        clock: Optional[Clock] = None,
+    ):
+        self.ttl = dict(self.DEFAULT_TTL if ttl is None else ttl)
+        """The time to live in seconds of the responses, by command"""
+
+        self.clock = clock
+        """The clock measuring the time to live. None until given to a chamber, if
+        not set"""
+
+        self._system_clock = SystemClock()
+
+        self._entries: dict[str, tuple[float, str]] = {}
+
+    def get(self, command: str) -> Optional[str]:
+        """
+        Returns the cached response to a command, or None if there is no valid one.
+
+        Args:
+            `command`: The command.
+        """
+        entry = self._entries.get(command)
+        if entry is None:
+            return None
+
+        expiration, response = entry
+        if self._now() >= expiration:
+            self._entries.pop(command, None)
+            return None
+
+        _LOGGER.debug(f"Using cached response to '{command}'")
+        return response
+
+    def _now(self) -> float:
+        return (self.clock or self._system_clock).time()
+
+    def update(self, command: str, response: str):
+        """
+        Updates the cache after a command was sent. Responses to monitor commands with
+        a time to live are stored, and setting commands invalidate the responses they
+        may change.
+
+        Args:
+            `command`: The command sent.
+            `response`: The response received.
+        """
+        ttl = self.ttl.get(command)
+        if ttl is not None:
+            self._entries[command] = (self._now() + ttl, response)
+            return
+
+        self.invalidate_changed_by(command)
+
+    def invalidate_changed_by(self, command: str):
+        """
+        Drops the cached responses a setting command may change. Also used when the
+        exchange failed, as the chamber may have applied the command anyway.
+
+        Args:
+            `command`: The command sent.
+        """
+        invalidations = self.INVALIDATIONS.get(protocol.command_type(command))
+        if invalidations:
+            self.invalidate(*invalidations)
+
+    def invalidate(self, *commands: str):
+        """
+        Drops the cached responses to some commands. If no commands are given, the
+        whole cache is dropped.
+        """
+        if not commands:
+            self._entries.clear()
+            return
+
+        for command in commands:
+            self._entries.pop(command, None)
@@ -0,0 +1,72 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+class Clock(ABC):
+    """
+    The source of time used to wait for the environmental chamber. Subclasses
+    implement `time` and `sleep`.
+    """
+
+    @abstractmethod
+    def time(self) -> float:
+        """
+        Returns a monotonic time in seconds. Only differences between times are
+        meaningful.
+        """
+
+    @abstractmethod
+    def sleep(self, seconds: float):
+        """
+        Waits for some time.
+
+        Args:
+            `seconds`: The time to wait in seconds.
+        """
+
+
+class SystemClock(Clock):
+    """
+    The real time, from `time.monotonic` and `time.sleep`.
+    """
+
+    def time(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """
+    A simulated time that only moves forward when slept or advanced, so waits of
+    minutes or hours return at once. Meant for simulations, together with a
+    `ChamberSimulator` sharing the same clock.
+
+    Args:
+        `start (float)`: The initial time in seconds. Default is 0.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        with self._lock:
+            return self._now
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    def advance(self, seconds: float):
+        """
+        Moves the time forward.
+
+        Args:
+            `seconds`: The time to move forward in seconds. Negative values are
+                ignored.
+        """
+        with self._lock:
+            self._now += max(seconds, 0.0)
@@ -0,0 +1,307 @@
+import logging
+from concurrent.futures import Future, InvalidStateError
+from typing import TYPE_CHECKING, Callable, Optional
+
+from .data_classes import ConditionProgress
+from .scheduler import PollScheduler
+from .stability import BandStabilityDetector, StabilityDetector
+
+if TYPE_CHECKING:
+    from .espec_pr3j import EspecPr3j
+
+_LOGGER = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[ConditionProgress], None]
+"""A function called with the progress of a condition after every poll"""
+
+
+class ConditionFuture(Future):
+    """
+    A `concurrent.futures.Future` of a constant condition. Its result is the final
+    `ConditionProgress` once the setpoints are reached and stable. It can be awaited
+    after wrapping it with `asyncio.wrap_future`.
+
+    Cancelling the future stops the wait before the next poll. The chamber keeps the
+    condition that was set.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._progress: Optional[ConditionProgress] = None
+        self._progress_callbacks: list[ProgressCallback] = []
+
+    @property
+    def progress(self) -> Optional[ConditionProgress]:
+        """The progress after the latest poll. None before the first one"""
+        return self._progress
+
+    def add_progress_callback(self, callback: ProgressCallback):
+        """
+        Adds a function called with the progress after every poll, from the thread of
+        the poll. Errors raised by the callback are logged.
+        """
+        self._progress_callbacks.append(callback)
+
+    def _set_progress(self, progress: ConditionProgress):
+        self._progress = progress
+        for callback in self._progress_callbacks:
+            try:
+                callback(progress)
+            except Exception as error:
+                _LOGGER.error("Progress callback failed")
+                _LOGGER.debug(f"Error: '{error!r}'")
+
+
+class ConditionWaiter:
+    """
+    Waits for the setpoints of a chamber to be reached and stable, one poll at a time.
+    Each `step` sends a single `MON?` query and returns the time to wait before the
+    next one, so the wait can be driven by a loop or by a `PollScheduler` on the clock
+    of the chamber.
+
+    The setpoints are the ones last set through the chamber. The time is measured on
+    the clock of the chamber, and the stability is judged by a `StabilityDetector`.
+
+    The polls are spread by the distance to the accuracy bands: while approaching
+    them, the next poll is at half the time to reach them at the rate observed since
+    the approach started, so a long ramp takes few polls and they get denser near the
+    band edge. Within the bands, or when not approaching them, the chamber is polled
+    every `poll_interval`.
+
+    Args:
+        `chamber (EspecPr3j)`: The environmental chamber.
+        `stable_time (Optional[float])`: The time in seconds the setpoints must be
+            kept. Only used without a `detector`. Default is 60.
+        `poll_interval (float)`: The minimum time in seconds between polls. Default
+            is 1.
+        `timeout (Optional[float])`: The maximum time in seconds to wait. If None, the
+            wait never times out. Default is None.
+        `detector (Optional[StabilityDetector])`: The stability detector. Default is a
+            `BandStabilityDetector` with `stable_time`.
+        `max_poll_interval (Optional[float])`: The maximum time in seconds between
+            polls. Setting it to `poll_interval` polls at a fixed rate. Default is
+            `MAX_POLL_INTERVAL_FACTOR` times `poll_interval`.
+
+    Raises:
+        `ValueError`: If both `stable_time` and `detector` are given.
+    """
+
+    MAX_POLL_INTERVAL_FACTOR = 60.0
+    """The default maximum time between polls, relative to the poll interval"""
+
+    APPROACH_FRACTION = 0.5
+    """The fraction of the predicted time to reach the accuracy bands waited before
+    the next poll"""
+
+    def __init__(
+        self,
+        chamber: "EspecPr3j",
+        stable_time: Optional[float] = None,
+        poll_interval: float = 1.0,
+        timeout: Optional[float] = None,
+        detector: Optional[StabilityDetector] = None,
+        max_poll_interval: Optional[float] = None,
+    ):
+        if detector is not None and stable_time is not None:
+            raise ValueError(
+                "The stable time is given by the detector, it can not be set as well"
+            )
+
+        self.chamber = chamber
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+        self.max_poll_interval = max(
+            max_poll_interval or self.MAX_POLL_INTERVAL_FACTOR * poll_interval,
+            poll_interval,
+        )
+        """The maximum time in seconds between polls"""
+
+        self.detector = detector or BandStabilityDetector(
+            60.0 if stable_time is None else stable_time
+        )
+        """The stability detector"""
+
+        self.progress: Optional[ConditionProgress] = None
+        """The progress after the latest poll. None before the first one"""
+
+        self._start_time: Optional[float] = None
+        self._approach: Optional[tuple[float, tuple[float, float]]] = None
+
+    def start(self):
+        """
+        Starts measuring the time. It is called by the first `step` if needed.
+        """
+        self._start_time = self.chamber.clock.time()
+        self._approach = None
+        self.detector.reset(self._start_time)
+
+    def step(self) -> Optional[float]:
+        """
+        Polls the chamber once and returns the time in seconds to wait before the next
+        poll, or None once the setpoints are reached and stable.
+
+        Raises:
+            `TimeoutError`: If the timeout expired.
+        """
+        if self._start_time is None:
+            self.start()
+        assert self._start_time is not None
+
+        chamber = self.chamber
+        assert chamber._target_temperature is not None
+
+        state = chamber.get_test_area_state()
+        now = chamber.clock.time()
+
+        temperature_error = state.current_temperature - chamber._target_temperature
+        humidity_error = None
+        if chamber._target_humidity is not None:
+            humidity_error = state.current_humidity - chamber._target_humidity
+
+        reached = abs(temperature_error) <= chamber.temperature_accuracy and (
+            humidity_error is None or abs(humidity_error) <= chamber.humidity_accuracy
+        )
+
+        _LOGGER.debug(
+            f"Temperature error: {temperature_error}°C, humidity error: "
+            f"{humidity_error}%"
+        )
+        if not reached:
+            _LOGGER.debug("Setpoints not reached yet")
+
+        stable = self.detector.update(
+            now,
+            temperature_error,
+            humidity_error,
+            chamber.temperature_accuracy,
+            chamber.humidity_accuracy,
+        )
+        self.progress = ConditionProgress(
+            temperature_error=temperature_error,
+            humidity_error=humidity_error,
+            reached=reached,
+            stable_time=self.detector.stable_time,
+            elapsed_time=now - self._start_time,
+            eta=self.detector.eta,
+        )
+
+        if stable:
+            _LOGGER.debug("Setpoints reached and stable")
+            return None
+
+        if self.timeout is not None and now - self._start_time >= self.timeout:
+            raise TimeoutError(
+                f"The setpoints were not stable after {self.timeout} seconds"
+            )
+
+        delay = self._next_delay(now, temperature_error, humidity_error)
+        if self.timeout is not None:
+            delay = min(delay, max(self._start_time + self.timeout - now, 0.0))
+        return max(delay, self.poll_interval)
+
+    def _next_delay(
+        self, now: float, temperature_error: float, humidity_error: Optional[float]
+    ) -> float:
+        """
+        Returns the time to wait before the next poll, from the distances to the
+        accuracy bands and the rate they shrank at since the approach started.
+        """
+        distances = (
+            max(abs(temperature_error) - self.chamber.temperature_accuracy, 0.0),
+            0.0
+            if humidity_error is None
+            else max(abs(humidity_error) - self.chamber.humidity_accuracy, 0.0),
+        )
+        if distances == (0.0, 0.0):
+            self._approach = None
+            return self.poll_interval
+
+        # the rate is averaged over the whole approach, as the resolution of the
+        # readings hides the changes between close polls
+        if self._approach is None:
+            self._approach = (now, distances)
+            return self.poll_interval
+
+        approach_time, approach_distances = self._approach
+        elapsed = now - approach_time
+        delay = self.max_poll_interval
+        for distance, approach_distance in zip(distances, approach_distances):
+            if distance == 0.0:
+                continue
+
+            rate = (approach_distance - distance) / elapsed if elapsed > 0 else 0.0
+            if rate <= 0.0:
+                return self.poll_interval
+            delay = min(delay, self.APPROACH_FRACTION * distance / rate)
+
+        _LOGGER.debug(f"Next poll in {delay:.1f}s")
+        return delay
+
+    def schedule(
+        self,
+        scheduler: PollScheduler,
+        setup: Optional[Callable[[], None]] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> ConditionFuture:
+        """
+        Runs the wait on a scheduler and returns its future right away.
+
+        Args:
+            `scheduler`: The scheduler running the polls, on the clock of the chamber.
+            `setup`: A function called on the scheduler before the first poll, e.g. to
+                set the condition. Its errors are set on the future.
+            `progress_callback`: A function called with the progress after every poll.
+
+        Raises:
+            `ValueError`: If the scheduler does not run on the clock of the chamber.
+        """
+        scheduler.check_clock(self.chamber.clock)
+
+        future = ConditionFuture()
+        if progress_callback is not None:
+            future.add_progress_callback(progress_callback)
+
+        pending_setup = setup
+
+        def step():
+            nonlocal pending_setup
+
+            if future.cancelled():
+                _LOGGER.debug("Condition wait cancelled")
+                return
+
+            try:
+                if pending_setup is not None:
+                    pending_setup()
+                    pending_setup = None
+                delay = self.step()
+            except Exception as error:
+                _set_outcome(future.set_exception, error)
+                return
+
+            assert self.progress is not None
+            future._set_progress(self.progress)
+
+            if delay is None:
+                _set_outcome(future.set_result, self.progress)
+                return
+
+            try:
+                scheduler.call_later(delay, step)
+            except Exception as error:
+                # e.g. the scheduler was shut down, the wait can not go on
+                _set_outcome(future.set_exception, error)
+
+        scheduler.call_later(0.0, step)
+        return future
+
+
+def _set_outcome(setter: Callable, value):
+    """
+    Sets the result or exception of a future, unless it was cancelled meanwhile.
+    """
+    try:
+        setter(value)
+    except InvalidStateError:
+        _LOGGER.debug("Condition wait cancelled")
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import Optional
 
@@ -103,3 +103,372 @@ class TestAreaState:
 
     number_of_alarms: int
     """The number of alarms occurring"""
+
+
+@dataclass
+class ChamberSnapshot:
+    """
+    A snapshot of the readings of a single environmental chamber. Readings that were
+    not requested are None.
+    """
+
+    test_area: Optional[TestAreaState] = None
+    """The test area state (`MON?`)"""
+
+    temperature: Optional[TemperatureStatus] = None
+    """The temperature status (`TEMP?`)"""
+
+    humidity: Optional[HumidityStatus] = None
+    """The humidity status (`HUMI?`)"""
+
+    heaters: Optional[HeatersStatus] = None
+    """The heaters status (`%?`)"""
+
+
+@dataclass
+class FleetSnapshot:
+    """
+    A snapshot of the readings of a fleet of environmental chambers.
+    """
+
+    timestamp: float
+    """The time when the poll started, as returned by `time.time()`"""
+
+    chambers: dict[str, ChamberSnapshot] = field(default_factory=dict)
+    """The snapshots of the chambers that were polled successfully, by name"""
+
+    errors: dict[str, Exception] = field(default_factory=dict)
+    """The errors of the chambers that could not be polled, by name"""
+
+
+@dataclass
+class ConditionProgress:
+    """
+    The progress of the wait for a constant condition to be reached and stable.
+    """
+
+    temperature_error: float
+    """The current temperature minus the target temperature, in Celsius"""
+
+    humidity_error: Optional[float]
+    """The current humidity minus the target humidity, in percentage. None if the
+    humidity control is disabled."""
+
+    reached: bool
+    """Whether the current values are within the accuracy of the setpoints"""
+
+    stable_time: float
+    """The time in seconds the condition has been considered stable so far, by the
+    stability detector"""
+
+    elapsed_time: float
+    """The time in seconds since the wait started"""
+
+    eta: Optional[float]
+    """The estimated time in seconds until the condition is stable. None if it can not
+    be estimated yet (e.g. the values are not approaching the setpoints)."""
+
+
+@dataclass
+class ProfileStep:
+    """
+    A step of a climate profile: a ramp to some setpoints, then a soak at them.
+    """
+
+    temperature: float
+    """The temperature at the end of the ramp, in Celsius"""
+
+    humidity: Optional[float] = None
+    """The humidity at the end of the ramp, in percentage. None to disable the humidity
+    control."""
+
+    ramp_time: float = 0.0
+    """The duration of the ramp in seconds. The setpoints are moved linearly from the
+    previous ones over this time. If 0, they are changed at once and the chamber
+    ramps at its own rate."""
+
+    soak_time: float = 0.0
+    """The time in seconds the setpoints are held after the ramp"""
+
+    wait_reached: bool = True
+    """Whether the soak starts once the setpoints are reached, instead of right after
+    the ramp"""
+
+
+@dataclass
+class SetpointChange:
+    """
+    A change of the setpoints in the timeline of a profile.
+    """
+
+    step: int
+    """The index of the step"""
+
+    offset: float
+    """The time of the change from the start of the step, in seconds"""
+
+    temperature: float
+    """The temperature setpoint, in Celsius"""
+
+    humidity: Optional[float]
+    """The humidity setpoint, in percentage. None if the humidity control is
+    disabled."""
+
+
+@dataclass
+class ProgramStep:
+    """
+    A step of a program stored in the chamber.
+    """
+
+    temperature: float
+    """The temperature setpoint, in Celsius"""
+
+    duration: float
+    """The duration of the step in seconds, in whole minutes"""
+
+    humidity: Optional[float] = None
+    """The humidity setpoint, in percentage. None if the humidity control is
+    disabled."""
+
+    temperature_ramp: bool = False
+    """Whether the temperature ramps linearly from the previous step during the step
+    instead of changing at once"""
+
+    humidity_ramp: bool = False
+    """Whether the humidity ramps linearly from the previous step during the step
+    instead of changing at once"""
+
+    guaranteed: bool = False
+    """Whether the step time only counts while the test area is within the guaranteed
+    range of the setpoints"""
+
+    pause: bool = False
+    """Whether the program pauses at the end of the step"""
+
+
+@dataclass
+class ProgramState:
+    """
+    The state of the program running in the chamber.
+    """
+
+    program: int
+    """The number of the program"""
+
+    step: int
+    """The number of the step running, starting at 1"""
+
+    remaining_time: float
+    """The time left in the step, in seconds"""
+
+    remaining_cycles: int
+    """The number of repetitions left"""
+
+
+@dataclass
+class CommandStatistics:
+    """
+    The statistics of one type of command (e.g. `TEMP?` or `TEMP`) sent to one
+    environmental chamber.
+    """
+
+    chamber: str
+    """The resource path of the chamber"""
+
+    command: str
+    """The type of the command: its header without parameters"""
+
+    count: int
+    """The number of exchanges, including the failed ones"""
+
+    latency_sum: float
+    """The total time in seconds of the exchanges, from sending the command to
+    decoding the response"""
+
+    delay_sum: float
+    """The part of `latency_sum` spent waiting before reading the responses"""
+
+    buckets: tuple[tuple[float, int], ...]
+    """The latency histogram: the cumulative number of exchanges that took at most
+    each upper bound in seconds. The last bound is infinity."""
+
+    errors: dict[str, int] = field(default_factory=dict)
+    """The number of failed exchanges, by error type (e.g. `MonitorError`)"""
+
+    bytes_sent: int = 0
+    """The number of bytes written, including the line terminations"""
+
+    bytes_received: int = 0
+    """The number of bytes read, including the line terminations"""
+
+
+@dataclass
+class CommandEvent:
+    """
+    An exchange of a command with an environmental chamber, as given to the command
+    hooks.
+    """
+
+    chamber: str
+    """The resource path of the chamber"""
+
+    command: str
+    """The command sent"""
+
+    response: Optional[str]
+    """The raw response. None if it could not be read"""
+
+    io_time: float
+    """The time in seconds spent writing the command and reading the response,
+    including the delay in between. Zero for cached responses."""
+
+    parse_time: float
+    """The time in seconds spent decoding the response"""
+
+    delay: float = 0.0
+    """The delay in seconds waited between writing the command and reading"""
+
+    cached: bool = False
+    """Whether the response came from the cache instead of the chamber"""
+
+    error: Optional[BaseException] = None
+    """The error of the exchange, if it failed"""
+
+
+@dataclass
+class ChamberSettings:
+    """
+    A desired state of the settings of an environmental chamber, for `apply`. Settings
+    left as None are not changed.
+    """
+
+    temperature: Optional[float] = None
+    """The target temperature in Celsius"""
+
+    humidity: Optional[float] = None
+    """The target humidity in percentage. Ignored if `humidity_control` is False"""
+
+    humidity_control: bool = True
+    """Whether the humidity is controlled. If False, the humidity control is disabled"""
+
+    upper_temperature_limit: Optional[float] = None
+    """The upper temperature limit in Celsius"""
+
+    lower_temperature_limit: Optional[float] = None
+    """The lower temperature limit in Celsius"""
+
+    upper_humidity_limit: Optional[float] = None
+    """The upper humidity limit in percentage"""
+
+    lower_humidity_limit: Optional[float] = None
+    """The lower humidity limit in percentage"""
+
+    mode: Optional[OperationMode] = None
+    """The operation mode. `RUN` can not be applied, use `run_program` instead"""
+
+
+class RecordKind(Enum):
+    """
+    The kind of a record of a recorded session.
+    """
+
+    WRITE = 0
+    """A message written to the chamber"""
+
+    READ = 1
+    """A message read from the chamber"""
+
+    ERROR = 2
+    """An error when exchanging a message. The message is the error type and text"""
+
+
+@dataclass
+class SessionRecord:
+    """
+    A record of a session with an environmental chamber.
+    """
+
+    timestamp: float
+    """The time of the record in seconds, by default as returned by `time.time()`"""
+
+    kind: RecordKind
+    """The kind of the record"""
+
+    message: str
+    """The message, without line termination"""
+
+
+@dataclass
+class TelemetryRecord:
+    """
+    A sample of a telemetry log.
+    """
+
+    timestamp: float
+    """The time of the sample, in seconds since the epoch"""
+
+    temperature: float
+    """The temperature of the test area in °C"""
+
+    humidity: float
+    """The humidity of the test area in %RH"""
+
+    temperature_heater: float
+    """The output of the temperature heater in %. NaN if it was not sampled"""
+
+    humidity_heater: float
+    """The output of the humidity heater in %. NaN if it was not sampled"""
+
+    mode: OperationMode
+    """The operation mode of the chamber"""
+
+    alarms: int
+    """The number of alarms of the chamber"""
+
+
+@dataclass
+class RollupBucket:
+    """
+    The statistics of a field of the telemetry over a time bucket.
+    """
+
+    start: float
+    """The start of the bucket, in seconds since the epoch"""
+
+    duration: float
+    """The duration of the bucket in seconds"""
+
+    count: int
+    """The number of samples in the bucket"""
+
+    minimum: float
+    """The minimum value"""
+
+    maximum: float
+    """The maximum value"""
+
+    mean: float
+    """The mean value"""
+
+
+@dataclass
+class StateChange:
+    """
+    A change of the alarms or operation mode of an environmental chamber.
+    """
+
+    timestamp: float
+    """The time the change was seen, in seconds since the epoch"""
+
+    previous: TestAreaState
+    """The test area state before the change"""
+
+    current: TestAreaState
+    """The test area state after the change"""
+
+    mode_changed: bool
+    """Whether the operation mode changed"""
+
+    alarms_changed: bool
+    """Whether the number of alarms changed"""
@@ -0,0 +1,160 @@
+import heapq
+import itertools
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+from . import protocol
+from .data_classes import OperationMode
+from .transports import Transport
+
+_LOGGER = logging.getLogger(__name__)
+
+EMERGENCY_PRIORITY = 0
+"""The priority of the commands that stop the chamber (`MODE, STANDBY`, `MODE, OFF`)"""
+
+SETTING_PRIORITY = 1
+"""The priority of the other setting commands"""
+
+MONITOR_PRIORITY = 2
+"""The priority of the monitor commands"""
+
+_EMERGENCY_COMMANDS = frozenset(
+    protocol.SET_MODE.encode(mode)
+    for mode in (OperationMode.STANDBY, OperationMode.OFF)
+)
+
+
+def command_priority(command: str) -> int:
+    """
+    Returns the priority of a command, lower first. Unknown commands are considered
+    setting commands, as they may change the state of the chamber.
+    """
+    if command in _EMERGENCY_COMMANDS:
+        return EMERGENCY_PRIORITY
+
+    try:
+        kind = protocol.parse_request(command)[0].kind
+    except ValueError:
+        return SETTING_PRIORITY
+
+    if kind == protocol.CommandKind.MONITOR:
+        return MONITOR_PRIORITY
+    return SETTING_PRIORITY
+
+
+class CommandDispatcher:
+    """
+    Sends the commands of many threads to a chamber from a single I/O thread, through
+    one transport.
+
+    The pending commands are sent by priority (see `command_priority`), and in order
+    within the same priority. A monitor command submitted while an identical one is
+    pending or being sent is not sent again: both callers get the same response.
+
+    Args:
+        `transport (Transport)`: The transport to the chamber. It is only used from the
+            I/O thread.
+    """
+
+    def __init__(self, transport: Transport):
+        self.transport = transport
+
+        self._queue: list[tuple[int, int, str, float, Future]] = []
+        self._pending: dict[str, Future] = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def __enter__(self) -> "CommandDispatcher":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(
+        self, command: str, delay: float, priority: Optional[int] = None
+    ) -> "Future[str]":
+        """
+        Queues a command and returns the future of its response.
+
+        Args:
+            `command`: The command to send.
+            `delay`: The time in seconds between writing the command and reading the
+                response.
+            `priority`: The priority of the command, lower first. Default is given by
+                `command_priority`.
+
+        Raises:
+            `RuntimeError`: If the dispatcher was closed.
+        """
+        if priority is None:
+            priority = command_priority(command)
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The dispatcher was closed")
+
+            coalesce = priority == MONITOR_PRIORITY
+            if coalesce and command in self._pending:
+                _LOGGER.debug(f"Coalescing '{command}'")
+                return self._pending[command]
+
+            future: Future[str] = Future()
+            if coalesce:
+                self._pending[command] = future
+
+            heapq.heappush(
+                self._queue, (priority, next(self._counter), command, delay, future)
+            )
+            self._condition.notify()
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="espec_pr3j_dispatcher", daemon=True
+                )
+                self._thread.start()
+
+        return future
+
+    def query(self, command: str, delay: float, priority: Optional[int] = None) -> str:
+        """
+        Sends a command and waits for its response. See `submit`.
+        """
+        return self.submit(command, delay, priority).result()
+
+    def close(self):
+        """
+        Stops the I/O thread once the queued commands are sent, and closes the
+        transport.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join()
+        self.transport.close()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+
+                _, _, command, delay, future = heapq.heappop(self._queue)
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(self.transport.query(command, delay=delay))
+                except Exception as error:
+                    future.set_exception(error)
+
+            with self._condition:
+                if self._pending.get(command) is future:
+                    del self._pending[command]
@@ -1,22 +1,240 @@
 #!/usr/bin/python3
 import logging
-import re
+import threading
 import time
-from typing import Optional
-
-import pyvisa
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional, TypeVar
 
+from . import protocol, spans
+from .cache import ResponseCache
+from .clock import Clock, SystemClock
 from .data_classes import (
+    ChamberSettings,
+    CommandEvent,
     HeatersStatus,
     HumidityStatus,
     OperationMode,
+    ProgramState,
     TemperatureStatus,
     TestAreaState,
 )
 from .exceptions import MonitorError, SettingError
+from .hooks import CommandHook
+from .metrics import CommandMetrics
+from .pacing import CommandPacer
+from .telemetry import TelemetrySampler
+from .transports import LINE_TERMINATION, TCP_PORT, Transport, VisaTransport
+
+if TYPE_CHECKING:
+    import pyvisa
+
+    from .conditions import ConditionFuture, ProgressCallback
+    from .dispatcher import CommandDispatcher
+    from .programs import Program
+    from .scheduler import PollScheduler
+    from .stability import StabilityDetector
 
 _LOGGER = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
+
+def _verify_mode_response(response: str, mode: OperationMode) -> str:
+    """
+    Verifies the acknowledge of a `MODE, <mode>` command and returns it.
+
+    Raises:
+        `SettingError`: If the mode was not set correctly.
+    """
+    set_mode = protocol.SET_MODE.decode(response)
+    if set_mode != mode:
+        _LOGGER.error(
+            f"Operation mode not set correctly (current: {set_mode}, expected: {mode})"
+        )
+        _LOGGER.debug(f"Response: '{response}'")
+        raise SettingError("Failed to set the operation mode")
+
+    return response
+
+
+def _verify_setpoints(
+    temperature_status: TemperatureStatus,
+    humidity_status: HumidityStatus,
+    temperature: float,
+    humidity: Optional[float],
+):
+    """
+    Verifies that the targets reported by the chamber match the setpoints that were
+    set. The temperature is compared with the resolution of the `TEMP, S` command and
+    the humidity with the integer resolution reported by `HUMI?`.
+
+    Raises:
+        `SettingError`: If a target does not match its setpoint.
+    """
+    if temperature_status.target_temperature != float(f"{temperature:.1f}"):
+        _LOGGER.error(
+            f"Target temperature not set correctly"
+            f" (current: {temperature_status.target_temperature}, "
+            f"expected: {temperature})"
+        )
+        raise SettingError("Failed to set the target temperature")
+
+    target_humidity = humidity_status.target_humidity
+    if humidity is None:
+        humidity_set = target_humidity is None
+    else:
+        humidity_set = (
+            target_humidity is not None and abs(target_humidity - humidity) <= 0.5
+        )
+
+    if not humidity_set:
+        _LOGGER.error(
+            f"Target humidity not set correctly"
+            f" (current: {target_humidity}, expected: {humidity})"
+        )
+        raise SettingError("Failed to set the target humidity")
+
+
+def _setpoints_reached(
+    test_area_state: TestAreaState,
+    temperature: float,
+    humidity: Optional[float],
+    temperature_accuracy: float,
+    humidity_accuracy: float,
+) -> bool:
+    """
+    Checks if the test area state is within the ranges of the setpoints. If the
+    humidity setpoint is None (control disabled), only the temperature is checked.
+    """
+    current_temperature = test_area_state.current_temperature
+    current_humidity = test_area_state.current_humidity
+
+    _LOGGER.debug(
+        f"Current temperature: {current_temperature}°C, Target temperature: "
+        f"{temperature} +-{temperature_accuracy}°C"
+    )
+    if abs(current_temperature - temperature) > temperature_accuracy:
+        return False
+
+    if humidity is None:
+        _LOGGER.debug("Humidity control is disabled")
+        return True
+
+    _LOGGER.debug(
+        f"Current humidity: {current_humidity}%, Target humidity: {humidity} +-"
+        f"{humidity_accuracy}%"
+    )
+    return abs(current_humidity - humidity) <= humidity_accuracy
+
+
+def _same_temperature(current: float, desired: float) -> bool:
+    """
+    Compares temperatures with the resolution of the setting commands.
+    """
+    return current == float(f"{desired:.1f}")
+
+
+def _same_humidity(current: Optional[float], desired: float) -> bool:
+    """
+    Compares humidities with the integer resolution reported by `HUMI?`.
+    """
+    return current is not None and abs(current - desired) <= 0.5
+
+
+def _limit_commands(
+    commands: tuple[protocol.Command[float], protocol.Command[float]],
+    current: tuple[float, float],
+    desired: tuple[Optional[float], Optional[float]],
+    same: Callable[[float, float], bool],
+) -> list[tuple[protocol.Command[float], float]]:
+    """
+    Returns the commands changing a pair of upper and lower limits, ordered so the
+    upper limit never goes below the lower one in between.
+    """
+    changes = [
+        (command, value)
+        for command, value, current_value in zip(commands, desired, current)
+        if value is not None and not same(current_value, value)
+    ]
+
+    upper = desired[0]
+    if len(changes) == 2 and upper is not None and upper < current[1]:
+        # the new range is below the current one
+        changes.reverse()
+    return changes
+
+
+def _verify_settings(
+    settings: ChamberSettings,
+    temperature_status: Optional[TemperatureStatus],
+    humidity_status: Optional[HumidityStatus],
+    mode: Optional[OperationMode],
+):
+    """
+    Verifies that the state read back from the chamber matches the desired settings.
+
+    Raises:
+        `SettingError`: If a setting does not match.
+    """
+    mismatches: list[tuple[str, Any, Any]] = []
+
+    if temperature_status is not None:
+        for name, current, desired in (
+            (
+                "target temperature",
+                temperature_status.target_temperature,
+                settings.temperature,
+            ),
+            (
+                "upper temperature limit",
+                temperature_status.upper_limit,
+                settings.upper_temperature_limit,
+            ),
+            (
+                "lower temperature limit",
+                temperature_status.lower_limit,
+                settings.lower_temperature_limit,
+            ),
+        ):
+            if desired is not None and not _same_temperature(current, desired):
+                mismatches.append((name, current, desired))
+
+    if humidity_status is not None:
+        target = humidity_status.target_humidity
+        if not settings.humidity_control:
+            if target is not None:
+                mismatches.append(("target humidity", target, None))
+        elif settings.humidity is not None and not _same_humidity(
+            target, settings.humidity
+        ):
+            mismatches.append(("target humidity", target, settings.humidity))
+
+        for name, current, desired in (
+            (
+                "upper humidity limit",
+                humidity_status.upper_limit,
+                settings.upper_humidity_limit,
+            ),
+            (
+                "lower humidity limit",
+                humidity_status.lower_limit,
+                settings.lower_humidity_limit,
+            ),
+        ):
+            if desired is not None and not _same_humidity(current, desired):
+                mismatches.append((name, current, desired))
+
+    if mode is not None and settings.mode is not None and mode != settings.mode:
+        mismatches.append(("operation mode", mode, settings.mode))
+
+    for name, current, desired in mismatches:
+        _LOGGER.error(
+            f"The {name} was not set correctly (current: {current}, expected: "
+            f"{desired})"
+        )
+    if mismatches:
+        raise SettingError("Failed to apply the settings")
+
 
 class EspecPr3j:
     """
@@ -37,20 +255,53 @@ class EspecPr3j:
             resource manager. If None, the default one is used. Default is None.
         `communication_timeout (Optional[int])`: The communication timeout in
             milliseconds. Default is 5000.
+        `pacer (Optional[CommandPacer])`: An optional pacer that adapts the delays
+            between writing a command and reading its response to the measured latency
+            of the chamber. If None, the fixed delays are used. Default is None.
+        `cache (Optional[ResponseCache])`: An optional cache of the responses to
+            monitor commands. If None, every call queries the chamber. Without a clock
+            of its own, it measures the time to live on `clock`. Default is None.
+        `transport (Optional[Transport])`: An optional transport to talk to the
+            environmental chamber, e.g. a `SocketTransport`. If given, hostname,
+            resource_path, resource_manager and communication_timeout are ignored.
+            If None, a `VisaTransport` is used. Default is None.
+        `lazy_connect (bool)`: If True, the connection is opened on the first command
+            (or by `connect`) instead of when the object is created. Default is False.
+        `clock (Optional[Clock])`: The clock used to wait for the chamber, e.g. a
+            `VirtualClock` shared with a `ChamberSimulator`. Default is the system
+            clock.
+        `metrics (Optional[CommandMetrics])`: Optional metrics recording the latency,
+            errors and traffic of every exchange with the chamber. They can be shared
+            by many chambers. If None, nothing is recorded. Default is None.
+        `hooks (Optional[Iterable[CommandHook]])`: Hooks called before and after every
+            command. More can be added to `hooks` later. Default is no hooks.
+        `thread_safe (bool)`: If True, the commands of all the threads are sent by a
+            single I/O thread, from a priority queue: `MODE, STANDBY` and `MODE, OFF`
+            first, then the other setting commands, then the monitor commands.
+            Identical monitor commands pending at the same time are sent once. Can't
+            be used with pacer. Default is False.
     """
 
     MONITOR_COMMAND_DELAY = 0.2
     """Delay in seconds when sending a command to the environmental chamber
-       (program-related delay is 0.3)"""
+       (program-related delay is `PROGRAM_MONITOR_COMMAND_DELAY`)"""
 
     SETTING_COMMAND_DELAY = 0.5
     """Delay in seconds when sending a setting command to the environmental chamber
-       (program-related delay is 1)"""
+       (program-related delay is `PROGRAM_SETTING_COMMAND_DELAY`)"""
+
+    PROGRAM_MONITOR_COMMAND_DELAY = 0.3
+    """Delay in seconds when sending a program-related command to the environmental
+       chamber"""
 
-    LINE_TERMINATION = "\r\n"
+    PROGRAM_SETTING_COMMAND_DELAY = 1.0
+    """Delay in seconds when sending a program-related setting command to the
+       environmental chamber"""
+
+    LINE_TERMINATION = LINE_TERMINATION
     """The line termination character used by the environmental chamber"""
 
-    TCP_PORT = 57732
+    TCP_PORT = TCP_PORT
     """The TCP port of the environmental chamber"""
 
     def __init__(
@@ -59,11 +310,24 @@ class EspecPr3j:
         temperature_accuracy: Optional[float] = None,
         humidity_accuracy: Optional[float] = None,
         resource_path: Optional[str] = None,
-        resource_manager: Optional[pyvisa.ResourceManager] = None,
+        resource_manager: Optional["pyvisa.ResourceManager"] = None,
         communication_timeout: Optional[int] = None,
+        pacer: Optional[CommandPacer] = None,
+        cache: Optional[ResponseCache] = None,
+        transport: Optional[Transport] = None,
+        lazy_connect: bool = False,
+        clock: Optional[Clock] = None,
+        metrics: Optional[CommandMetrics] = None,
+        hooks: Optional[Iterable[CommandHook]] = None,
+        thread_safe: bool = False,
     ):
         assert (hostname is None) or (resource_path is None)
-        assert (hostname is not None) or (resource_path is not None)
+        assert not (thread_safe and pacer is not None)
+        assert (
+            (hostname is not None)
+            or (resource_path is not None)
+            or (transport is not None)
+        )
 
         self.hostname = hostname
         """The IP address of the environmental chamber"""
@@ -74,56 +338,231 @@ class EspecPr3j:
         self.humidity_accuracy = humidity_accuracy or 3.0
         """The accuracy considered when setting the humidity"""
 
-        # we try to connect to the environmental chamber just to see if there is an
-        # error
-        self._resource_manager = resource_manager or pyvisa.ResourceManager()
+        if transport is None:
+            if resource_path is None:
+                resource_path = f"TCPIP0::{self.hostname}"  # noqa E231
+                resource_path += f"::{self.TCP_PORT}::SOCKET"  # noqa E231
+
+            transport = VisaTransport(
+                resource_path,
+                resource_manager=resource_manager,
+                timeout=communication_timeout,
+            )
 
-        if resource_path is None:
-            resource_path = f"TCPIP0::{self.hostname}"  # noqa E231
-            resource_path += f"::{self.TCP_PORT}::SOCKET"  # noqa E231
+        self._transport = transport
 
-        self.resource_path = resource_path
+        self.resource_path = transport.resource_path
         """Resource path of the environmental chamber"""
 
-        self._chamber = self._resource_manager.open_resource(self.resource_path)
-        _LOGGER.debug(f"Connected to the environmental chamber at {self.resource_path}")
+        self.pacer = pacer
+        """The pacer of the command delays. None if the fixed delays are used"""
+
+        self.cache = cache
+        """The cache of the monitor responses. None if the responses are not cached"""
+
+        self.clock = clock or SystemClock()
+        """The clock used to wait for the chamber"""
 
-        self._chamber.write_termination = self.LINE_TERMINATION
-        self._chamber.read_termination = self.LINE_TERMINATION
-        self._chamber.timeout = communication_timeout or 5000
+        if cache is not None and cache.clock is None:
+            cache.clock = self.clock
 
-    def _target_temperature_reached(self) -> bool:
+        self.metrics = metrics
+        """The metrics of the exchanges. None if they are not recorded"""
+
+        self.hooks: list[CommandHook] = list(hooks or ())
+        """The hooks called before and after every command, including `metrics`"""
+        if metrics is not None:
+            self.hooks.append(metrics)
+
+        self._target_temperature: Optional[float] = None
+        self._target_humidity: Optional[float] = None
+
+        self.telemetry: Optional[TelemetrySampler] = None
+        """The telemetry sampler of the chamber. None if it was not started"""
+
+        # serializes the exchanges, as the telemetry sampler shares the connection
+        self._lock = threading.RLock()
+
+        self._dispatcher: Optional["CommandDispatcher"] = None
+        if thread_safe:
+            # imported here, so only thread-safe chambers load concurrent.futures
+            from .dispatcher import CommandDispatcher
+
+            self._dispatcher = CommandDispatcher(transport)
+
+        if not lazy_connect:
+            # we try to connect to the environmental chamber just to see if there is
+            # an error
+            self.connect()
+
+    def connect(self):
         """
-        Checks if the current temperature is within the target temperature range.
+        Opens the connection to the environmental chamber, if not open yet. It is only
+        needed with `lazy_connect`, to connect before the first command.
         """
-        temperature_status = self.get_temperature_status()
-        current = temperature_status.current_temperature
-        target = temperature_status.target_temperature
+        with self._lock:
+            self._transport.open()
 
-        _LOGGER.debug(
-            f"Current temperature: {current}°C, Target temperature: {target} +-"
-            f"{self.temperature_accuracy}°C"
-        )
-        return abs(current - target) <= self.temperature_accuracy
+    def _query(self, command: str, delay: float, decode: Callable[[str], _T]) -> _T:
+        """
+        Sends a command to the environmental chamber and decodes its response.
+
+        Args:
+            `command`: The command to send.
+            `delay`: The fixed delay in seconds between writing the command and reading
+                the response.
+            `decode`: Decodes or verifies the response, raising `MonitorError` or
+                `SettingError` if it is malformed.
+        """
+        if self.hooks or spans.enabled():
+            return self._instrumented_query(command, delay, decode)
+
+        response = None if self.cache is None else self.cache.get(command)
+        if response is None:
+            response = self._exchange(command, delay)
 
-    def _target_humidity_reached(self) -> bool:
+        return self._decode(command, delay, decode, response)
+
+    def _exchange(self, command: str, delay: float) -> str:
         """
-        Checks if the current humidity is within the target humidity range. If the
-        humidity control is disabled, it always returns True.
+        Sends a command to the environmental chamber and reads its response, with the
+        fixed delay or the one given by the pacer, or through the dispatcher. The
+        response is cached.
         """
-        humidity_status = self.get_humidity_status()
-        current = humidity_status.current_humidity
-        target = humidity_status.target_humidity
+        try:
+            if self._dispatcher is not None:
+                response = self._dispatcher.query(command, delay)
+            else:
+                with self._lock:
+                    if self.pacer is None:
+                        response = self._transport.query(command, delay=delay)
+                    else:
+                        response = self._paced_query(command, delay)
+        except Exception:
+            # a setting command may have been applied even if its response was lost
+            if self.cache is not None:
+                self.cache.invalidate_changed_by(command)
+            raise
+
+        if self.cache is not None:
+            self.cache.update(command, response)
+        return response
 
-        if target is None:
-            _LOGGER.debug("Humidity control is disabled")
-            return True
+    def _decode(
+        self, command: str, delay: float, decode: Callable[[str], _T], response: str
+    ) -> _T:
+        """
+        Decodes the response to a command.
+        """
+        try:
+            return decode(response)
+        except (MonitorError, SettingError):
+            # a malformed response may come from reading too early
+            if self.pacer is not None:
+                self.pacer.record_failure(command, delay)
+            if self.cache is not None:
+                self.cache.invalidate(command)
+            raise
+
+    def _instrumented_query(
+        self, command: str, delay: float, decode: Callable[[str], _T]
+    ) -> _T:
+        """
+        Same as `_query`, calling the hooks and recording spans around the exchange.
+        """
+        event = CommandEvent(self.resource_path, command, None, 0.0, 0.0)
+
+        with spans.span(
+            spans.COMMAND_SPAN, chamber=self.resource_path, command=command
+        ):
+            try:
+                self._call_hooks("before_command", self.resource_path, command)
+
+                event.response = None if self.cache is None else self.cache.get(command)
+                event.cached = event.response is not None
+
+                if event.response is None:
+                    if self.pacer is not None:
+                        event.delay = self.pacer.delay(command, delay)
+                    else:
+                        event.delay = delay
+
+                    io_start = time.perf_counter()
+                    try:
+                        with spans.span(spans.IO_SPAN):
+                            event.response = self._exchange(command, delay)
+                    finally:
+                        event.io_time = time.perf_counter() - io_start
+
+                parse_start = time.perf_counter()
+                try:
+                    with spans.span(spans.PARSE_SPAN):
+                        return self._decode(command, delay, decode, event.response)
+                finally:
+                    event.parse_time = time.perf_counter() - parse_start
+            except Exception as error:
+                event.error = error
+                raise
+            finally:
+                self._call_hooks("after_command", event)
+
+    def _call_hooks(self, method: str, *args):
+        for hook in self.hooks:
+            try:
+                getattr(hook, method)(*args)
+            except Exception as error:
+                _LOGGER.error(f"Command hook {hook!r} failed")
+                _LOGGER.debug(f"Error: '{error!r}'")
+
+    def _execute(
+        self, command: protocol.Command[_T], delay: float, value: Any = None
+    ) -> _T:
+        """
+        Sends a command of the protocol table and decodes its response.
 
-        _LOGGER.debug(
-            f"Current humidity: {current}%, Target humidity: {target} +-"
-            f"{self.humidity_accuracy}%"
+        Args:
+            `command`: The command to send.
+            `delay`: The fixed delay in seconds between writing the command and reading
+                the response.
+            `value`: The parameter of the command, if any.
+        """
+        return self._query(command.encode(value), delay, command.decode)
+
+    def _paced_query(self, command: str, delay: float) -> str:
+        """
+        Sends a command and reads its response, with the delay given by the pacer.
+        """
+        assert self.pacer is not None
+
+        waited = self.pacer.delay(command, delay)
+        try:
+            self._transport.write(command)
+            self.clock.sleep(waited)
+            read_start = time.perf_counter()
+            response = self._transport.read()
+            read_time = time.perf_counter() - read_start
+        except Exception:
+            self.pacer.record_failure(command, delay)
+            raise
+
+        self.pacer.record_success(command, delay, waited, read_time)
+        return response
+
+    def _verify_setpoints(self):
+        """
+        Verifies that the chamber reports the cached setpoints as its targets.
+
+        Raises:
+            `SettingError`: If a target does not match its setpoint.
+        """
+        assert self._target_temperature is not None
+
+        _verify_setpoints(
+            self.get_temperature_status(),
+            self.get_humidity_status(),
+            self._target_temperature,
+            self._target_humidity,
         )
-        return abs(current - target) <= self.humidity_accuracy
 
     def get_temperature_status(self) -> TemperatureStatus:
         """
@@ -134,31 +573,7 @@ class EspecPr3j:
             `MonitorError`: If an error occurred when getting the temperature status.
         """
         # send the request to the chamber
-        response = self._chamber.query("TEMP?", delay=self.MONITOR_COMMAND_DELAY)
-
-        # data format: [current temp, set temp, upper limit, lower limit]
-        pattern = re.compile(
-            r"(?P<current>\d+\.\d+)"
-            r",(?P<target>\d+\.\d+)"
-            r",(?P<upper>\d+\.\d+)"
-            r",(?P<lower>\d+\.\d+)"
-        )
-
-        match = pattern.match(response)
-        if match is None:
-            _LOGGER.error("Failed to get the temperature status")
-            _LOGGER.debug(f"Response: '{response}'")
-            raise MonitorError("Failed to get the temperature status")
-
-        # convert into float numbers
-        temperature_status = TemperatureStatus(
-            current_temperature=float(match["current"]),
-            target_temperature=float(match["target"]),
-            upper_limit=float(match["upper"]),
-            lower_limit=float(match["lower"]),
-        )
-
-        return temperature_status
+        return self._execute(protocol.TEMPERATURE_STATUS, self.MONITOR_COMMAND_DELAY)
 
     def get_humidity_status(self) -> HumidityStatus:
         """
@@ -169,36 +584,7 @@ class EspecPr3j:
             `MonitorError`: If an error occurred when getting the humidity status.
         """
         # send the request to the chamber
-        response = self._chamber.query("HUMI?", delay=self.MONITOR_COMMAND_DELAY)
-
-        # data format: [current humi, set humi, upper limit, lower limit]
-        pattern = re.compile(
-            r"(?P<current>\d+)"
-            r",(?P<target>OFF|\d+)"
-            r",(?P<upper>\d+)"
-            r",(?P<lower>\d+)"
-        )
-
-        match = pattern.match(response)
-        if match is None:
-            _LOGGER.error("Failed to get the temperature status")
-            _LOGGER.debug(f"Response: '{response}'")
-            raise MonitorError("Failed to get the humidity status")
-
-        if match["target"] == "OFF":
-            target_humidity = None
-        else:
-            target_humidity = float(match["target"])
-
-        # convert into float numbers
-        humidity_status = HumidityStatus(
-            current_humidity=float(match["current"]),
-            target_humidity=target_humidity,
-            upper_limit=float(match["upper"]),
-            lower_limit=float(match["lower"]),
-        )
-
-        return humidity_status
+        return self._execute(protocol.HUMIDITY_STATUS, self.MONITOR_COMMAND_DELAY)
 
     def set_target_temperature(self, temperature: float):
         """
@@ -213,17 +599,10 @@ class EspecPr3j:
         """
         # sets the temp of the chamber, temperature
         _LOGGER.debug(f"Setting target temperature to {temperature}°C")
-        response = self._chamber.query(
-            f"TEMP, S{temperature:.1f}",
-            delay=self.SETTING_COMMAND_DELAY,  # noqa E231
+        self._execute(
+            protocol.SET_TARGET_TEMPERATURE, self.SETTING_COMMAND_DELAY, temperature
         )
-
-        # verify the response
-        response_pattern = re.compile(r"OK:TEMP, S\d+.\d+")
-        if not response_pattern.match(response):
-            _LOGGER.error("Failed to set the target temperature")
-            _LOGGER.debug(f"Response: '{response}'")
-            raise SettingError("Failed to set the target temperature")
+        self._target_temperature = temperature
 
     def set_target_humidity(self, humidity: Optional[float] = None):
         """
@@ -239,55 +618,63 @@ class EspecPr3j:
         """
         if humidity is None:
             _LOGGER.debug("Disabling humidity control")
-            response = self._chamber.query(
-                "HUMI, SOFF", delay=self.SETTING_COMMAND_DELAY
-            )
-            response_pattern = re.compile(r"OK:HUMI, SOFF")
+            self._execute(protocol.DISABLE_HUMIDITY, self.SETTING_COMMAND_DELAY)
         else:
             # sets the humidity of the chamber, (float) humidity
             _LOGGER.debug(f"Setting target humidity to {humidity}%")
-            response = self._chamber.query(
-                f"HUMI, S{humidity}", delay=self.SETTING_COMMAND_DELAY
+            self._execute(
+                protocol.SET_TARGET_HUMIDITY, self.SETTING_COMMAND_DELAY, humidity
             )
-            response_pattern = re.compile(r"OK:HUMI, S\d+.*\d*")
-
-        # verify the response
-        if not response_pattern.match(response):
-            _LOGGER.error("Failed to set the target humidity")
-            _LOGGER.debug(f"Response: '{response}'")
-            raise SettingError("Failed to set the target humidity")
+        self._target_humidity = humidity
 
     def close(self):
         """
         Closes the connection to the environmental chamber.
         """
+        self.stop_telemetry()
+
         _LOGGER.debug("Closing the connection to the environmental chamber")
-        self._chamber.close()
+        if self._dispatcher is not None:
+            self._dispatcher.close()
+        else:
+            self._transport.close()
 
-    def get_test_area_state(self) -> TestAreaState:
+    def start_telemetry(
+        self,
+        interval: float = 1.0,
+        capacity: int = 24 * 60 * 60,
+        heaters: bool = True,
+    ) -> TelemetrySampler:
         """
-        Get the chamber test area state.
+        Starts sampling the test area state and the heaters in a background thread.
+        The samples are kept in a fixed-capacity ring buffer, available at
+        `telemetry.buffer`.
+
+        Args:
+            `interval`: The sampling interval in seconds. Default is 1.
+            `capacity`: The maximum number of samples kept. Default is one day at 1 Hz.
+            `heaters`: Whether to sample the heaters status. Default is True.
         """
-        response: str = self._chamber.query("MON?", delay=self.MONITOR_COMMAND_DELAY)
+        self.stop_telemetry()
 
-        # output data format: [temp, humid, op-state, num. of alarms]
-        pattern = re.compile(
-            r"(?P<temp>\d+\.\d+),(?P<humid>\d+),(?P<state>\w+),(?P<alarms>\d+)"
+        self.telemetry = TelemetrySampler(
+            self, interval=interval, capacity=capacity, heaters=heaters
         )
+        self.telemetry.start()
+        return self.telemetry
 
-        match = pattern.match(response)
-        if match is None:
-            _LOGGER.error("Failed to get the test area state")
-            _LOGGER.debug(f"Response: '{response}'")
-            raise MonitorError("Failed to get the test area state")
-
-        test_area_state = TestAreaState(
-            current_temperature=float(match["temp"]),
-            current_humidity=float(match["humid"]),
-            operation_state=OperationMode.from_str(match["state"]),
-            number_of_alarms=int(match["alarms"]),
-        )
-        return test_area_state
+    def stop_telemetry(self):
+        """
+        Stops the telemetry sampler, if running. The samples are kept.
+        """
+        if self.telemetry is not None:
+            self.telemetry.stop()
+
+    def get_test_area_state(self) -> TestAreaState:
+        """
+        Get the chamber test area state.
+        """
+        return self._execute(protocol.TEST_AREA_STATE, self.MONITOR_COMMAND_DELAY)
 
     def set_temperature_limits(self, upper_limit: float, lower_limit: float):
         """
@@ -304,21 +691,8 @@ class EspecPr3j:
         _LOGGER.debug(
             f"Setting temperature limits to {upper_limit}°C and {lower_limit}°C"
         )
-        response = self._chamber.query(f"TEMP, H{upper_limit: 0.1f}")
-
-        response_pattern = re.compile(r"OK:TEMP, H \d+.\d+")
-        if not response_pattern.match(response):
-            _LOGGER.error("Failed to set the upper temperature limit")
-            _LOGGER.debug(f"Response: '{response}'")
-            raise SettingError("Failed to set the upper temperature limit")
-
-        response = self._chamber.query(f"TEMP, L{lower_limit: 0.1f}")
-
-        response_pattern = re.compile(r"OK:TEMP, L \d+.\d+")
-        if not response_pattern.match(response):
-            _LOGGER.error("Failed to set the lower temperature limit")
-            _LOGGER.debug(f"Response: '{response}'")
-            raise SettingError("Failed to set the lower temperature limit")
+        self._execute(protocol.SET_UPPER_TEMPERATURE_LIMIT, 0.0, upper_limit)
+        self._execute(protocol.SET_LOWER_TEMPERATURE_LIMIT, 0.0, lower_limit)
 
     def set_humidity_limits(self, upper_limit: float, lower_limit: float):
         """
@@ -333,36 +707,14 @@ class EspecPr3j:
                 humidity limits.
         """
         _LOGGER.debug(f"Setting humidity limits to {upper_limit}% and {lower_limit}%")
-        response = self._chamber.query("HUMI, H" + str(upper_limit))
-
-        response_pattern = re.compile(r"OK:HUMI, H\d+")
-        if not response_pattern.match(response):
-            _LOGGER.error("Failed to set the upper humidity limit")
-            _LOGGER.debug(f"Response: '{response}'")
-            raise SettingError("Failed to set the upper humidity limit")
-
-        response = self._chamber.query("HUMI, L" + str(lower_limit))
-
-        response_pattern = re.compile(r"OK:HUMI, L\d+")
-        if not response_pattern.match(response):
-            _LOGGER.error("Failed to set the lower humidity limit")
-            _LOGGER.debug(f"Response: '{response}'")
-            raise SettingError("Failed to set the lower humidity limit")
+        self._execute(protocol.SET_UPPER_HUMIDITY_LIMIT, 0.0, upper_limit)
+        self._execute(protocol.SET_LOWER_HUMIDITY_LIMIT, 0.0, lower_limit)
 
     def get_mode(self) -> OperationMode:
         """
         Gets the operation mode of the environmental chamber.
         """
-        response = self._chamber.query("MODE?", delay=self.MONITOR_COMMAND_DELAY)
-        pattern = re.compile(r"(?P<mode>\w+)")
-        match = pattern.match(response)
-
-        if match is None:
-            _LOGGER.error("Failed to get the operation mode")
-            _LOGGER.debug(f"Response: '{response}'")
-            raise MonitorError("Failed to get the operation mode")
-
-        return OperationMode.from_str(response)
+        return self._execute(protocol.MODE, self.MONITOR_COMMAND_DELAY)
 
     def set_mode(self, mode: OperationMode):
         """
@@ -373,93 +725,373 @@ class EspecPr3j:
         """
         # sets the mode of the chamber:
         _LOGGER.debug(f"Setting operation mode to {mode}")
-        response = self._chamber.query(
-            f"MODE, {mode}", delay=self.SETTING_COMMAND_DELAY
+        return self._query(
+            protocol.SET_MODE.encode(mode),
+            self.SETTING_COMMAND_DELAY,
+            partial(_verify_mode_response, mode=mode),
         )
 
-        response_pattern = re.compile(r"OK:MODE, (?P<mode>\w+)")
-        match = response_pattern.match(response)
-        if match is None:
-            _LOGGER.error("Failed to set the operation mode")
-            _LOGGER.debug(f"Response: '{response}'")
-            raise SettingError("Failed to set the operation mode")
+    def apply(self, settings: ChamberSettings, verify: bool = True) -> list[str]:
+        """
+        Brings the chamber to a desired state, sending only the setting commands whose
+        value differs from the current one. The current state is read with the
+        `TEMP?`, `HUMI?` and `MODE?` queries the settings need, which come from the
+        cache, if any, when still valid.
 
-        set_mode = OperationMode.from_str(match["mode"])
-        if set_mode != mode:
-            _LOGGER.error(
-                f"Operation mode not set correctly"
-                f" (current: {match['mode']}, expected: {mode})"
+        The commands are sent in a safe order: first the `STANDBY` or `OFF` mode, then
+        the limits, then the targets, and last any other mode, so the chamber only
+        starts once configured.
+
+        Args:
+            `settings`: The desired settings. Those left as None are not changed.
+            `verify`: Whether to read back the changed settings once all the commands
+                were sent. Default is True.
+
+        Returns:
+            The commands sent.
+
+        Raises:
+            `ValueError`: If the settings set the `RUN` mode.
+            `SettingError`: If a command failed, or a setting read back does not match.
+        """
+        if settings.mode == OperationMode.RUN:
+            raise ValueError("Programs can not be applied, use run_program instead")
+
+        temperature_needed = any(
+            value is not None
+            for value in (
+                settings.temperature,
+                settings.upper_temperature_limit,
+                settings.lower_temperature_limit,
             )
-            _LOGGER.debug(f"Response: '{response}'")
-            _LOGGER.debug(f"Mode: '{match['mode']}'")
-            raise SettingError("Failed to set the operation mode")
+        )
+        humidity_needed = not settings.humidity_control or any(
+            value is not None
+            for value in (
+                settings.humidity,
+                settings.upper_humidity_limit,
+                settings.lower_humidity_limit,
+            )
+        )
 
-        return response
+        temperature_status = None
+        if temperature_needed:
+            temperature_status = self.get_temperature_status()
+        humidity_status = None
+        if humidity_needed:
+            humidity_status = self.get_humidity_status()
+        mode = None if settings.mode is None else self.get_mode()
+
+        steps: list[tuple[str, Callable[[], Any]]] = []
+
+        def add_step(command: protocol.Command, value: Any, action: Callable):
+            steps.append((command.encode(value), action))
+
+        stop = settings.mode in (OperationMode.STANDBY, OperationMode.OFF)
+        if settings.mode is not None and settings.mode != mode and stop:
+            add_step(
+                protocol.SET_MODE, settings.mode, partial(self.set_mode, settings.mode)
+            )
+
+        limits = []
+        if temperature_status is not None:
+            limits += _limit_commands(
+                (
+                    protocol.SET_UPPER_TEMPERATURE_LIMIT,
+                    protocol.SET_LOWER_TEMPERATURE_LIMIT,
+                ),
+                (temperature_status.upper_limit, temperature_status.lower_limit),
+                (settings.upper_temperature_limit, settings.lower_temperature_limit),
+                _same_temperature,
+            )
+        if humidity_status is not None:
+            limits += _limit_commands(
+                (protocol.SET_UPPER_HUMIDITY_LIMIT, protocol.SET_LOWER_HUMIDITY_LIMIT),
+                (humidity_status.upper_limit, humidity_status.lower_limit),
+                (settings.upper_humidity_limit, settings.lower_humidity_limit),
+                _same_humidity,
+            )
+        for command, value in limits:
+            add_step(command, value, partial(self._execute, command, 0.0, value))
+
+        if settings.temperature is not None:
+            assert temperature_status is not None
+            if _same_temperature(
+                temperature_status.target_temperature, settings.temperature
+            ):
+                self._target_temperature = settings.temperature
+            else:
+                add_step(
+                    protocol.SET_TARGET_TEMPERATURE,
+                    settings.temperature,
+                    partial(self.set_target_temperature, settings.temperature),
+                )
+
+        if humidity_status is not None:
+            target = humidity_status.target_humidity
+            if not settings.humidity_control:
+                if target is None:
+                    self._target_humidity = None
+                else:
+                    add_step(
+                        protocol.DISABLE_HUMIDITY,
+                        None,
+                        partial(self.set_target_humidity, None),
+                    )
+            elif settings.humidity is not None:
+                if _same_humidity(target, settings.humidity):
+                    self._target_humidity = settings.humidity
+                else:
+                    add_step(
+                        protocol.SET_TARGET_HUMIDITY,
+                        settings.humidity,
+                        partial(self.set_target_humidity, settings.humidity),
+                    )
+
+        if settings.mode is not None and settings.mode != mode and not stop:
+            add_step(
+                protocol.SET_MODE, settings.mode, partial(self.set_mode, settings.mode)
+            )
+
+        if not steps:
+            _LOGGER.debug("The chamber already has the desired settings")
+            return []
+
+        sent = []
+        for request, action in steps:
+            _LOGGER.debug(f"Applying '{request}'")
+            action()
+            sent.append(request)
+
+        if verify:
+            # a single readback of the statuses that changed
+            _verify_settings(
+                settings,
+                self.get_temperature_status()
+                if any(request.startswith("TEMP") for request in sent)
+                else None,
+                self.get_humidity_status()
+                if any(request.startswith("HUMI") for request in sent)
+                else None,
+                self.get_mode()
+                if any(request.startswith("MODE") for request in sent)
+                else None,
+            )
+
+        return sent
+
+    def _apply_constant_condition(self, temperature: float, humidity: Optional[float]):
+        """
+        Sets the setpoints and the constant mode, and verifies the targets once.
+
+        Raises:
+            `SettingError`: If an error occurred when setting the condition, or the
+                chamber does not report the setpoints as its targets.
+        """
+        _LOGGER.debug(f"Setting constant condition {temperature}°C, {humidity}%")
+
+        self.set_target_temperature(temperature)
+        self.set_target_humidity(humidity)
+        self.set_mode(OperationMode.CONSTANT)
+
+        # the targets are verified once, the polling only checks the current values
+        self._verify_setpoints()
 
     def set_constant_condition(
         self,
         temperature: float,
         humidity: Optional[float] = None,
-        stable_time=60.0,
+        stable_time: Optional[float] = None,
         poll_interval=1.0,
+        timeout: Optional[float] = None,
+        detector: Optional["StabilityDetector"] = None,
+        max_poll_interval: Optional[float] = None,
     ):
         """
         Sets the environmental chamber to a constant temperature and humidity condition
-        and waits until the setpoints are reached and stable.
+        and waits until the setpoints are reached and stable. Each check takes a single
+        `MON?` query, and the checks are spread by the distance to the setpoints.
 
         Args:
             `temperature`: The temperature to set in Celsius.
             `humidity`: The humidity to set in percentage. Default is None (humidity
                 control is disabled)
             `stable_time`: The time in seconds to wait until the setpoints are stable.
-                Default is 60.
-            `poll_interval`: The time in seconds to wait between each check.
+                Default is 60. It can not be given together with a `detector`, which
+                sets its own.
+            `poll_interval`: The minimum time in seconds to wait between each check.
                 Default is 1.
+            `timeout`: The maximum time in seconds to wait for the setpoints to be
+                stable. If None, the wait never times out. Default is None.
+            `detector`: The stability detector, e.g. a `WindowStabilityDetector`.
+                Default is a `BandStabilityDetector`: every check must be within the
+                accuracy for `stable_time`.
+            `max_poll_interval`: The maximum time in seconds to wait between each
+                check. The checks are spread while the setpoints are far, and get
+                denser as they are approached (see `ConditionWaiter`). Default is 60
+                times `poll_interval`.
+
+        Raises:
+            `SettingError`: If an error occurred when setting the condition, or the
+                chamber does not report the setpoints as its targets.
+            `TimeoutError`: If the setpoints were not stable before the timeout.
+            `ValueError`: If both `stable_time` and `detector` are given.
         """
-        _LOGGER.debug(f"Setting constant condition {temperature}°C, {humidity}%")
+        from .conditions import ConditionWaiter
 
-        self.set_target_temperature(temperature)
-        self.set_target_humidity(humidity)
-        self.set_mode(OperationMode.CONSTANT)
+        waiter = ConditionWaiter(
+            self, stable_time, poll_interval, timeout, detector, max_poll_interval
+        )
 
-        start_time = time.time()
+        self._apply_constant_condition(temperature, humidity)
 
         _LOGGER.debug("Waiting for the setpoints to be reached")
+        while (delay := waiter.step()) is not None:
+            self.clock.sleep(delay)
 
-        while True:
-            stable = (
-                self._target_temperature_reached() and self._target_humidity_reached()
-            )
-            if not stable:
-                _LOGGER.debug("Setpoints not reached yet")
-                start_time = time.time()
+    def start_constant_condition(
+        self,
+        temperature: float,
+        humidity: Optional[float] = None,
+        stable_time: Optional[float] = None,
+        poll_interval: float = 1.0,
+        timeout: Optional[float] = None,
+        detector: Optional["StabilityDetector"] = None,
+        max_poll_interval: Optional[float] = None,
+        progress_callback: Optional["ProgressCallback"] = None,
+        scheduler: Optional["PollScheduler"] = None,
+    ) -> "ConditionFuture":
+        """
+        Non-blocking version of `set_constant_condition`. The condition is set and
+        polled on a scheduler, shared by all the chambers in real time, and a future is
+        returned right away. The future can be cancelled, and reports the progress
+        after every poll (errors, stable time and estimated time left).
 
-            if time.time() - start_time >= stable_time:
-                _LOGGER.debug("Setpoints reached and stable")
-                break
+        Args:
+            `temperature`: The temperature to set in Celsius.
+            `humidity`: The humidity to set in percentage. Default is None (humidity
+                control is disabled)
+            `stable_time`: The time in seconds to wait until the setpoints are stable.
+                Default is 60. It can not be given together with a `detector`, which
+                sets its own.
+            `poll_interval`: The minimum time in seconds to wait between each check.
+                Default is 1.
+            `timeout`: The maximum time in seconds to wait for the setpoints to be
+                stable. If None, the wait never times out. Default is None.
+            `detector`: The stability detector, e.g. a `WindowStabilityDetector`.
+                Default is a `BandStabilityDetector`: every check must be within the
+                accuracy for `stable_time`.
+            `max_poll_interval`: The maximum time in seconds to wait between each
+                check. The checks are spread while the setpoints are far, and get
+                denser as they are approached (see `ConditionWaiter`). Default is 60
+                times `poll_interval`.
+            `progress_callback`: A function called with the `ConditionProgress` after
+                every poll. Default is None.
+            `scheduler`: The scheduler running the polls, on the clock of the chamber
+                (e.g. `PollScheduler(clock=clock)` with a `VirtualClock`). Default is
+                the shared one, in real time.
+
+        The future fails with the errors of `set_constant_condition`.
 
-            time.sleep(poll_interval)
+        Raises:
+            `ValueError`: If both `stable_time` and `detector` are given, or the
+                scheduler does not run on the clock of the chamber.
+        """
+        from .conditions import ConditionWaiter
+        from .scheduler import PollScheduler
 
-    def get_heater_percentage(self) -> HeatersStatus:
+        waiter = ConditionWaiter(
+            self, stable_time, poll_interval, timeout, detector, max_poll_interval
+        )
+        return waiter.schedule(
+            scheduler or PollScheduler.default(),
+            setup=partial(self._apply_constant_condition, temperature, humidity),
+            progress_callback=progress_callback,
+        )
+
+    def write_program(self, number: int, program: "Program"):
         """
-        Gets the output of the heaters
+        Writes a program to the program memory of the environmental chamber,
+        replacing the program stored with the same number.
+
+        Args:
+            `number`: The number of the program.
+            `program`: The program to write.
+
+        Raises:
+            `ValueError`: If the program can not be encoded.
+            `SettingError`: If an error occurred when writing the program. The edition
+                is cancelled, so the stored program is left unchanged.
         """
-        response = self._chamber.query("%?", delay=self.MONITOR_COMMAND_DELAY)
+        _LOGGER.debug(f"Writing program {number} of {len(program.steps)} steps")
+
+        try:
+            for parameters in program.encode(number):
+                response = self._execute(
+                    protocol.PROGRAM_WRITE,
+                    self.PROGRAM_SETTING_COMMAND_DELAY,
+                    parameters,
+                )
+                if response != parameters:
+                    _LOGGER.error(
+                        f"Program not written correctly (current: '{response}', "
+                        f"expected: '{parameters}')"
+                    )
+                    raise SettingError("Failed to write the program")
+        except SettingError:
+            self._cancel_program_edit(number)
+            raise
+
+    def _cancel_program_edit(self, number: int):
+        """
+        Cancels the edition of a program, ignoring errors.
+        """
+        try:
+            self._execute(
+                protocol.PROGRAM_WRITE,
+                self.PROGRAM_SETTING_COMMAND_DELAY,
+                f"{number}, EDIT CANCEL",
+            )
+        except SettingError:
+            _LOGGER.debug(f"Failed to cancel the edition of program {number}")
 
-        pattern = re.compile(r"\d+,(?P<temp>\d+\.\d+),(?P<humid>\d+\.\d+)")
-        match = pattern.match(response)
+    def run_program(self, number: int):
+        """
+        Starts a program stored in the environmental chamber. The chamber goes into
+        `RUN` mode and runs the steps by itself.
 
-        if match is None:
-            _LOGGER.error("Failed to get the heaters status")
-            _LOGGER.debug(f"Response: '{response}'")
-            raise MonitorError("Failed to get the heaters status")
+        Args:
+            `number`: The number of the program.
 
-        heaters = HeatersStatus(
-            temperature_heater=float(match["temp"]),
-            humidity_heater=float(match["humid"]),
+        Raises:
+            `SettingError`: If the program could not be started.
+        """
+        _LOGGER.debug(f"Running program {number}")
+        running = self._execute(
+            protocol.RUN_PROGRAM, self.PROGRAM_SETTING_COMMAND_DELAY, number
         )
+        if running != number:
+            _LOGGER.error(
+                f"Program not started correctly (current: {running}, "
+                f"expected: {number})"
+            )
+            raise SettingError("Failed to run the program")
+
+    def get_program_state(self) -> ProgramState:
+        """
+        Gets the state of the program running: its number, the step running, the time
+        left in the step and the repetitions left.
+
+        Raises:
+            `MonitorError`: If no program is running or the response is malformed.
+        """
+        return self._execute(protocol.PROGRAM_STATE, self.PROGRAM_MONITOR_COMMAND_DELAY)
 
-        return heaters
+    def get_heater_percentage(self) -> HeatersStatus:
+        """
+        Gets the output of the heaters
+        """
+        return self._execute(protocol.HEATERS_STATUS, self.MONITOR_COMMAND_DELAY)
 
     def __del__(self):
         self.close()
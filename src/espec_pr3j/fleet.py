@@ -0,0 +1,150 @@
+import contextvars
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Mapping, Optional, TypeVar, Union
+
+from .data_classes import ChamberSnapshot, FleetSnapshot
+from .espec_pr3j import EspecPr3j
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+class ChamberFleet:
+    """
+    Monitors many environmental chambers concurrently.
+
+    Each chamber is polled from a bounded thread pool, so a poll of the whole fleet
+    takes about as long as the slowest single chamber instead of the sum of all of
+    them. Commands to the same chamber are still sent one after the other. Chambers
+    created with `lazy_connect` are connected concurrently as well, on the first poll
+    or with `connect`.
+
+    Args:
+        `chambers`: The chambers of the fleet. Either a mapping of names to chambers,
+            or an iterable of chambers, in which case their resource paths are used as
+            names.
+        `max_workers (Optional[int])`: The maximum number of chambers polled at the same
+            time. Default is the number of chambers, capped to `MAX_WORKERS`.
+    """
+
+    MAX_WORKERS = 64
+    """The default upper bound of the number of polling threads"""
+
+    def __init__(
+        self,
+        chambers: Union[Mapping[str, EspecPr3j], Iterable[EspecPr3j]],
+        max_workers: Optional[int] = None,
+    ):
+        if not isinstance(chambers, Mapping):
+            chambers = {chamber.resource_path: chamber for chamber in chambers}
+
+        self.chambers: dict[str, EspecPr3j] = dict(chambers)
+        """The chambers of the fleet, by name"""
+
+        workers = max_workers or min(max(len(self.chambers), 1), self.MAX_WORKERS)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="espec_pr3j_fleet"
+        )
+
+    def __enter__(self) -> "ChamberFleet":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def connect(self):
+        """
+        Opens the connections to all the chambers of the fleet concurrently. Useful
+        with chambers created with `lazy_connect`.
+
+        Raises:
+            `Exception`: The first error found, after all the connections were tried.
+        """
+        futures = [self._submit(chamber.connect) for chamber in self.chambers.values()]
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+
+    def _submit(self, function: Callable[..., _T], *args) -> "Future[_T]":
+        """
+        Runs a function on the pool, in a copy of the current context so context
+        variables like the current span are kept.
+        """
+        return self._executor.submit(contextvars.copy_context().run, function, *args)
+
+    def poll(
+        self,
+        test_area: bool = True,
+        temperature: bool = True,
+        humidity: bool = True,
+        heaters: bool = True,
+    ) -> FleetSnapshot:
+        """
+        Polls all the chambers of the fleet concurrently. A chamber that fails does not
+        affect the others: its error is reported in the snapshot instead.
+
+        Args:
+            `test_area`: Whether to read the test area state (`MON?`).
+            `temperature`: Whether to read the temperature status (`TEMP?`).
+            `humidity`: Whether to read the humidity status (`HUMI?`).
+            `heaters`: Whether to read the heaters status (`%?`).
+        """
+        snapshot = FleetSnapshot(timestamp=time.time())
+
+        futures = {
+            name: self._submit(
+                self._poll_chamber, chamber, test_area, temperature, humidity, heaters
+            )
+            for name, chamber in self.chambers.items()
+        }
+
+        for name, future in futures.items():
+            try:
+                snapshot.chambers[name] = future.result()
+            except Exception as error:
+                _LOGGER.error(f"Failed to poll the environmental chamber {name}")
+                _LOGGER.debug(f"Error: '{error!r}'")
+                snapshot.errors[name] = error
+
+        return snapshot
+
+    @staticmethod
+    def _poll_chamber(
+        chamber: EspecPr3j,
+        test_area: bool,
+        temperature: bool,
+        humidity: bool,
+        heaters: bool,
+    ) -> ChamberSnapshot:
+        """
+        Reads the requested values of a single chamber.
+        """
+        snapshot = ChamberSnapshot()
+
+        if test_area:
+            snapshot.test_area = chamber.get_test_area_state()
+        if temperature:
+            snapshot.temperature = chamber.get_temperature_status()
+        if humidity:
+            snapshot.humidity = chamber.get_humidity_status()
+        if heaters:
+            snapshot.heaters = chamber.get_heater_percentage()
+
+        return snapshot
+
+    def close(self, close_chambers: bool = False):
+        """
+        Stops the polling threads.
+
+        Args:
+            `close_chambers`: Whether to also close the connections to the chambers.
+        """
+        self._executor.shutdown(wait=True)
+
+        if close_chambers:
+            for chamber in self.chambers.values():
+                chamber.close()
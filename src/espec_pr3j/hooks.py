@@ -0,0 +1,28 @@
+from .data_classes import CommandEvent
+
+
+class CommandHook:
+    """
+    Receives the commands sent through an `EspecPr3j`, e.g. to profile or log them.
+    Subclasses override the methods they need; both do nothing by default.
+
+    The methods are called from the thread sending the command, so they should return
+    quickly. Errors raised by them are logged.
+    """
+
+    def before_command(self, chamber: str, command: str):
+        """
+        Called before a command is sent, or looked up in the cache.
+
+        Args:
+            `chamber`: The resource path of the chamber.
+            `command`: The command.
+        """
+
+    def after_command(self, event: CommandEvent):
+        """
+        Called once the response to a command is decoded, or the exchange failed.
+
+        Args:
+            `event`: The exchange.
+        """
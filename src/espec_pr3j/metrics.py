@@ -0,0 +1,319 @@
+import bisect
+import logging
+import math
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
+
+from . import protocol
+from .data_classes import CommandEvent, CommandStatistics
+from .hooks import CommandHook
+from .transports import LINE_TERMINATION
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+_LOGGER = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+"""The content type of the OpenMetrics text exposition"""
+
+
+@dataclass
+class _CommandState:
+    """
+    The accumulated measurements of one type of command sent to one chamber.
+    """
+
+    bucket_counts: list[int]
+    """The number of exchanges per latency bucket, not cumulative"""
+
+    latency_sum: float = 0.0
+    delay_sum: float = 0.0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    errors: dict[str, int] = field(default_factory=dict)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == math.inf else repr(bound)
+
+
+class CommandMetrics(CommandHook):
+    """
+    Collects the latency, errors and traffic of the commands sent to environmental
+    chambers. Pass it as the `metrics` of one or more `EspecPr3j` to instrument every
+    exchange with the chamber; cached responses are not counted.
+
+    The measurements are kept per chamber (its resource path) and per command type
+    (the header without parameters, e.g. `TEMP` for `TEMP, S23.0`). They can be pulled
+    with `statistics`, or exposed in the OpenMetrics text format with `exposition`
+    and a `MetricsServer`.
+
+    Args:
+        `buckets (Optional[tuple[float, ...]])`: The upper bounds in seconds of the
+            latency histogram buckets. Default is `DEFAULT_BUCKETS`.
+    """
+
+    DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0)
+    """The default upper bounds in seconds of the latency buckets, around the fixed
+    command delays"""
+
+    PREFIX = "espec_pr3j"
+    """The prefix of the exposed metric names"""
+
+    def __init__(self, buckets: Optional[tuple[float, ...]] = None):
+        bounds = sorted(self.DEFAULT_BUCKETS if buckets is None else buckets)
+        self.buckets: tuple[float, ...] = tuple(bounds) + (math.inf,)
+        """The upper bounds in seconds of the latency buckets, ending with infinity"""
+
+        self._states: dict[tuple[str, str], _CommandState] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        chamber: str,
+        command: str,
+        latency: float,
+        delay: float,
+        bytes_sent: int,
+        bytes_received: int,
+        error: Optional[BaseException] = None,
+    ):
+        """
+        Records an exchange with a chamber.
+
+        Args:
+            `chamber`: The resource path of the chamber.
+            `command`: The command sent.
+            `latency`: The time in seconds from sending the command to decoding the
+                response, or to the error.
+            `delay`: The time in seconds waited before reading the response.
+            `bytes_sent`: The number of bytes written.
+            `bytes_received`: The number of bytes read.
+            `error`: The error of the exchange, if it failed.
+        """
+        key = (chamber, protocol.command_type(command))
+        bucket = bisect.bisect_left(self.buckets, latency)
+
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = _CommandState(bucket_counts=[0] * len(self.buckets))
+                self._states[key] = state
+
+            state.bucket_counts[bucket] += 1
+            state.latency_sum += latency
+            state.delay_sum += delay
+            state.bytes_sent += bytes_sent
+            state.bytes_received += bytes_received
+            if error is not None:
+                error_type = type(error).__name__
+                state.errors[error_type] = state.errors.get(error_type, 0) + 1
+
+    def statistics(self, chamber: Optional[str] = None) -> list[CommandStatistics]:
+        """
+        Returns the statistics of every command type, sorted by chamber and command.
+
+        Args:
+            `chamber`: If given, only the statistics of the chamber with this resource
+                path are returned.
+        """
+        statistics = []
+        with self._lock:
+            for (name, command), state in sorted(self._states.items()):
+                if chamber is not None and name != chamber:
+                    continue
+
+                cumulative = 0
+                buckets = []
+                for bound, count in zip(self.buckets, state.bucket_counts):
+                    cumulative += count
+                    buckets.append((bound, cumulative))
+
+                statistics.append(
+                    CommandStatistics(
+                        chamber=name,
+                        command=command,
+                        count=cumulative,
+                        latency_sum=state.latency_sum,
+                        delay_sum=state.delay_sum,
+                        buckets=tuple(buckets),
+                        errors=dict(state.errors),
+                        bytes_sent=state.bytes_sent,
+                        bytes_received=state.bytes_received,
+                    )
+                )
+        return statistics
+
+    def reset(self):
+        """
+        Drops all the measurements.
+        """
+        with self._lock:
+            self._states.clear()
+
+    def after_command(self, event: CommandEvent):
+        if event.cached:
+            return
+
+        termination = len(LINE_TERMINATION)
+        self.record(
+            event.chamber,
+            event.command,
+            latency=event.io_time + event.parse_time,
+            delay=event.delay,
+            bytes_sent=len(event.command) + termination,
+            bytes_received=0
+            if event.response is None
+            else len(event.response) + termination,
+            error=event.error,
+        )
+
+    def exposition(self) -> str:
+        """
+        Returns all the measurements in the OpenMetrics text format.
+        """
+        prefix = self.PREFIX
+        latency = [
+            f"# TYPE {prefix}_command_duration_seconds histogram",
+            f"# UNIT {prefix}_command_duration_seconds seconds",
+            f"# HELP {prefix}_command_duration_seconds Time from sending a command "
+            "to decoding its response.",
+        ]
+        delay = [
+            f"# TYPE {prefix}_command_delay_seconds counter",
+            f"# UNIT {prefix}_command_delay_seconds seconds",
+            f"# HELP {prefix}_command_delay_seconds Time waited before reading the "
+            "responses.",
+        ]
+        errors = [
+            f"# TYPE {prefix}_command_errors counter",
+            f"# HELP {prefix}_command_errors Failed exchanges.",
+        ]
+        sent = [
+            f"# TYPE {prefix}_sent_bytes counter",
+            f"# UNIT {prefix}_sent_bytes bytes",
+            f"# HELP {prefix}_sent_bytes Bytes written to the chambers.",
+        ]
+        received = [
+            f"# TYPE {prefix}_received_bytes counter",
+            f"# UNIT {prefix}_received_bytes bytes",
+            f"# HELP {prefix}_received_bytes Bytes read from the chambers.",
+        ]
+
+        for stats in self.statistics():
+            labels = (
+                f'chamber="{_escape(stats.chamber)}",command="{_escape(stats.command)}"'
+            )
+
+            for bound, count in stats.buckets:
+                latency.append(
+                    f"{prefix}_command_duration_seconds_bucket"
+                    f'{{{labels},le="{_format_bound(bound)}"}} {count}'
+                )
+            latency.append(
+                f"{prefix}_command_duration_seconds_count{{{labels}}} {stats.count}"
+            )
+            latency.append(
+                f"{prefix}_command_duration_seconds_sum{{{labels}}} "
+                f"{stats.latency_sum!r}"
+            )
+            delay.append(
+                f"{prefix}_command_delay_seconds_total{{{labels}}} {stats.delay_sum!r}"
+            )
+            for error_type, count in sorted(stats.errors.items()):
+                errors.append(
+                    f"{prefix}_command_errors_total"
+                    f'{{{labels},error="{_escape(error_type)}"}} {count}'
+                )
+            sent.append(f"{prefix}_sent_bytes_total{{{labels}}} {stats.bytes_sent}")
+            received.append(
+                f"{prefix}_received_bytes_total{{{labels}}} {stats.bytes_received}"
+            )
+
+        lines = latency + delay + errors + sent + received + ["# EOF"]
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    Serves the metrics of a `CommandMetrics` over HTTP, in the OpenMetrics text
+    format, from a background thread. Any path returns the metrics.
+
+    Args:
+        `metrics (CommandMetrics)`: The metrics to serve.
+        `port (int)`: The TCP port to listen on. If 0, a free port is picked and set in
+            `port` once started. Default is 0.
+        `address (str)`: The address to listen on. Default is `127.0.0.1`, so the
+            metrics are only reachable from the local host.
+    """
+
+    def __init__(
+        self, metrics: CommandMetrics, port: int = 0, address: str = "127.0.0.1"
+    ):
+        self.metrics = metrics
+        self.port = port
+        self.address = address
+
+        self._server: Optional["ThreadingHTTPServer"] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "MetricsServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """
+        Starts serving the metrics. Does nothing if already started.
+        """
+        if self._server is not None:
+            return
+
+        # imported here so the chambers do not load the HTTP server
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.exposition().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                _LOGGER.debug(format % args)
+
+        self._server = ThreadingHTTPServer((self.address, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="espec_pr3j_metrics",
+            daemon=True,
+        )
+        self._thread.start()
+        _LOGGER.info(f"Serving the metrics on {self.address}:{self.port}")
+
+    def stop(self):
+        """
+        Stops serving the metrics.
+        """
+        if self._server is None:
+            return
+
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        self._server = None
+        self._thread = None
@@ -0,0 +1,195 @@
+import argparse
+import logging
+import socketserver
+import threading
+from typing import Optional
+
+from . import protocol
+from .dispatcher import CommandDispatcher
+from .espec_pr3j import EspecPr3j
+from .transports import ENCODING, LINE_TERMINATION, TCP_PORT, SocketTransport, Transport
+
+_LOGGER = logging.getLogger(__name__)
+
+ERROR_RESPONSE = "NA:CHAMBER ERR"
+"""The response sent to the clients when the chamber could not be queried"""
+
+
+def default_delay(command: str) -> float:
+    """
+    Returns the delay in seconds `EspecPr3j` waits for the response to a command.
+    """
+    try:
+        kind = protocol.parse_request(command)[0].kind
+    except ValueError:
+        return EspecPr3j.MONITOR_COMMAND_DELAY
+
+    program = command.startswith("PRGM") or command.startswith("MODE, RUN")
+    if kind == protocol.CommandKind.MONITOR:
+        if program:
+            return EspecPr3j.PROGRAM_MONITOR_COMMAND_DELAY
+        return EspecPr3j.MONITOR_COMMAND_DELAY
+
+    if program:
+        return EspecPr3j.PROGRAM_SETTING_COMMAND_DELAY
+    return EspecPr3j.SETTING_COMMAND_DELAY
+
+
+class _ClientHandler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def handle(self):
+        dispatcher = self.server.dispatcher
+        _LOGGER.debug(f"Client connected from {self.client_address}")
+
+        for line in self.rfile:
+            command = line.decode(ENCODING).rstrip(LINE_TERMINATION)
+            if not command:
+                continue
+
+            try:
+                response = dispatcher.query(command, default_delay(command))
+            except Exception as error:
+                _LOGGER.error(f"Failed to send '{command}' to the chamber")
+                _LOGGER.debug(f"Error: '{error!r}'")
+                response = ERROR_RESPONSE
+
+            self.wfile.write(f"{response}{LINE_TERMINATION}".encode(ENCODING))
+
+        _LOGGER.debug(f"Client disconnected from {self.client_address}")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple[str, int], dispatcher: CommandDispatcher):
+        super().__init__(address, _ClientHandler)
+        self.dispatcher = dispatcher
+
+
+class ChamberMultiplexer:
+    """
+    Shares a single session with an environmental chamber among many clients. It
+    listens on a local TCP port and speaks the PR-3J protocol, so clients connect to it
+    as if it was the chamber:
+
+        EspecPr3j(
+            transport=SocketTransport("localhost", multiplexer.port, skip_delays=True)
+        )
+
+    The multiplexer waits the command delays of `EspecPr3j` before reading from the
+    chamber, so the clients should skip them, otherwise every command waits twice.
+
+    The commands of all the clients are sent through a `CommandDispatcher`: setting
+    commands go before the pending monitor commands, and identical monitor commands
+    of different clients are sent once. When the chamber can not be reached, the
+    clients get `ERROR_RESPONSE`.
+
+    Args:
+        `transport (Transport)`: The transport to the chamber.
+        `port (int)`: The TCP port to listen on. If 0, a free port is picked and set in
+            `port` once started. Default is 0.
+        `address (str)`: The address to listen on. Default is `127.0.0.1`, so only
+            local clients are served.
+    """
+
+    def __init__(self, transport: Transport, port: int = 0, address: str = "127.0.0.1"):
+        self.port = port
+        self.address = address
+
+        self.dispatcher = CommandDispatcher(transport)
+        """The dispatcher of the commands to the chamber"""
+
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "ChamberMultiplexer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """
+        Starts serving the clients from a background thread. Does nothing if already
+        started.
+        """
+        if self._server is not None:
+            return
+
+        self._server = _Server((self.address, self.port), self.dispatcher)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="espec_pr3j_multiplexer",
+            daemon=True,
+        )
+        self._thread.start()
+        _LOGGER.info(
+            f"Multiplexing {self.dispatcher.transport.resource_path} on "
+            f"{self.address}:{self.port}"
+        )
+
+    def serve_forever(self):
+        """
+        Serves the clients from the calling thread until interrupted.
+        """
+        self.start()
+        assert self._thread is not None
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            _LOGGER.info("Interrupted")
+        finally:
+            self.stop()
+
+    def stop(self):
+        """
+        Stops serving the clients and closes the session with the chamber.
+        """
+        if self._server is None:
+            return
+
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        self._server = None
+        self._thread = None
+        self.dispatcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Shares a single session with an Espec PR-3J chamber among many "
+        "local clients"
+    )
+    parser.add_argument("hostname", help="Host name of the environmental chamber")
+    parser.add_argument(
+        "--chamber-port",
+        type=int,
+        default=TCP_PORT,
+        help="TCP port of the environmental chamber (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=TCP_PORT,
+        help="TCP port to serve the clients on (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--address",
+        default="127.0.0.1",
+        help="Address to serve the clients on (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    transport = SocketTransport(args.hostname, args.chamber_port)
+    ChamberMultiplexer(transport, args.port, args.address).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
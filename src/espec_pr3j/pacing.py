@@ -0,0 +1,170 @@
+import logging
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from . import protocol
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class _PacingState:
+    """
+    The pacing state of a single command type.
+    """
+
+    delay: float
+    """The delay currently applied between writing the command and reading"""
+
+    samples: deque = field(default_factory=deque)
+    """The measured response latencies, in seconds"""
+
+
+class CommandPacer:
+    """
+    Learns the delay to wait between writing a command and reading its response.
+
+    The fixed `MONITOR_COMMAND_DELAY` and `SETTING_COMMAND_DELAY` of `EspecPr3j` are
+    conservative. The pacer starts from them and keeps one state per command type,
+    which is the header of the command (e.g. `TEMP?`, `TEMP, S` or `TEMP, H`):
+
+    - When the response was already waiting once the delay expired, the delay was
+      longer than needed and it is shrunk by `shrink`.
+    - When the read had to block for the response, the actual latency is known and
+      recorded. The delay never shrinks below the `percentile` of the recorded
+      latencies times `margin`.
+    - On a timeout or a malformed response, the recorded latencies are dropped and
+      the delay backs off to the fixed default.
+
+    The delay is never longer than the fixed default, as the read blocks until the
+    response arrives anyway. Use one pacer per chamber.
+
+    Args:
+        `percentile (float)`: The percentile of the measured latencies, between 0 and
+            1, used as the minimum delay. Default is 0.95.
+        `margin (float)`: The factor applied to the percentile. Default is 1.2.
+        `shrink (float)`: The factor applied to the delay when the response was
+            already available. Default is 0.8.
+        `min_delay (float)`: The minimum delay in seconds. Default is 0.
+        `window (int)`: The number of latencies kept per command type. Default is 50.
+        `ready_threshold (float)`: Reads shorter than this time in seconds are
+            considered to have found the response already available. Default is 0.005.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        margin: float = 1.2,
+        shrink: float = 0.8,
+        min_delay: float = 0.0,
+        window: int = 50,
+        ready_threshold: float = 0.005,
+    ):
+        assert 0.0 < percentile <= 1.0
+        assert 0.0 < shrink < 1.0
+
+        self.percentile = percentile
+        self.margin = margin
+        self.shrink = shrink
+        self.min_delay = min_delay
+        self.window = window
+        self.ready_threshold = ready_threshold
+
+        self._states: dict[str, _PacingState] = {}
+
+    @staticmethod
+    def command_type(command: str) -> str:
+        """
+        Returns the type of a command, which is the header of the protocol command
+        (e.g. `TEMP, S` for `TEMP, S23.0`, distinct from `TEMP, H` for `TEMP, H80.0`).
+        """
+        return protocol.request_header(command)
+
+    def _state(self, command: str, default: float) -> _PacingState:
+        command_type = self.command_type(command)
+        state = self._states.get(command_type)
+        if state is None:
+            state = _PacingState(delay=default, samples=deque(maxlen=self.window))
+            self._states[command_type] = state
+        return state
+
+    def _latency_percentile(self, state: _PacingState) -> float:
+        ordered = sorted(state.samples)
+        index = max(math.ceil(self.percentile * len(ordered)) - 1, 0)
+        return ordered[index]
+
+    def delay(self, command: str, default: float) -> float:
+        """
+        Returns the delay in seconds to apply to a command.
+
+        Args:
+            `command`: The command to send.
+            `default`: The fixed delay of the command.
+        """
+        state = self._states.get(self.command_type(command))
+        if state is None:
+            return default
+        return min(state.delay, default)
+
+    def record_success(
+        self, command: str, default: float, waited: float, read_time: float
+    ):
+        """
+        Records a successful exchange.
+
+        Args:
+            `command`: The command sent.
+            `default`: The fixed delay of the command.
+            `waited`: The delay applied between write and read, in seconds.
+            `read_time`: The time spent reading the response, in seconds.
+        """
+        state = self._state(command, default)
+
+        if read_time > self.ready_threshold:
+            state.samples.append(waited + read_time)
+            delay = self._latency_percentile(state) * self.margin
+        else:
+            delay = state.delay * self.shrink
+            if state.samples:
+                delay = max(delay, self._latency_percentile(state) * self.margin)
+
+        state.delay = min(max(delay, self.min_delay), default)
+
+    def record_failure(self, command: str, default: float):
+        """
+        Records a failed exchange (timeout or malformed response) and backs off to the
+        fixed delay.
+
+        Args:
+            `command`: The command sent.
+            `default`: The fixed delay of the command.
+        """
+        state = self._state(command, default)
+        _LOGGER.debug(
+            f"Backing off the delay of '{self.command_type(command)}' to {default}s"
+        )
+        state.samples.clear()
+        state.delay = default
+
+    @property
+    def delays(self) -> dict[str, float]:
+        """
+        The delays currently applied, by command type.
+        """
+        return {
+            command_type: state.delay for command_type, state in self._states.items()
+        }
+
+    def reset(self, command_type: Optional[str] = None):
+        """
+        Forgets the learned delays.
+
+        Args:
+            `command_type`: The command type to reset. If None, all of them are reset.
+        """
+        if command_type is None:
+            self._states.clear()
+        else:
+            self._states.pop(command_type, None)
@@ -0,0 +1,258 @@
+import logging
+import math
+import time
+from typing import Iterable, Optional
+
+from .data_classes import OperationMode, ProfileStep, SetpointChange, TestAreaState
+from .espec_pr3j import EspecPr3j, _setpoints_reached
+from .telemetry import TelemetryBuffer
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Profile:
+    """
+    A climate profile: a sequence of steps, each one a ramp to some setpoints followed
+    by a soak at them.
+
+    Args:
+        `steps (Iterable[ProfileStep])`: The steps of the profile. More can be added
+            with `add`. Default is no steps.
+        `ramp_interval (float)`: The time in seconds between the setpoint updates of
+            the ramps. Default is 10.
+    """
+
+    def __init__(self, steps: Iterable[ProfileStep] = (), ramp_interval: float = 10.0):
+        assert ramp_interval > 0
+
+        self.steps = list(steps)
+        """The steps of the profile"""
+
+        self.ramp_interval = ramp_interval
+        """The time in seconds between the setpoint updates of the ramps"""
+
+    def add(
+        self,
+        temperature: float,
+        humidity: Optional[float] = None,
+        ramp_time: float = 0.0,
+        soak_time: float = 0.0,
+        wait_reached: bool = True,
+    ) -> "Profile":
+        """
+        Adds a step and returns the profile, so calls can be chained. See
+        `ProfileStep` for the arguments.
+        """
+        self.steps.append(
+            ProfileStep(temperature, humidity, ramp_time, soak_time, wait_reached)
+        )
+        return self
+
+    @property
+    def min_duration(self) -> float:
+        """
+        The duration in seconds of the profile if every step reached its setpoints
+        right after its ramp.
+        """
+        return sum(step.ramp_time + step.soak_time for step in self.steps)
+
+    def timeline(
+        self, temperature: float, humidity: Optional[float] = None
+    ) -> list[SetpointChange]:
+        """
+        Computes all the setpoint changes of the profile. Changes that would not
+        modify the setpoints, at their resolution, are left out.
+
+        Args:
+            `temperature`: The temperature the first ramp starts from, in Celsius.
+            `humidity`: The humidity the first ramp starts from, in percentage.
+        """
+        changes = []
+        last: Optional[tuple[float, Optional[float]]] = None
+
+        for index, step in enumerate(self.steps):
+            points = [(0.0, 1.0)]
+            if step.ramp_time > 0:
+                count = math.ceil(step.ramp_time / self.ramp_interval)
+                points = [
+                    (step.ramp_time * point / count, point / count)
+                    for point in range(count + 1)
+                ]
+
+            for offset, fraction in points:
+                setpoint_temperature = round(
+                    temperature + (step.temperature - temperature) * fraction, 1
+                )
+
+                setpoint_humidity = step.humidity
+                if step.humidity is not None:
+                    start = step.humidity if humidity is None else humidity
+                    setpoint_humidity = float(
+                        round(start + (step.humidity - start) * fraction)
+                    )
+
+                setpoints = (setpoint_temperature, setpoint_humidity)
+                if setpoints != last:
+                    changes.append(SetpointChange(index, offset, *setpoints))
+                    last = setpoints
+
+            temperature = step.temperature
+            humidity = step.humidity
+
+        return changes
+
+
+class ProfileExecutor:
+    """
+    Runs a profile on an environmental chamber.
+
+    The whole setpoint timeline is computed before starting. During the ramps the
+    setpoints are streamed to the chamber with `TEMP, S` and `HUMI, S` commands. In
+    between, and while waiting for the setpoints or soaking, the test area is polled
+    with `MON?` every `poll_interval` and recorded into `buffer`. A step moves on to
+    the next one as soon as its soak ends, so the profile takes close to its
+    `min_duration` plus the time the chamber needs to reach the setpoints.
+
+    Args:
+        `chamber (EspecPr3j)`: The environmental chamber.
+        `profile (Profile)`: The profile to run.
+        `poll_interval (float)`: The time in seconds between polls. Default is 1.
+        `capacity (int)`: The capacity of the telemetry buffer, in samples. Default is
+            one day at 1 Hz.
+        `reach_timeout (Optional[float])`: The maximum time in seconds a step waits for
+            its setpoints to be reached. If None, it waits forever. Default is None.
+    """
+
+    def __init__(
+        self,
+        chamber: EspecPr3j,
+        profile: Profile,
+        poll_interval: float = 1.0,
+        capacity: int = 24 * 60 * 60,
+        reach_timeout: Optional[float] = None,
+    ):
+        self.chamber = chamber
+        self.profile = profile
+        self.poll_interval = poll_interval
+        self.reach_timeout = reach_timeout
+
+        self.buffer = TelemetryBuffer(capacity)
+        """The samples of the test area recorded while running"""
+
+        self.step: Optional[int] = None
+        """The index of the step running. None if the profile is not running"""
+
+        self._wall_offset = 0.0
+        self._sent: Optional[tuple[float, Optional[float]]] = None
+
+    def run(self) -> TelemetryBuffer:
+        """
+        Runs the profile and returns the recorded samples. The chamber is left at the
+        setpoints of the last step.
+
+        Raises:
+            `SettingError`: If an error occurred when setting the setpoints or the mode.
+            `TimeoutError`: If a step did not reach its setpoints in `reach_timeout`.
+        """
+        chamber = self.chamber
+        clock = chamber.clock
+        self._wall_offset = time.time() - clock.time()
+        self._sent = None
+
+        state = self._sample()
+        timeline = self.profile.timeline(
+            state.current_temperature, state.current_humidity
+        )
+        _LOGGER.debug(
+            f"Running a profile of {len(self.profile.steps)} steps and "
+            f"{len(timeline)} setpoint changes"
+        )
+
+        changes = iter(timeline)
+        change = next(changes, None)
+        constant = False
+
+        try:
+            for index, step in enumerate(self.profile.steps):
+                self.step = index
+                step_start = clock.time()
+
+                while change is not None and change.step == index:
+                    self._poll_until(step_start + change.offset)
+                    self._apply(change)
+                    change = next(changes, None)
+
+                    if not constant:
+                        chamber.set_mode(OperationMode.CONSTANT)
+                        constant = True
+
+                self._poll_until(step_start + step.ramp_time)
+                if step.wait_reached:
+                    self._poll_until_reached(step)
+                self._poll_until(clock.time() + step.soak_time)
+        finally:
+            self.step = None
+
+        return self.buffer
+
+    def _apply(self, change: SetpointChange):
+        """
+        Sends the setpoints of a change that differ from the current ones.
+        """
+        _LOGGER.debug(f"Step {change.step}: {change.temperature}°C, {change.humidity}%")
+
+        if self._sent is None or change.temperature != self._sent[0]:
+            self.chamber.set_target_temperature(change.temperature)
+        if self._sent is None or change.humidity != self._sent[1]:
+            self.chamber.set_target_humidity(change.humidity)
+
+        self._sent = (change.temperature, change.humidity)
+
+    def _sample(self) -> TestAreaState:
+        """
+        Polls the test area and records it.
+        """
+        state = self.chamber.get_test_area_state()
+        self.buffer.append(self.chamber.clock.time() + self._wall_offset, state)
+        return state
+
+    def _poll_until(self, deadline: float):
+        """
+        Polls the test area every `poll_interval` until a time of the clock.
+        """
+        clock = self.chamber.clock
+
+        while clock.time() < deadline:
+            next_poll = clock.time() + self.poll_interval
+            self._sample()
+            clock.sleep(min(next_poll, deadline) - clock.time())
+
+    def _poll_until_reached(self, step: ProfileStep):
+        """
+        Polls the test area every `poll_interval` until the setpoints of a step are
+        reached.
+        """
+        chamber = self.chamber
+        clock = chamber.clock
+        start = clock.time()
+
+        while True:
+            next_poll = clock.time() + self.poll_interval
+            state = self._sample()
+            if _setpoints_reached(
+                state,
+                step.temperature,
+                step.humidity,
+                chamber.temperature_accuracy,
+                chamber.humidity_accuracy,
+            ):
+                return
+
+            if self.reach_timeout is not None:
+                if clock.time() - start >= self.reach_timeout:
+                    raise TimeoutError(
+                        f"Step {self.step} did not reach its setpoints after "
+                        f"{self.reach_timeout} seconds"
+                    )
+
+            clock.sleep(next_poll - clock.time())
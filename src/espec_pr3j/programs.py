@@ -0,0 +1,184 @@
+import math
+import re
+from typing import Iterable, Optional
+
+from .data_classes import OperationMode, ProgramStep
+from .profiles import Profile
+
+
+def _on_off(value: bool) -> str:
+    return "ON" if value else "OFF"
+
+
+class Program:
+    """
+    A program to store in the program memory of the chamber, so the chamber runs the
+    steps and their timing by itself. The host only starts it and monitors it.
+
+    Args:
+        `steps (Iterable[ProgramStep])`: The steps of the program. More can be added
+            with `add`. Default is no steps.
+        `end_mode (OperationMode)`: The operation mode of the chamber after the last
+            step: `OFF`, `STANDBY` or `CONSTANT`. Default is `STANDBY`.
+    """
+
+    MAX_STEP_DURATION = (99 * 60 + 59) * 60.0
+    """The maximum duration of a step in seconds"""
+
+    STEP_PATTERN = re.compile(
+        r"(?P<program>\d+), STEP(?P<step>\d+)"
+        r", TEMP(?P<temperature>-?\d+\.\d), TRAMP (?P<temperature_ramp>ON|OFF)"
+        r", HUMI(?P<humidity>OFF|\d+), HRAMP (?P<humidity_ramp>ON|OFF)"
+        r", TIME(?P<hours>\d+):(?P<minutes>\d{2})"
+        r", GRANTY (?P<guaranteed>ON|OFF), PAUSE (?P<pause>ON|OFF)"
+    )
+    """The pattern of the parameters writing a step"""
+
+    END_PATTERN = re.compile(r"(?P<program>\d+), END, (?P<mode>\w+)")
+    """The pattern of the parameters writing the end mode"""
+
+    EDIT_PATTERN = re.compile(r"(?P<program>\d+), EDIT (?P<action>START|END|CANCEL)")
+    """The pattern of the parameters starting, ending or cancelling the edition"""
+
+    def __init__(
+        self,
+        steps: Iterable[ProgramStep] = (),
+        end_mode: OperationMode = OperationMode.STANDBY,
+    ):
+        assert end_mode != OperationMode.RUN
+
+        self.steps = list(steps)
+        """The steps of the program"""
+
+        self.end_mode: OperationMode = end_mode
+        """The operation mode after the last step"""
+
+    def add(
+        self,
+        temperature: float,
+        duration: float,
+        humidity: Optional[float] = None,
+        temperature_ramp: bool = False,
+        humidity_ramp: bool = False,
+        guaranteed: bool = False,
+        pause: bool = False,
+    ) -> "Program":
+        """
+        Adds a step and returns the program, so calls can be chained. See
+        `ProgramStep` for the arguments.
+        """
+        self.steps.append(
+            ProgramStep(
+                temperature,
+                duration,
+                humidity,
+                temperature_ramp,
+                humidity_ramp,
+                guaranteed,
+                pause,
+            )
+        )
+        return self
+
+    @classmethod
+    def from_profile(
+        cls, profile: Profile, end_mode: OperationMode = OperationMode.STANDBY
+    ) -> "Program":
+        """
+        Converts a profile into a program. Each ramp becomes a ramp step and each soak
+        a step whose time only counts once its setpoints are reached (if the profile
+        step waits for them). The durations are rounded up to whole minutes.
+        """
+        program = cls(end_mode=end_mode)
+
+        for step in profile.steps:
+            humidity_control = step.humidity is not None
+            if step.ramp_time > 0:
+                program.add(
+                    step.temperature,
+                    math.ceil(step.ramp_time / 60.0) * 60.0,
+                    step.humidity,
+                    temperature_ramp=True,
+                    humidity_ramp=humidity_control,
+                )
+            if step.soak_time > 0 or step.ramp_time <= 0:
+                program.add(
+                    step.temperature,
+                    max(math.ceil(step.soak_time / 60.0), 1) * 60.0,
+                    step.humidity,
+                    guaranteed=step.wait_reached,
+                )
+
+        return program
+
+    @property
+    def duration(self) -> float:
+        """The duration of the program in seconds, without guaranteed soak delays"""
+        return sum(step.duration for step in self.steps)
+
+    def encode(self, number: int) -> list[str]:
+        """
+        Returns the parameters of the `PRGM DATA WRITE` commands that store the
+        program, in order.
+
+        Args:
+            `number`: The number of the program in the chamber.
+
+        Raises:
+            `ValueError`: If a step duration is not in whole minutes or too long.
+        """
+        parameters = [f"{number}, EDIT START"]
+        parameters += [
+            self.encode_step(number, index, step)
+            for index, step in enumerate(self.steps, start=1)
+        ]
+        parameters.append(f"{number}, END, {self.end_mode}")
+        parameters.append(f"{number}, EDIT END")
+        return parameters
+
+    @classmethod
+    def encode_step(cls, number: int, index: int, step: ProgramStep) -> str:
+        """
+        Returns the parameters of the `PRGM DATA WRITE` command writing a step.
+
+        Raises:
+            `ValueError`: If the step duration is not in whole minutes or too long.
+        """
+        minutes = step.duration / 60.0
+        if minutes != int(minutes) or not 0 < step.duration <= cls.MAX_STEP_DURATION:
+            raise ValueError(f"Invalid step duration: {step.duration}s")
+
+        hours, minutes = divmod(int(minutes), 60)
+        humidity = "OFF" if step.humidity is None else f"{step.humidity:.0f}"
+        return (
+            f"{number}, STEP{index}"
+            f", TEMP{step.temperature:.1f}, TRAMP {_on_off(step.temperature_ramp)}"
+            f", HUMI{humidity}, HRAMP {_on_off(step.humidity_ramp)}"
+            f", TIME{hours}:{minutes:02d}"
+            f", GRANTY {_on_off(step.guaranteed)}, PAUSE {_on_off(step.pause)}"
+        )
+
+    @classmethod
+    def parse_step(cls, parameters: str) -> tuple[int, int, ProgramStep]:
+        """
+        Parses the parameters of the `PRGM DATA WRITE` command writing a step, and
+        returns the program number, the step number and the step.
+
+        Raises:
+            `ValueError`: If the parameters do not write a step.
+        """
+        match = cls.STEP_PATTERN.fullmatch(parameters)
+        if match is None:
+            raise ValueError(f"Not a program step: '{parameters}'")
+
+        humidity = match["humidity"]
+        step = ProgramStep(
+            temperature=float(match["temperature"]),
+            duration=(int(match["hours"]) * 60 + int(match["minutes"])) * 60.0,
+            humidity=None if humidity == "OFF" else float(humidity),
+            temperature_ramp=match["temperature_ramp"] == "ON",
+            humidity_ramp=match["humidity_ramp"] == "ON",
+            guaranteed=match["guaranteed"] == "ON",
+            pause=match["pause"] == "ON",
+        )
+        return int(match["program"]), int(match["step"]), step
@@ -0,0 +1,471 @@
+"""
+The command table of the PR-3J protocol.
+
+Each `Command` describes one message of the protocol: how the request is written, the
+grammar of its response and how the response is decoded into a typed value. The table
+is used by the clients to encode requests and decode responses, and by simulators to
+parse requests and format responses, so both sides share a single definition. All the
+patterns are compiled at import time.
+"""
+
+import logging
+import math
+import re
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Generic, Iterable, NoReturn, Optional, TypeVar
+
+from .data_classes import (
+    HeatersStatus,
+    HumidityStatus,
+    OperationMode,
+    ProgramState,
+    TemperatureStatus,
+    TestAreaState,
+)
+from .exceptions import MonitorError, SettingError
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+_NUMBER = r"-?\d+(?:\.\d+)?"
+_DECIMAL = r"-?\d+\.\d+"
+
+
+class CommandKind(Enum):
+    """
+    The kind of a command.
+    """
+
+    MONITOR = "MONITOR"
+    """Reads a value from the chamber"""
+
+    SETTING = "SETTING"
+    """Changes a setting of the chamber"""
+
+
+@dataclass(frozen=True)
+class Command(Generic[_T]):
+    """
+    A command of the PR-3J protocol.
+    """
+
+    header: str
+    """The header identifying the command (e.g. `TEMP?` or `TEMP, S`)"""
+
+    kind: CommandKind
+    """The kind of the command"""
+
+    request_format: str
+    """The format of the request. The parameter, if any, is `{value}`"""
+
+    response_pattern: str
+    """The regular expression matching the beginning of a valid response"""
+
+    decoder: Callable[["re.Match[str]"], _T] = field(repr=False)
+    """Converts a match of the response pattern into the typed value"""
+
+    formatter: Optional[Callable[[_T], str]] = field(default=None, repr=False)
+    """Formats a typed value into a response. If None, setting commands acknowledge
+    with `OK:` followed by the request."""
+
+    value_pattern: str = ""
+    """The regular expression of the parameter in the request, if any"""
+
+    value_parser: Callable[[str], Any] = field(default=float, repr=False)
+    """Converts the parameter of a request into its typed value"""
+
+    error_message: str = ""
+    """The message of the error raised when a response is malformed"""
+
+    _response_regex: "re.Pattern[str]" = field(init=False, repr=False)
+    _request_regex: "re.Pattern[str]" = field(init=False, repr=False)
+
+    def __post_init__(self):
+        request_pattern = re.escape(self.request_format.split("{", 1)[0])
+        if self.value_pattern:
+            request_pattern += f"(?P<value>{self.value_pattern})"
+
+        object.__setattr__(self, "_response_regex", re.compile(self.response_pattern))
+        object.__setattr__(self, "_request_regex", re.compile(request_pattern))
+
+    @property
+    def error(self) -> type[Exception]:
+        """The error raised when a response is malformed"""
+        return MonitorError if self.kind == CommandKind.MONITOR else SettingError
+
+    def encode(self, value: Any = None) -> str:
+        """
+        Encodes a request.
+
+        Args:
+            `value`: The parameter of the request, if any.
+        """
+        return self.request_format.format(value=value)
+
+    def decode(self, response: str) -> _T:
+        """
+        Decodes a response.
+
+        Raises:
+            `MonitorError`: If the response to a monitor command is malformed.
+            `SettingError`: If the response to a setting command is malformed.
+        """
+        match = self._response_regex.match(response)
+        if match is not None:
+            try:
+                return self.decoder(match)
+            except (KeyError, ValueError):
+                pass
+
+        self._fail(response)
+
+    def decode_many(self, responses: Iterable[str]) -> list[_T]:
+        """
+        Decodes many responses to this command at once.
+
+        Raises:
+            `MonitorError`: If a response to a monitor command is malformed.
+            `SettingError`: If a response to a setting command is malformed.
+        """
+        match = self._response_regex.match
+        decoder = self.decoder
+        values = []
+
+        for response in responses:
+            matched = match(response)
+            try:
+                if matched is not None:
+                    values.append(decoder(matched))
+                    continue
+            except (KeyError, ValueError):
+                pass
+
+            self._fail(response)
+
+        return values
+
+    def _fail(self, response: str) -> NoReturn:
+        _LOGGER.error(self.error_message)
+        _LOGGER.debug(f"Response: '{response}'")
+        raise self.error(self.error_message)
+
+    def parse_request(self, request: str) -> Optional[Any]:
+        """
+        Parses a request to this command, returning its typed parameter (None if the
+        command has no parameter).
+
+        Raises:
+            `ValueError`: If the request is not for this command.
+        """
+        match = self._request_regex.fullmatch(request)
+        if match is None:
+            raise ValueError(f"Not a '{self.header}' request: '{request}'")
+
+        if not self.value_pattern:
+            return None
+        return self.value_parser(match["value"])
+
+    def format_response(self, value: Any = None) -> str:
+        """
+        Formats the response to this command, without line termination.
+
+        Args:
+            `value`: The typed value of the response. For setting commands, the value
+                that was set.
+        """
+        if self.formatter is None:
+            return f"OK:{self.encode(value)}"
+        return self.formatter(value)
+
+
+def _format_humidity_status(status: HumidityStatus) -> str:
+    target = status.target_humidity
+    return (
+        f"{status.current_humidity:.0f}"
+        f",{'OFF' if target is None else f'{target:.0f}'}"
+        f",{status.upper_limit:.0f}"
+        f",{status.lower_limit:.0f}"
+    )
+
+
+def _format_program_state(state: ProgramState) -> str:
+    hours, minutes = divmod(math.ceil(state.remaining_time / 60), 60)
+    return (
+        f"{state.program},{state.step},{hours}:{minutes:02d},{state.remaining_cycles}"
+    )
+
+
+TEMPERATURE_STATUS: Command[TemperatureStatus] = Command(
+    header="TEMP?",
+    kind=CommandKind.MONITOR,
+    request_format="TEMP?",
+    # data format: [current temp, set temp, upper limit, lower limit]
+    response_pattern=(
+        rf"(?P<current>{_DECIMAL})"
+        rf",(?P<target>{_DECIMAL})"
+        rf",(?P<upper>{_DECIMAL})"
+        rf",(?P<lower>{_DECIMAL})"
+    ),
+    decoder=lambda match: TemperatureStatus(
+        current_temperature=float(match["current"]),
+        target_temperature=float(match["target"]),
+        upper_limit=float(match["upper"]),
+        lower_limit=float(match["lower"]),
+    ),
+    formatter=lambda status: (
+        f"{status.current_temperature:.1f},{status.target_temperature:.1f}"
+        f",{status.upper_limit:.1f},{status.lower_limit:.1f}"
+    ),
+    error_message="Failed to get the temperature status",
+)
+
+HUMIDITY_STATUS: Command[HumidityStatus] = Command(
+    header="HUMI?",
+    kind=CommandKind.MONITOR,
+    request_format="HUMI?",
+    # data format: [current humi, set humi, upper limit, lower limit]
+    response_pattern=(
+        r"(?P<current>\d+)"
+        r",(?P<target>OFF|\d+)"
+        r",(?P<upper>\d+)"
+        r",(?P<lower>\d+)"
+    ),
+    decoder=lambda match: HumidityStatus(
+        current_humidity=float(match["current"]),
+        target_humidity=None if match["target"] == "OFF" else float(match["target"]),
+        upper_limit=float(match["upper"]),
+        lower_limit=float(match["lower"]),
+    ),
+    formatter=_format_humidity_status,
+    error_message="Failed to get the humidity status",
+)
+
+TEST_AREA_STATE: Command[TestAreaState] = Command(
+    header="MON?",
+    kind=CommandKind.MONITOR,
+    request_format="MON?",
+    # output data format: [temp, humid, op-state, num. of alarms]
+    response_pattern=(
+        rf"(?P<temp>{_DECIMAL}),(?P<humid>\d+),(?P<state>\w+),(?P<alarms>\d+)"
+    ),
+    decoder=lambda match: TestAreaState(
+        current_temperature=float(match["temp"]),
+        current_humidity=float(match["humid"]),
+        operation_state=OperationMode.from_str(match["state"]),
+        number_of_alarms=int(match["alarms"]),
+    ),
+    formatter=lambda state: (
+        f"{state.current_temperature:.1f},{state.current_humidity:.0f}"
+        f",{state.operation_state},{state.number_of_alarms}"
+    ),
+    error_message="Failed to get the test area state",
+)
+
+MODE: Command[OperationMode] = Command(
+    header="MODE?",
+    kind=CommandKind.MONITOR,
+    request_format="MODE?",
+    response_pattern=r"(?P<mode>\w+)$",
+    decoder=lambda match: OperationMode.from_str(match["mode"]),
+    formatter=str,
+    error_message="Failed to get the operation mode",
+)
+
+HEATERS_STATUS: Command[HeatersStatus] = Command(
+    header="%?",
+    kind=CommandKind.MONITOR,
+    request_format="%?",
+    # output data format: [number of heaters, temp heater, humid heater]
+    response_pattern=r"\d+,(?P<temp>\d+\.\d+),(?P<humid>\d+\.\d+)",
+    decoder=lambda match: HeatersStatus(
+        temperature_heater=float(match["temp"]),
+        humidity_heater=float(match["humid"]),
+    ),
+    formatter=lambda status: (
+        f"2,{status.temperature_heater:.1f},{status.humidity_heater:.1f}"
+    ),
+    error_message="Failed to get the heaters status",
+)
+
+SET_TARGET_TEMPERATURE: Command[float] = Command(
+    header="TEMP, S",
+    kind=CommandKind.SETTING,
+    request_format="TEMP, S{value:.1f}",
+    response_pattern=rf"OK:TEMP, S(?P<value>{_DECIMAL})",
+    decoder=lambda match: float(match["value"]),
+    value_pattern=_NUMBER,
+    error_message="Failed to set the target temperature",
+)
+
+SET_UPPER_TEMPERATURE_LIMIT: Command[float] = Command(
+    header="TEMP, H",
+    kind=CommandKind.SETTING,
+    request_format="TEMP, H{value: 0.1f}",
+    response_pattern=rf"OK:TEMP, H ?(?P<value>{_DECIMAL})",
+    decoder=lambda match: float(match["value"]),
+    value_pattern=rf" ?{_NUMBER}",
+    error_message="Failed to set the upper temperature limit",
+)
+
+SET_LOWER_TEMPERATURE_LIMIT: Command[float] = Command(
+    header="TEMP, L",
+    kind=CommandKind.SETTING,
+    request_format="TEMP, L{value: 0.1f}",
+    response_pattern=rf"OK:TEMP, L ?(?P<value>{_DECIMAL})",
+    decoder=lambda match: float(match["value"]),
+    value_pattern=rf" ?{_NUMBER}",
+    error_message="Failed to set the lower temperature limit",
+)
+
+DISABLE_HUMIDITY: Command[None] = Command(
+    header="HUMI, SOFF",
+    kind=CommandKind.SETTING,
+    request_format="HUMI, SOFF",
+    response_pattern=r"OK:HUMI, SOFF",
+    decoder=lambda match: None,
+    error_message="Failed to set the target humidity",
+)
+
+SET_TARGET_HUMIDITY: Command[float] = Command(
+    header="HUMI, S",
+    kind=CommandKind.SETTING,
+    request_format="HUMI, S{value}",
+    response_pattern=rf"OK:HUMI, S(?P<value>{_NUMBER})",
+    decoder=lambda match: float(match["value"]),
+    value_pattern=_NUMBER,
+    error_message="Failed to set the target humidity",
+)
+
+SET_UPPER_HUMIDITY_LIMIT: Command[float] = Command(
+    header="HUMI, H",
+    kind=CommandKind.SETTING,
+    request_format="HUMI, H{value}",
+    response_pattern=rf"OK:HUMI, H(?P<value>{_NUMBER})",
+    decoder=lambda match: float(match["value"]),
+    value_pattern=_NUMBER,
+    error_message="Failed to set the upper humidity limit",
+)
+
+SET_LOWER_HUMIDITY_LIMIT: Command[float] = Command(
+    header="HUMI, L",
+    kind=CommandKind.SETTING,
+    request_format="HUMI, L{value}",
+    response_pattern=rf"OK:HUMI, L(?P<value>{_NUMBER})",
+    decoder=lambda match: float(match["value"]),
+    value_pattern=_NUMBER,
+    error_message="Failed to set the lower humidity limit",
+)
+
+SET_MODE: Command[OperationMode] = Command(
+    header="MODE,",
+    kind=CommandKind.SETTING,
+    request_format="MODE, {value}",
+    response_pattern=r"OK:MODE, (?P<mode>\w+)",
+    decoder=lambda match: OperationMode.from_str(match["mode"]),
+    value_pattern=r"\w+",
+    value_parser=OperationMode.from_str,
+    error_message="Failed to set the operation mode",
+)
+
+RUN_PROGRAM: Command[int] = Command(
+    header="MODE, RUN",
+    kind=CommandKind.SETTING,
+    request_format="MODE, RUN{value}",
+    response_pattern=r"OK:MODE, RUN(?P<program>\d+)",
+    decoder=lambda match: int(match["program"]),
+    value_pattern=r"\d+",
+    value_parser=int,
+    error_message="Failed to run the program",
+)
+
+PROGRAM_WRITE: Command[str] = Command(
+    header="PRGM DATA WRITE,",
+    kind=CommandKind.SETTING,
+    # the parameters start with the program number (e.g. `1, EDIT START`)
+    request_format="PRGM DATA WRITE, PGM{value}",
+    response_pattern=r"OK:PRGM DATA WRITE, PGM(?P<value>\d+, .+)",
+    decoder=lambda match: match["value"],
+    value_pattern=r"\d+, .+",
+    value_parser=str,
+    error_message="Failed to write the program",
+)
+
+PROGRAM_STATE: Command[ProgramState] = Command(
+    header="PRGM MON?",
+    kind=CommandKind.MONITOR,
+    request_format="PRGM MON?",
+    # data format: [program, step, step time left (h:mm), repetitions left]
+    response_pattern=(
+        r"(?P<program>\d+),(?P<step>\d+)"
+        r",(?P<hours>\d+):(?P<minutes>\d{2}),(?P<cycles>\d+)"
+    ),
+    decoder=lambda match: ProgramState(
+        program=int(match["program"]),
+        step=int(match["step"]),
+        remaining_time=(int(match["hours"]) * 60 + int(match["minutes"])) * 60.0,
+        remaining_cycles=int(match["cycles"]),
+    ),
+    formatter=_format_program_state,
+    error_message="Failed to get the program state",
+)
+
+COMMANDS: dict[str, Command] = {
+    command.header: command
+    for command in (
+        TEMPERATURE_STATUS,
+        HUMIDITY_STATUS,
+        TEST_AREA_STATE,
+        MODE,
+        HEATERS_STATUS,
+        SET_TARGET_TEMPERATURE,
+        SET_UPPER_TEMPERATURE_LIMIT,
+        SET_LOWER_TEMPERATURE_LIMIT,
+        DISABLE_HUMIDITY,
+        SET_TARGET_HUMIDITY,
+        SET_UPPER_HUMIDITY_LIMIT,
+        SET_LOWER_HUMIDITY_LIMIT,
+        SET_MODE,
+        RUN_PROGRAM,
+        PROGRAM_WRITE,
+        PROGRAM_STATE,
+    )
+}
+"""All the commands of the protocol, by header"""
+
+
+def parse_request(request: str) -> tuple[Command, Optional[Any]]:
+    """
+    Finds the command of a request and parses its parameter.
+
+    Raises:
+        `ValueError`: If the request does not match any command.
+    """
+    for command in COMMANDS.values():
+        if request.startswith(command.header):
+            try:
+                return command, command.parse_request(request)
+            except (KeyError, ValueError):
+                continue
+
+    raise ValueError(f"Unknown request: '{request}'")
+
+
+def command_type(request: str) -> str:
+    """
+    Returns the type of a request, which is its header without parameters (e.g.
+    `TEMP` for `TEMP, S23.0`, and `MON?` for `MON?`).
+    """
+    return request.partition(",")[0]
+
+
+def request_header(request: str) -> str:
+    """
+    Returns the header of the command of a request (e.g. `TEMP, S` for `TEMP, S23.0`),
+    or its type (see `command_type`) if it matches no command.
+    """
+    try:
+        return parse_request(request)[0].header
+    except ValueError:
+        return command_type(request)
@@ -0,0 +1,226 @@
+import logging
+import struct
+import time
+from pathlib import Path
+from typing import BinaryIO, Generator, Optional, Union
+
+from .clock import Clock, SystemClock
+from .data_classes import RecordKind, SessionRecord
+from .transports import ENCODING, Transport
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"EPR3JREC"
+"""The first bytes of a session file"""
+
+VERSION = 1
+"""The version of the session file format"""
+
+_HEADER = struct.Struct("<8sBH")
+_RECORD = struct.Struct("<dBH")
+
+_ERRORS: dict[str, type[Exception]] = {
+    "TimeoutError": TimeoutError,
+    "ConnectionError": ConnectionError,
+}
+
+
+def read_session(
+    path: Union[str, Path],
+) -> tuple[str, Generator[SessionRecord, None, None]]:
+    """
+    Reads the header of a session file and returns the resource path of the recorded
+    chamber and a generator of the records. The records are read lazily: the file is
+    opened again on the first record, and closed once they are exhausted or the
+    generator is closed. A record cut short at the end of the file, e.g. by a crash,
+    is ignored.
+
+    The file starts with a header (`MAGIC`, the version as a byte and the length of
+    the resource path as a little-endian `uint16`, followed by the path), and each
+    record is a little-endian `float64` timestamp, a `uint8` kind and the `uint16`
+    length of the message, followed by the message.
+
+    Raises:
+        `ValueError`: If the file is not a session file.
+    """
+    with open(path, "rb") as file:
+        header = file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"Not a session file: {path}")
+
+        magic, version, length = _HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a session file: {path}")
+        resource_path = file.read(length).decode(ENCODING)
+        offset = file.tell()
+
+    def records() -> Generator[SessionRecord, None, None]:
+        # opened here, so a generator closed before its first record holds no file
+        with open(path, "rb") as file:
+            file.seek(offset)
+            while len(header := file.read(_RECORD.size)) == _RECORD.size:
+                timestamp, kind, length = _RECORD.unpack(header)
+                data = file.read(length)
+                if len(data) < length:
+                    return
+                message = data.decode(ENCODING)
+                yield SessionRecord(timestamp, RecordKind(kind), message)
+
+    return resource_path, records()
+
+
+class RecordingTransport(Transport):
+    """
+    Records the messages exchanged through another transport into a session file,
+    e.g. to replay them later with a `ReplayTransport`. See `read_session` for the
+    format.
+
+    Args:
+        `transport (Transport)`: The transport to record.
+        `path (Union[str, Path])`: The session file. It is overwritten.
+        `clock (Optional[Clock])`: The clock timestamping the records. Default is the
+            wall time (`time.time()`), so the records can be matched with other logs.
+    """
+
+    def __init__(
+        self,
+        transport: Transport,
+        path: Union[str, Path],
+        clock: Optional[Clock] = None,
+    ):
+        self.transport = transport
+        self._now = clock.time if clock is not None else time.time
+        self.resource_path = transport.resource_path
+
+        resource_path = self.resource_path.encode(ENCODING)
+        self._file: Optional[BinaryIO] = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, len(resource_path)))
+        self._file.write(resource_path)
+
+    def _record(self, timestamp: float, kind: RecordKind, message: str):
+        if self._file is None:
+            return
+
+        # error messages may hold any text
+        data = message.encode(ENCODING, errors="replace")
+        self._file.write(_RECORD.pack(timestamp, kind.value, len(data)))
+        self._file.write(data)
+        if kind != RecordKind.WRITE:
+            # keep the complete exchanges on disk in case the process dies
+            self._file.flush()
+
+    def _record_error(self, error: Exception):
+        self._record(self._now(), RecordKind.ERROR, f"{type(error).__name__}:{error}")
+
+    def open(self):
+        self.transport.open()
+
+    def write(self, message: str):
+        timestamp = self._now()
+        try:
+            self.transport.write(message)
+        finally:
+            self._record(timestamp, RecordKind.WRITE, message)
+
+    def read(self) -> str:
+        try:
+            response = self.transport.read()
+        except Exception as error:
+            self._record_error(error)
+            raise
+
+        self._record(self._now(), RecordKind.READ, response)
+        return response
+
+    def query(self, message: str, delay: float = 0.0) -> str:
+        self._record(self._now(), RecordKind.WRITE, message)
+        try:
+            response = self.transport.query(message, delay=delay)
+        except Exception as error:
+            self._record_error(error)
+            raise
+
+        self._record(self._now(), RecordKind.READ, response)
+        return response
+
+    def close(self):
+        self.transport.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ReplayTransport(Transport):
+    """
+    Plays a session recorded by a `RecordingTransport` back to a client, e.g. to
+    reproduce a problem or benchmark the client without a chamber.
+
+    Every message written must be the next one recorded. The response is the recorded
+    one, and recorded errors are raised again (as `TimeoutError`, `ConnectionError` or
+    otherwise `OSError`).
+
+    Args:
+        `path (Union[str, Path])`: The session file.
+        `realtime (bool)`: If True, each response is read as long after its message as
+            it was recorded. If False, responses are returned right away and the delays
+            of the client are skipped. Default is False.
+        `clock (Optional[Clock])`: The clock used to wait in real time. Default is the
+            system clock.
+
+    Raises:
+        `ValueError`: If the file is not a session file.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        realtime: bool = False,
+        clock: Optional[Clock] = None,
+    ):
+        self.realtime = realtime
+        self.resource_path, self._records = read_session(path)
+
+        self._clock = clock or SystemClock()
+        self._write: Optional[tuple[float, float]] = None
+
+    def _next(self, message: str) -> SessionRecord:
+        record = next(self._records, None)
+        if record is None:
+            raise EOFError(f"The recorded session ended before '{message}'")
+        return record
+
+    def write(self, message: str):
+        record = self._next(message)
+        if record.kind != RecordKind.WRITE or record.message != message:
+            raise ValueError(
+                f"The client diverged from the recorded session: wrote '{message}', "
+                f"recorded {record.kind.name} '{record.message}'"
+            )
+        self._write = (record.timestamp, self._clock.time())
+
+    def read(self) -> str:
+        record = self._next("a read")
+
+        if self.realtime and self._write is not None:
+            recorded_write, write = self._write
+            elapsed = self._clock.time() - write
+            self._clock.sleep(record.timestamp - recorded_write - elapsed)
+
+        if record.kind == RecordKind.ERROR:
+            error_type, _, text = record.message.partition(":")
+            raise _ERRORS.get(error_type, OSError)(text)
+        if record.kind != RecordKind.READ:
+            raise ValueError(
+                f"The client diverged from the recorded session: read, recorded "
+                f"{record.kind.name} '{record.message}'"
+            )
+        return record.message
+
+    def query(self, message: str, delay: float = 0.0) -> str:
+        # the recorded pacing replaces the delay of the client
+        self.write(message)
+        return self.read()
+
+    def close(self):
+        _LOGGER.debug(f"Closing the replay of {self.resource_path}")
+        self._records.close()
@@ -0,0 +1,309 @@
+import bisect
+import logging
+import math
+import threading
+import time
+from array import array
+from typing import Iterable, Optional
+
+from . import protocol
+from .data_classes import CommandEvent, RollupBucket, TelemetryRecord, TestAreaState
+from .hooks import CommandHook
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_LEVELS = (10.0, 60.0, 600.0, 3600.0)
+"""The default bucket durations of the rollup levels, in seconds"""
+
+FIELDS = ("temperature", "humidity")
+"""The fields of the test area state that are rolled up"""
+
+
+class LttbDownsampler:
+    """
+    An incremental Largest-Triangle-Three-Buckets downsampler: it keeps one point
+    per bucket of `bucket_size` samples, the one forming the largest triangle with the
+    point kept for the previous bucket and the mean of the next bucket, which
+    preserves the visual shape of a series.
+
+    A bucket is settled once the next one is complete, so only two buckets of samples
+    are held in memory.
+
+    Args:
+        `bucket_size (int)`: The number of samples per kept point.
+    """
+
+    def __init__(self, bucket_size: int):
+        assert bucket_size > 0
+
+        self.bucket_size = bucket_size
+        """The number of samples per kept point"""
+
+        self._points: list[tuple[float, float]] = []
+        self._previous: list[tuple[float, float]] = []
+        self._current: list[tuple[float, float]] = []
+        self._last: Optional[tuple[float, float]] = None
+
+    def append(self, x: float, y: float):
+        """
+        Appends a sample. Samples must be appended in `x` order.
+        """
+        self._last = (x, y)
+        if not self._points:
+            self._points.append(self._last)
+            return
+
+        self._current.append(self._last)
+        if len(self._current) < self.bucket_size:
+            return
+
+        if self._previous:
+            self._points.append(self._select(self._previous, _mean(self._current)))
+        self._previous = self._current
+        self._current = []
+
+    def _select(
+        self, bucket: list[tuple[float, float]], next_point: tuple[float, float]
+    ) -> tuple[float, float]:
+        ax, ay = self._points[-1]
+        cx, cy = next_point
+        return max(
+            bucket,
+            key=lambda point: abs(
+                (ax - cx) * (point[1] - ay) - (ax - point[0]) * (cy - ay)
+            ),
+        )
+
+    def points(self) -> list[tuple[float, float]]:
+        """
+        Returns the kept points, including the first and latest samples. The points
+        of the buckets not settled yet are selected against the latest samples.
+        """
+        points = list(self._points)
+        if self._previous:
+            next_point = _mean(self._current) if self._current else self._previous[-1]
+            points.append(self._select(self._previous, next_point))
+        if self._last is not None and points[-1] != self._last:
+            points.append(self._last)
+        return points
+
+
+def _mean(points: list[tuple[float, float]]) -> tuple[float, float]:
+    return (
+        math.fsum(x for x, _ in points) / len(points),
+        math.fsum(y for _, y in points) / len(points),
+    )
+
+
+class _Level:
+    """
+    The buckets of a rollup level, in one `array` per statistic and field. The last
+    bucket is the open one.
+    """
+
+    def __init__(self, duration: float):
+        self.duration = duration
+        self.starts: array[float] = array("d")
+        self.counts: array[int] = array("q")
+        self.minimums = {field: array("d") for field in FIELDS}
+        self.maximums = {field: array("d") for field in FIELDS}
+        self.sums = {field: array("d") for field in FIELDS}
+
+    def append(self, timestamp: float, values: dict[str, float]):
+        start = math.floor(timestamp / self.duration) * self.duration
+        if not self.starts or start > self.starts[-1]:
+            self.starts.append(start)
+            self.counts.append(1)
+            for field, value in values.items():
+                self.minimums[field].append(value)
+                self.maximums[field].append(value)
+                self.sums[field].append(value)
+            return
+
+        self.counts[-1] += 1
+        for field, value in values.items():
+            self.minimums[field][-1] = min(self.minimums[field][-1], value)
+            self.maximums[field][-1] = max(self.maximums[field][-1], value)
+            self.sums[field][-1] += value
+
+    def buckets(self, field: str, start: float, end: float) -> list[RollupBucket]:
+        first = bisect.bisect_right(self.starts, start - self.duration)
+        last = bisect.bisect_right(self.starts, end)
+        return [
+            RollupBucket(
+                start=self.starts[index],
+                duration=self.duration,
+                count=self.counts[index],
+                minimum=self.minimums[field][index],
+                maximum=self.maximums[field][index],
+                mean=self.sums[field][index] / self.counts[index],
+            )
+            for index in range(first, last)
+        ]
+
+
+class TelemetryRollups(CommandHook):
+    """
+    Keeps the min/max/mean of the temperature and humidity of a chamber at several
+    resolutions, and a plot-preserving downsampled series of each (see
+    `LttbDownsampler`), updated incrementally as samples arrive.
+
+    Samples are added with `append` or `extend` (e.g. from a `TelemetryLogReader`),
+    or taken from the chamber getters when the rollups are one of the hooks of a
+    chamber: every `MON?` response is added.
+
+        rollups = TelemetryRollups()
+        chamber.hooks.append(rollups)
+        ...
+        buckets = rollups.query("temperature", start, end, max_points=500)
+
+    Every level holds all its buckets, so memory grows with the covered time, by 64
+    bytes per bucket: a week at 10 s is about 4 MB.
+
+    Args:
+        `levels (Iterable[float])`: The bucket durations of the levels in seconds.
+            Buckets are aligned to multiples of their duration since the epoch.
+            Default is `DEFAULT_LEVELS`.
+        `lttb_bucket_size (int)`: The number of samples per point of the downsampled
+            series. Default is 60.
+    """
+
+    def __init__(
+        self,
+        levels: Iterable[float] = DEFAULT_LEVELS,
+        lttb_bucket_size: int = 60,
+    ):
+        self._levels = [_Level(duration) for duration in sorted(levels)]
+        assert self._levels
+
+        self._downsamplers = {
+            field: LttbDownsampler(lttb_bucket_size) for field in FIELDS
+        }
+        self._last_timestamp = -math.inf
+        self._lock = threading.Lock()
+
+    @property
+    def levels(self) -> list[float]:
+        """The bucket durations of the levels in seconds, finest first"""
+        return [level.duration for level in self._levels]
+
+    def append(self, timestamp: float, test_area_state: TestAreaState):
+        """
+        Adds a sample.
+
+        Args:
+            `timestamp`: The time of the sample, in seconds since the epoch. Samples
+                must be added in time order.
+            `test_area_state`: The test area state of the chamber.
+
+        Raises:
+            `ValueError`: If the sample is older than the last one added.
+        """
+        self._add(
+            timestamp,
+            {
+                "temperature": test_area_state.current_temperature,
+                "humidity": test_area_state.current_humidity,
+            },
+        )
+
+    def extend(self, records: Iterable[TelemetryRecord]):
+        """
+        Adds the samples of telemetry log records, e.g. to build the rollups of a log.
+        See `append`.
+        """
+        for record in records:
+            self._add(
+                record.timestamp,
+                {"temperature": record.temperature, "humidity": record.humidity},
+            )
+
+    def _add(self, timestamp: float, values: dict[str, float]):
+        with self._lock:
+            if timestamp < self._last_timestamp:
+                raise ValueError(
+                    f"Samples must be added in time order ({timestamp} < "
+                    f"{self._last_timestamp})"
+                )
+            self._last_timestamp = timestamp
+
+            for level in self._levels:
+                level.append(timestamp, values)
+            for field, value in values.items():
+                self._downsamplers[field].append(timestamp, value)
+
+    def after_command(self, event: CommandEvent):
+        if event.cached or event.error is not None or event.response is None:
+            return
+
+        if event.command == protocol.TEST_AREA_STATE.encode():
+            self.append(time.time(), protocol.TEST_AREA_STATE.decode(event.response))
+
+    def level_for(self, start: float, end: float, max_points: int) -> float:
+        """
+        Returns the bucket duration of the coarsest level with at least `max_points`
+        buckets in a time range, or of the finest level if none has as many.
+        """
+        resolution = (end - start) / max_points
+        durations = self.levels
+        index = bisect.bisect_right(durations, resolution)
+        return durations[max(index - 1, 0)]
+
+    def query(
+        self,
+        field: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        max_points: int = 1000,
+        level: Optional[float] = None,
+    ) -> list[RollupBucket]:
+        """
+        Returns the buckets of a field overlapping a time range, read from the
+        coarsest level still giving `max_points` buckets over the range (see
+        `level_for`). The last bucket may still be open.
+
+        Args:
+            `field`: The field, one of `FIELDS`.
+            `start`: The start of the range, in seconds since the epoch. If None, the
+                range starts at the first sample.
+            `end`: The end of the range. If None, the range ends at the last sample.
+            `max_points`: The number of buckets that is good enough. Default is 1000.
+            `level`: The bucket duration of the level to read, overriding the choice
+                by `max_points`.
+
+        Raises:
+            `ValueError`: If the field or level do not exist.
+        """
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field '{field}', expected one of {FIELDS}")
+
+        with self._lock:
+            finest = self._levels[0]
+            if not finest.starts:
+                return []
+
+            start = finest.starts[0] if start is None else start
+            end = self._last_timestamp if end is None else end
+            duration = (
+                self.level_for(start, end, max_points) if level is None else level
+            )
+
+            for candidate in self._levels:
+                if candidate.duration == duration:
+                    _LOGGER.debug(f"Reading {field} from the {duration}s level")
+                    return candidate.buckets(field, start, end)
+
+        raise ValueError(f"No level of {level}s, expected one of {self.levels}")
+
+    def downsampled(self, field: str) -> list[tuple[float, float]]:
+        """
+        Returns the downsampled series of a field, as (timestamp, value) points.
+
+        Raises:
+            `ValueError`: If the field does not exist.
+        """
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field '{field}', expected one of {FIELDS}")
+
+        with self._lock:
+            return self._downsamplers[field].points()
@@ -0,0 +1,166 @@
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional
+
+from .clock import Clock, SystemClock
+
+_LOGGER = logging.getLogger(__name__)
+
+_default_scheduler: Optional["PollScheduler"] = None
+_default_scheduler_lock = threading.Lock()
+
+
+class PollScheduler:
+    """
+    Runs delayed calls, such as the polls of many chambers waiting for their
+    conditions, from a single timer thread and a bounded pool of workers. Waiting
+    chambers hold no thread; only the polls being sent do.
+
+    The delays are measured on a clock, the real time by default. With another clock,
+    like a `VirtualClock`, the timer thread sleeps on that clock until the next call
+    is due, so simulated waits return at once. The polls of a chamber must run on a
+    scheduler on the clock of the chamber (see `check_clock`).
+
+    Args:
+        `max_workers (Optional[int])`: The maximum number of calls running at the same
+            time. Default is `MAX_WORKERS`.
+        `clock (Optional[Clock])`: The clock the delays are measured on. Default is the
+            system clock.
+    """
+
+    MAX_WORKERS = 8
+    """The default maximum number of calls running at the same time"""
+
+    def __init__(
+        self, max_workers: Optional[int] = None, clock: Optional[Clock] = None
+    ):
+        self.clock = clock or SystemClock()
+        """The clock the delays are measured on"""
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or self.MAX_WORKERS,
+            thread_name_prefix="espec_pr3j_poll",
+        )
+        self._calls: list[tuple[float, int, Callable[[], None]]] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._shutdown = False
+
+    @classmethod
+    def default(cls) -> "PollScheduler":
+        """
+        Returns the scheduler shared by default by all the chambers, creating it on the
+        first call.
+        """
+        global _default_scheduler
+
+        with _default_scheduler_lock:
+            if _default_scheduler is None:
+                _default_scheduler = cls()
+            return _default_scheduler
+
+    def check_clock(self, clock: Clock):
+        """
+        Checks that the delays of the scheduler are measured on a clock, e.g. the one
+        of a chamber polled by the scheduler: any system clock for a scheduler in real
+        time, or the same clock otherwise.
+
+        Raises:
+            `ValueError`: If the scheduler does not run on the clock.
+        """
+        if isinstance(self.clock, SystemClock):
+            matches = isinstance(clock, SystemClock)
+        else:
+            matches = clock is self.clock
+
+        if not matches:
+            raise ValueError(
+                "The scheduler does not run on the clock of the chamber, use a "
+                "PollScheduler(clock=chamber.clock) or drive the polls with step()"
+            )
+
+    def call_later(self, delay: float, callback: Callable[[], None]):
+        """
+        Schedules a call. The callback runs in a copy of the current context, so
+        context variables like the current span are kept. Errors raised by the callback
+        are logged.
+
+        Args:
+            `delay`: The time in seconds to wait before the call, on the clock of the
+                scheduler.
+            `callback`: The function to call.
+
+        Raises:
+            `RuntimeError`: If the scheduler was shut down.
+        """
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("The scheduler was shut down")
+
+            due = self.clock.time() + max(delay, 0.0)
+            call: Callable[[], None] = partial(contextvars.copy_context().run, callback)
+            heapq.heappush(self._calls, (due, next(self._counter), call))
+            self._condition.notify()
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="espec_pr3j_scheduler", daemon=True
+                )
+                self._thread.start()
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stops the scheduler. Pending calls are dropped.
+
+        Args:
+            `wait`: Whether to wait for the running calls to finish.
+        """
+        with self._condition:
+            self._shutdown = True
+            self._calls.clear()
+            self._condition.notify()
+
+        self._executor.shutdown(wait=wait)
+
+    def _run(self):
+        with self._condition:
+            while not self._shutdown:
+                if not self._calls:
+                    self._condition.wait()
+                    continue
+
+                delay = self._calls[0][0] - self.clock.time()
+                if delay > 0:
+                    if isinstance(self.clock, SystemClock):
+                        self._condition.wait(delay)
+                    else:
+                        self._sleep(delay)
+                    continue
+
+                _, _, callback = heapq.heappop(self._calls)
+                self._executor.submit(self._call, callback)
+
+    def _sleep(self, delay: float):
+        """
+        Sleeps on the clock of the scheduler, e.g. moves a virtual clock forward,
+        letting calls be scheduled meanwhile.
+        """
+        self._condition.release()
+        try:
+            self.clock.sleep(delay)
+        finally:
+            self._condition.acquire()
+
+    @staticmethod
+    def _call(callback: Callable[[], None]):
+        try:
+            callback()
+        except Exception as error:
+            _LOGGER.error("Scheduled call failed")
+            _LOGGER.debug(f"Error: '{error!r}'")
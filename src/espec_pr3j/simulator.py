@@ -0,0 +1,446 @@
+import logging
+import math
+import threading
+from typing import Any, Optional
+
+from . import protocol
+from .clock import Clock, SystemClock
+from .data_classes import (
+    HeatersStatus,
+    HumidityStatus,
+    OperationMode,
+    ProgramState,
+    TemperatureStatus,
+    TestAreaState,
+)
+from .programs import Program
+from .transports import InProcessTransport
+
+_LOGGER = logging.getLogger(__name__)
+
+_NOT_READY = object()
+"""The response to requests the simulator can not satisfy"""
+
+
+def _approach(
+    value: float,
+    target: float,
+    elapsed: float,
+    time_constant: float,
+    max_rate: float = math.inf,
+) -> tuple[float, float]:
+    """
+    Integrates a first-order response towards a target whose rate of change is limited
+    to `max_rate`, as a proportional controller with a saturated output would do.
+
+    Returns the value after `elapsed` seconds and the controller output at that time,
+    between -1 and 1.
+    """
+    error = target - value
+    # below this error the output is not saturated and the response is exponential
+    linear_error = time_constant * max_rate
+
+    if abs(error) > linear_error:
+        ramp_time = (abs(error) - linear_error) / max_rate
+        if elapsed <= ramp_time:
+            return value + math.copysign(max_rate * elapsed, error), math.copysign(
+                1.0, error
+            )
+        elapsed -= ramp_time
+        error = math.copysign(linear_error, error)
+
+    error *= math.exp(-elapsed / time_constant)
+    output = 0.0 if math.isinf(linear_error) else error / linear_error
+    return target - error, output
+
+
+class ChamberSimulator:
+    """
+    Simulates an environmental chamber in the same process, answering the PR-3J
+    protocol.
+
+    The temperature and humidity follow first-order dynamics on `clock`: in `CONSTANT`
+    mode, they approach their targets with a time constant, at most at a maximum rate
+    (the heater output is saturated while ramping), and the heaters status reports the
+    controller output. Otherwise, or with the humidity control disabled, they drift
+    towards the ambient values. The state is integrated exactly between requests, so
+    the polling rate does not change the response.
+
+    Programs can be written and run. Their steps are timed on `clock`; guaranteed
+    soaks and pauses are not simulated.
+
+    With a `VirtualClock` shared with the `EspecPr3j` client, waits of hours complete
+    in milliseconds:
+
+        clock = VirtualClock()
+        simulator = ChamberSimulator(clock=clock)
+        chamber = EspecPr3j(transport=simulator.transport(), clock=clock)
+
+    Args:
+        `clock (Optional[Clock])`: The clock driving the simulation. Default is the
+            system clock.
+        `temperature (float)`: The initial temperature in Celsius. Default is 23.
+        `humidity (float)`: The initial humidity in percentage. Default is 50.
+        `ambient_temperature (Optional[float])`: The temperature in Celsius the chamber
+            drifts to when not controlled. Default is the initial temperature.
+        `ambient_humidity (Optional[float])`: The humidity in percentage the chamber
+            drifts to when not controlled. Default is the initial humidity.
+        `temperature_time_constant (float)`: The time constant of the controlled
+            temperature in seconds. Default is 60.
+        `humidity_time_constant (float)`: The time constant of the controlled humidity
+            in seconds. Default is 90.
+        `max_temperature_rate (float)`: The maximum temperature rate in Celsius per
+            second. Default is 0.05 (3°C/min).
+        `max_humidity_rate (float)`: The maximum humidity rate in percentage per
+            second. Default is 0.1.
+        `ambient_time_constant (float)`: The time constant of the drift towards the
+            ambient values in seconds. Default is 1800.
+    """
+
+    RAMP_RESOLUTION = 10.0
+    """The time in seconds between the setpoint updates of the program ramps"""
+
+    def __init__(
+        self,
+        clock: Optional[Clock] = None,
+        temperature: float = 23.0,
+        humidity: float = 50.0,
+        ambient_temperature: Optional[float] = None,
+        ambient_humidity: Optional[float] = None,
+        temperature_time_constant: float = 60.0,
+        humidity_time_constant: float = 90.0,
+        max_temperature_rate: float = 0.05,
+        max_humidity_rate: float = 0.1,
+        ambient_time_constant: float = 1800.0,
+    ):
+        self.clock = clock or SystemClock()
+        """The clock driving the simulation"""
+
+        self.ambient_temperature = (
+            temperature if ambient_temperature is None else ambient_temperature
+        )
+        """The temperature the chamber drifts to when not controlled"""
+
+        self.ambient_humidity = (
+            humidity if ambient_humidity is None else ambient_humidity
+        )
+        """The humidity the chamber drifts to when not controlled"""
+
+        self.temperature_time_constant = temperature_time_constant
+        self.humidity_time_constant = humidity_time_constant
+        self.max_temperature_rate = max_temperature_rate
+        self.max_humidity_rate = max_humidity_rate
+        self.ambient_time_constant = ambient_time_constant
+
+        self.mode = OperationMode.STANDBY
+        """The operation mode"""
+
+        self.target_temperature = temperature
+        """The target temperature in Celsius"""
+
+        self.target_humidity: Optional[float] = humidity
+        """The target humidity in percentage. None if the humidity control is
+        disabled"""
+
+        self.temperature_limits = (100.0, -40.0)
+        """The upper and lower temperature limits in Celsius"""
+
+        self.humidity_limits = (100.0, 0.0)
+        """The upper and lower humidity limits in percentage"""
+
+        self.number_of_alarms = 0
+        """The number of active alarms reported"""
+
+        self.programs: dict[int, Program] = {}
+        """The programs stored, by number"""
+
+        self._editing: dict[int, Program] = {}
+        self._running: Optional[int] = None
+        self._program_time = 0.0
+        self._program_origin: tuple[float, Optional[float]] = (temperature, humidity)
+        self._program_setpoints: tuple[float, Optional[float]] = (temperature, humidity)
+        self._program_step = 0
+        self._step_end = 0.0
+
+        self._temperature = temperature
+        self._humidity = humidity
+        self._temperature_output = 0.0
+        self._humidity_output = 0.0
+        self._last_update = self.clock.time()
+        self._lock = threading.Lock()
+
+    @property
+    def temperature(self) -> float:
+        """The current temperature in Celsius"""
+        with self._lock:
+            self._update()
+            return self._temperature
+
+    @property
+    def humidity(self) -> float:
+        """The current humidity in percentage"""
+        with self._lock:
+            self._update()
+            return self._humidity
+
+    def transport(self, name: str = "simulator") -> InProcessTransport:
+        """
+        Returns a transport to this simulator. The delays between requests and
+        responses are waited on the clock of the simulator.
+
+        Args:
+            `name`: The name of the chamber, used in the resource path.
+        """
+        return InProcessTransport(self.handle, name=name, clock=self.clock)
+
+    def _setpoints(self) -> tuple[float, Optional[float]]:
+        """
+        Returns the setpoints in use: the ones of the program running, if any.
+        """
+        if self._running is not None:
+            return self._program_setpoints
+        return self.target_temperature, self.target_humidity
+
+    def _update(self):
+        """
+        Integrates the state up to the current time of the clock.
+        """
+        now = self.clock.time()
+        elapsed = now - self._last_update
+        self._last_update = now
+
+        while elapsed > 0:
+            segment = elapsed
+            if self._running is not None:
+                segment = min(segment, self._update_program())
+
+            self._integrate(segment)
+            elapsed -= segment
+            if self._running is not None:
+                self._program_time += segment
+
+    def _integrate(self, elapsed: float):
+        """
+        Integrates the state over some time with constant setpoints.
+        """
+        controlled = self.mode in (OperationMode.CONSTANT, OperationMode.RUN)
+        temperature, humidity = self._setpoints()
+
+        if controlled:
+            self._temperature, self._temperature_output = _approach(
+                self._temperature,
+                temperature,
+                elapsed,
+                self.temperature_time_constant,
+                self.max_temperature_rate,
+            )
+        else:
+            self._temperature, self._temperature_output = _approach(
+                self._temperature,
+                self.ambient_temperature,
+                elapsed,
+                self.ambient_time_constant,
+            )
+
+        if controlled and humidity is not None:
+            self._humidity, self._humidity_output = _approach(
+                self._humidity,
+                humidity,
+                elapsed,
+                self.humidity_time_constant,
+                self.max_humidity_rate,
+            )
+        else:
+            self._humidity, self._humidity_output = _approach(
+                self._humidity,
+                self.ambient_humidity,
+                elapsed,
+                self.ambient_time_constant,
+            )
+
+    def _update_program(self) -> float:
+        """
+        Updates the setpoints of the program running and returns the time until they
+        change again. Ramps are followed in steps of `RAMP_RESOLUTION`.
+        """
+        assert self._running is not None
+        program = self.programs[self._running]
+
+        start = 0.0
+        temperature, humidity = self._program_origin
+        for index, step in enumerate(program.steps):
+            end = start + step.duration
+            if self._program_time < end:
+                break
+            start = end
+            temperature, humidity = step.temperature, step.humidity
+        else:
+            _LOGGER.debug(f"Program {self._running} finished")
+            self._running = None
+            self.mode = program.end_mode
+            return math.inf
+
+        next_change = end
+        if step.temperature_ramp or step.humidity_ramp:
+            ticks = math.floor((self._program_time - start) / self.RAMP_RESOLUTION)
+            next_change = min(end, start + (ticks + 1) * self.RAMP_RESOLUTION)
+        fraction = (next_change - start) / step.duration
+
+        setpoint_temperature = step.temperature
+        if step.temperature_ramp:
+            setpoint_temperature = temperature + (step.temperature - temperature) * (
+                fraction
+            )
+
+        setpoint_humidity = step.humidity
+        if step.humidity_ramp and step.humidity is not None and humidity is not None:
+            setpoint_humidity = humidity + (step.humidity - humidity) * fraction
+
+        self._program_setpoints = (setpoint_temperature, setpoint_humidity)
+        self._program_step = index
+        self._step_end = end
+        return next_change - self._program_time
+
+    def handle(self, request: str) -> str:
+        """
+        Returns the response to a request, without line termination.
+
+        Args:
+            `request`: The request, without line termination.
+        """
+        try:
+            command, value = protocol.parse_request(request)
+        except ValueError:
+            _LOGGER.debug(f"Unknown request: '{request}'")
+            return "NA:COMMAND ERR"
+
+        with self._lock:
+            self._update()
+            response = self._respond(command, value)
+
+        if response is _NOT_READY:
+            return "NA:DATA NOT READY"
+        return command.format_response(response)
+
+    def _respond(self, command: protocol.Command, value: Any) -> Any:
+        """
+        Applies a request and returns the typed value of its response.
+        """
+        temperature_upper, temperature_lower = self.temperature_limits
+        humidity_upper, humidity_lower = self.humidity_limits
+        target_temperature, target_humidity = self._setpoints()
+
+        if command is protocol.TEMPERATURE_STATUS:
+            return TemperatureStatus(
+                current_temperature=self._temperature,
+                target_temperature=target_temperature,
+                upper_limit=temperature_upper,
+                lower_limit=temperature_lower,
+            )
+        if command is protocol.HUMIDITY_STATUS:
+            return HumidityStatus(
+                current_humidity=self._humidity,
+                target_humidity=target_humidity,
+                upper_limit=humidity_upper,
+                lower_limit=humidity_lower,
+            )
+        if command is protocol.TEST_AREA_STATE:
+            return TestAreaState(
+                current_temperature=self._temperature,
+                current_humidity=self._humidity,
+                operation_state=self.mode,
+                number_of_alarms=self.number_of_alarms,
+            )
+        if command is protocol.MODE:
+            return self.mode
+        if command is protocol.HEATERS_STATUS:
+            return HeatersStatus(
+                temperature_heater=100.0 * max(self._temperature_output, 0.0),
+                humidity_heater=100.0 * max(self._humidity_output, 0.0),
+            )
+        if command is protocol.SET_TARGET_TEMPERATURE:
+            self.target_temperature = value
+        elif command is protocol.SET_UPPER_TEMPERATURE_LIMIT:
+            self.temperature_limits = (value, temperature_lower)
+        elif command is protocol.SET_LOWER_TEMPERATURE_LIMIT:
+            self.temperature_limits = (temperature_upper, value)
+        elif command is protocol.DISABLE_HUMIDITY:
+            self.target_humidity = None
+        elif command is protocol.SET_TARGET_HUMIDITY:
+            self.target_humidity = value
+        elif command is protocol.SET_UPPER_HUMIDITY_LIMIT:
+            self.humidity_limits = (value, humidity_lower)
+        elif command is protocol.SET_LOWER_HUMIDITY_LIMIT:
+            self.humidity_limits = (humidity_upper, value)
+        elif command is protocol.SET_MODE:
+            # programs are started with their number
+            if value == OperationMode.RUN:
+                return _NOT_READY
+            self._running = None
+            self.mode = value
+        elif command is protocol.RUN_PROGRAM:
+            if value not in self.programs:
+                return _NOT_READY
+            self._run_program(value)
+        elif command is protocol.PROGRAM_STATE:
+            if self._running is None:
+                return _NOT_READY
+            return ProgramState(
+                program=self._running,
+                step=self._program_step + 1,
+                remaining_time=self._step_end - self._program_time,
+                remaining_cycles=0,
+            )
+        elif command is protocol.PROGRAM_WRITE:
+            if not self._write_program(value):
+                return _NOT_READY
+
+        return value
+
+    def _run_program(self, number: int):
+        """
+        Starts a stored program.
+        """
+        _LOGGER.debug(f"Running program {number}")
+        self._running = number
+        self._program_time = 0.0
+        self._program_origin = (self._temperature, self._humidity)
+        self.mode = OperationMode.RUN
+        self._update_program()
+
+    def _write_program(self, parameters: str) -> bool:
+        """
+        Applies the parameters of a `PRGM DATA WRITE` command, and returns whether they
+        were valid.
+        """
+        match = Program.EDIT_PATTERN.fullmatch(parameters)
+        if match is not None:
+            number = int(match["program"])
+            if match["action"] == "START":
+                self._editing[number] = Program()
+            elif match["action"] == "CANCEL":
+                self._editing.pop(number, None)
+            elif number in self._editing:
+                self.programs[number] = self._editing.pop(number)
+            else:
+                return False
+            return True
+
+        match = Program.END_PATTERN.fullmatch(parameters)
+        if match is not None:
+            program = self._editing.get(int(match["program"]))
+            if program is None or match["mode"] not in ("OFF", "STANDBY", "CONSTANT"):
+                return False
+            program.end_mode = OperationMode.from_str(match["mode"])
+            return True
+
+        try:
+            number, index, step = Program.parse_step(parameters)
+        except ValueError:
+            return False
+
+        program = self._editing.get(number)
+        if program is None or index != len(program.steps) + 1:
+            return False
+        program.steps.append(step)
+        return True
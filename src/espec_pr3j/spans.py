@@ -0,0 +1,119 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+COMMAND_SPAN = "espec_pr3j.command"
+"""The name of the spans of the commands sent to the chambers"""
+
+IO_SPAN = "espec_pr3j.io"
+"""The name of the spans of the I/O of a command, including the delay"""
+
+PARSE_SPAN = "espec_pr3j.parse"
+"""The name of the spans of the decoding of a response"""
+
+
+class Span:
+    """
+    A timed region of code. Spans opened while another one is current become its
+    children, also across the threads of the schedulers and fleets of this package,
+    as the current span is kept in a context variable.
+
+    Args:
+        `name (str)`: The name of the span.
+        `parent (Optional[Span])`: The span containing this one, if any.
+        `attributes (Optional[dict[str, Any]])`: Values describing the span.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        parent: Optional["Span"] = None,
+        attributes: Optional[dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes or {}
+
+        self.start = time.perf_counter()
+        """The time the span started, from `time.perf_counter`"""
+
+        self.end: Optional[float] = None
+        """The time the span ended, from `time.perf_counter`. None while open"""
+
+    @property
+    def duration(self) -> Optional[float]:
+        """The duration of the span in seconds. None while open"""
+        return None if self.end is None else self.end - self.start
+
+    def __repr__(self) -> str:
+        return f"Span({self.name!r}, duration={self.duration}, {self.attributes})"
+
+
+SpanListener = Callable[[Span], None]
+"""A function called with every span once it ends"""
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("espec_pr3j_span", default=None)
+_listeners: list[SpanListener] = []
+
+
+def add_span_listener(listener: SpanListener):
+    """
+    Adds a function called with every span once it ends, e.g. to export them to a
+    tracer. Spans are only recorded while there is at least one listener.
+    """
+    _listeners.append(listener)
+
+
+def remove_span_listener(listener: SpanListener):
+    """
+    Removes a function added with `add_span_listener`.
+    """
+    _listeners.remove(listener)
+
+
+def enabled() -> bool:
+    """
+    Returns whether spans are recorded, i.e. if there is any listener.
+    """
+    return bool(_listeners)
+
+
+def current_span() -> Optional[Span]:
+    """
+    Returns the innermost open span of the current context, if any.
+    """
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Opens a span, child of the current one, for the duration of a `with` block. If
+    the block raises, the type of the error is set as the `error` attribute.
+
+    Yields the span, or None if spans are not recorded.
+    """
+    if not _listeners:
+        yield None
+        return
+
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as error:
+        current.attributes["error"] = type(error).__name__
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+        for listener in list(_listeners):
+            try:
+                listener(current)
+            except Exception as error:
+                _LOGGER.error("Span listener failed")
+                _LOGGER.debug(f"Error: '{error!r}'")
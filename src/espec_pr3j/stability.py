@@ -0,0 +1,360 @@
+import logging
+import math
+import statistics
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class StabilityDetector(ABC):
+    """
+    Decides from the errors polled while waiting for a condition when it is stable,
+    and estimates the time left. Subclasses implement `reset` and `update`.
+    """
+
+    stable_time: float = 0.0
+    """The time in seconds the condition has been considered stable so far"""
+
+    eta: Optional[float] = None
+    """The estimated time in seconds until the condition is stable. None if it can not
+    be estimated yet."""
+
+    @abstractmethod
+    def reset(self, time: float):
+        """
+        Starts a new wait.
+
+        Args:
+            `time`: The time the wait started, in seconds.
+        """
+
+    @abstractmethod
+    def update(
+        self,
+        time: float,
+        temperature_error: float,
+        humidity_error: Optional[float],
+        temperature_accuracy: float,
+        humidity_accuracy: float,
+    ) -> bool:
+        """
+        Adds a sample and returns whether the condition is stable.
+
+        Args:
+            `time`: The time of the sample, in seconds.
+            `temperature_error`: The current minus the target temperature.
+            `humidity_error`: The current minus the target humidity. None if the
+                humidity control is disabled.
+            `temperature_accuracy`: The accuracy considered for the temperature.
+            `humidity_accuracy`: The accuracy considered for the humidity.
+        """
+
+
+def _distance(error: Optional[float], accuracy: float) -> float:
+    """
+    Returns the distance of an error to the accuracy band, zero when inside.
+    """
+    if error is None:
+        return 0.0
+    return max(abs(error) - accuracy, 0.0)
+
+
+class BandStabilityDetector(StabilityDetector):
+    """
+    The condition is stable once every sample has been within the accuracy of the
+    setpoints for `stable_time`. A single sample outside restarts the count.
+
+    The time left is extrapolated from the average rate at which the distances to the
+    accuracy bands shrank since they were last inside them.
+
+    Args:
+        `stable_time (float)`: The time in seconds the setpoints must be kept.
+            Default is 60.
+    """
+
+    def __init__(self, stable_time: float = 60.0):
+        self.required_time = stable_time
+        """The time in seconds the setpoints must be kept"""
+
+        self._stable_since = 0.0
+        self._reference: Optional[tuple[float, tuple[float, float]]] = None
+
+    def reset(self, time: float):
+        self._stable_since = time
+        self._reference = None
+        self.stable_time = 0.0
+        self.eta = None
+
+    def update(
+        self,
+        time: float,
+        temperature_error: float,
+        humidity_error: Optional[float],
+        temperature_accuracy: float,
+        humidity_accuracy: float,
+    ) -> bool:
+        distances = (
+            _distance(temperature_error, temperature_accuracy),
+            _distance(humidity_error, humidity_accuracy),
+        )
+        if distances != (0.0, 0.0):
+            self._stable_since = time
+
+        self.stable_time = time - self._stable_since
+        self.eta = self._estimate(time, distances)
+        return self.stable_time >= self.required_time
+
+    def _estimate(self, time: float, distances: tuple[float, float]) -> Optional[float]:
+        # averaging over the whole approach keeps the estimate usable despite the
+        # resolution of the readings
+        if distances == (0.0, 0.0):
+            self._reference = None
+            return max(self.required_time - self.stable_time, 0.0)
+
+        if self._reference is None:
+            self._reference = (time, distances)
+            return None
+
+        reference_time, reference_distances = self._reference
+        if time <= reference_time:
+            return None
+
+        elapsed = time - reference_time
+        time_to_reach = 0.0
+        for distance, reference_distance in zip(distances, reference_distances):
+            if distance == 0.0:
+                continue
+
+            rate = (reference_distance - distance) / elapsed
+            if rate <= 0.0:
+                return None
+            time_to_reach = max(time_to_reach, distance / rate)
+
+        return time_to_reach + self.required_time
+
+
+class WindowStabilityDetector(StabilityDetector):
+    """
+    Judges the stability on the statistics of a rolling window of samples instead of
+    on every single sample, so an isolated noisy reading does not restart the wait.
+
+    The condition is stable once the window is full and, for the temperature and the
+    humidity (if controlled):
+
+    - at least `min_occupancy` of the samples are within the accuracy,
+    - the mean error is within the accuracy,
+    - the slope of the error is at most `max_temperature_slope` or
+      `max_humidity_slope`,
+    - the standard deviation around that slope is at most `max_noise` times the
+      accuracy.
+
+    The time left is predicted by fitting a first-order settling model
+    (`error = A * exp(-t / tau)`) to the latest samples outside the accuracy, plus the
+    time needed to fill the window.
+
+    Args:
+        `window (float)`: The duration of the window in seconds. Default is 60.
+        `min_occupancy (float)`: The minimum fraction of the samples of the window that
+            must be within the accuracy. Default is 0.9.
+        `max_temperature_slope (float)`: The maximum slope of the temperature in
+            Celsius per minute. Default is 0.1.
+        `max_humidity_slope (float)`: The maximum slope of the humidity in percentage
+            per minute. Default is 0.5.
+        `max_noise (float)`: The maximum standard deviation, as a fraction of the
+            accuracy. Default is 0.5.
+        `fit_samples (int)`: The maximum number of samples the settling model is
+            fitted to. Default is 120.
+    """
+
+    MIN_SAMPLES = 3
+    """The minimum number of samples to compute the statistics or fit the model"""
+
+    def __init__(
+        self,
+        window: float = 60.0,
+        min_occupancy: float = 0.9,
+        max_temperature_slope: float = 0.1,
+        max_humidity_slope: float = 0.5,
+        max_noise: float = 0.5,
+        fit_samples: int = 120,
+    ):
+        assert 0.0 < min_occupancy <= 1.0
+
+        self.window = window
+        self.min_occupancy = min_occupancy
+        self.max_temperature_slope = max_temperature_slope
+        self.max_humidity_slope = max_humidity_slope
+        self.max_noise = max_noise
+
+        self._start_time = 0.0
+        self._holding_since: Optional[float] = None
+        self._in_band_since: Optional[float] = None
+        self._window: deque[tuple[float, float, Optional[float]]] = deque()
+        self._history: deque[tuple[float, float, Optional[float]]] = deque(
+            maxlen=fit_samples
+        )
+
+    def reset(self, time: float):
+        self._start_time = time
+        self._holding_since = None
+        self._in_band_since = None
+        self._window.clear()
+        self._history.clear()
+        self.stable_time = 0.0
+        self.eta = None
+
+    def update(
+        self,
+        time: float,
+        temperature_error: float,
+        humidity_error: Optional[float],
+        temperature_accuracy: float,
+        humidity_accuracy: float,
+    ) -> bool:
+        sample = (time, temperature_error, humidity_error)
+        self._window.append(sample)
+        self._history.append(sample)
+        while time - self._window[0][0] > self.window:
+            self._window.popleft()
+
+        in_band = (
+            _distance(temperature_error, temperature_accuracy) == 0.0
+            and _distance(humidity_error, humidity_accuracy) == 0.0
+        )
+        if not in_band:
+            self._in_band_since = None
+        elif self._in_band_since is None:
+            self._in_band_since = time
+
+        holding = self._window_holds(
+            1, temperature_accuracy, self.max_temperature_slope
+        ) and (
+            humidity_error is None
+            or self._window_holds(2, humidity_accuracy, self.max_humidity_slope)
+        )
+        if not holding:
+            self._holding_since = None
+        elif self._holding_since is None:
+            self._holding_since = time
+
+        self.stable_time = 0.0
+        if self._holding_since is not None:
+            self.stable_time = time - self._holding_since
+
+        window_left = max(self.window - (time - self._start_time), 0.0)
+        stable = holding and window_left == 0.0
+
+        if holding:
+            self.eta = window_left
+        else:
+            self.eta = self._predict(
+                time, temperature_accuracy, humidity_accuracy, humidity_error
+            )
+            if self.eta is not None:
+                self.eta = max(self.eta, window_left)
+
+        return stable
+
+    def _window_holds(self, index: int, accuracy: float, max_slope: float) -> bool:
+        """
+        Checks the statistics of one channel (1: temperature, 2: humidity) of the
+        window.
+        """
+        times = []
+        errors = []
+        for sample in self._window:
+            error = sample[index]
+            if error is None:
+                return False
+            times.append(sample[0])
+            errors.append(error)
+
+        if len(errors) < self.MIN_SAMPLES:
+            return False
+
+        in_band = sum(abs(error) <= accuracy for error in errors)
+        if in_band < self.min_occupancy * len(errors):
+            return False
+
+        if abs(statistics.fmean(errors)) > accuracy:
+            return False
+
+        try:
+            slope, intercept = statistics.linear_regression(times, errors)
+        except statistics.StatisticsError:
+            return False
+
+        if abs(slope) * 60.0 > max_slope:
+            return False
+
+        residuals = [
+            error - (slope * time + intercept) for time, error in zip(times, errors)
+        ]
+        return statistics.pstdev(residuals) <= self.max_noise * accuracy
+
+    def _predict(
+        self,
+        time: float,
+        temperature_accuracy: float,
+        humidity_accuracy: float,
+        humidity_error: Optional[float],
+    ) -> Optional[float]:
+        """
+        Predicts the time until the window holds, with the settling model.
+        """
+        time_to_reach = self._time_to_band(time, 1, temperature_accuracy)
+        if humidity_error is not None:
+            humidity_time = self._time_to_band(time, 2, humidity_accuracy)
+            if time_to_reach is None or humidity_time is None:
+                return None
+            time_to_reach = max(time_to_reach, humidity_time)
+
+        if time_to_reach is None:
+            return None
+
+        # the window must then fill with enough samples within the accuracy
+        in_band_time = 0.0
+        if self._in_band_since is not None:
+            in_band_time = time - self._in_band_since
+        return time_to_reach + max(self.min_occupancy * self.window - in_band_time, 0.0)
+
+    def _time_to_band(
+        self, time: float, index: int, accuracy: float
+    ) -> Optional[float]:
+        """
+        Fits the settling model to one channel (1: temperature, 2: humidity) and
+        returns the predicted time until its error is within the accuracy.
+        """
+        current = self._history[-1][index]
+        assert current is not None
+        if abs(current) <= accuracy:
+            return 0.0
+
+        # the samples of the current approach, far enough from the setpoint for the
+        # resolution of the readings not to dominate
+        times = []
+        logs = []
+        for sample in self._history:
+            error = sample[index]
+            if error is None or error * current <= 0 or abs(error) < accuracy / 2:
+                continue
+            times.append(sample[0])
+            logs.append(math.log(abs(error)))
+
+        if len(times) < self.MIN_SAMPLES:
+            return None
+
+        try:
+            slope, intercept = statistics.linear_regression(times, logs)
+        except statistics.StatisticsError:
+            return None
+
+        if slope >= 0.0:
+            return None
+
+        # time when A * exp(slope * t) reaches the accuracy
+        reach_time = (math.log(accuracy) - intercept) / slope
+        _LOGGER.debug(f"Settling time constant: {-1 / slope:.1f}s")
+        return max(reach_time - time, 0.0)
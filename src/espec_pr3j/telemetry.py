@@ -0,0 +1,233 @@
+import logging
+import math
+import threading
+import time
+from array import array
+from typing import TYPE_CHECKING, Any, Optional
+
+from .data_classes import HeatersStatus, OperationMode, TestAreaState
+
+if TYPE_CHECKING:
+    from .espec_pr3j import EspecPr3j
+
+_LOGGER = logging.getLogger(__name__)
+
+MODE_CODES: dict[OperationMode, int] = {
+    mode: code for code, mode in enumerate(OperationMode)
+}
+"""The integer codes used to store the operation modes in a `TelemetryBuffer`"""
+
+
+class TelemetryBuffer:
+    """
+    A fixed-capacity ring buffer of telemetry samples, with one `array` per field.
+
+    Every sample is stored twice, `capacity` positions apart, so the latest samples
+    are always contiguous in memory and can be returned as `memoryview` slices
+    without copying. The views can be wrapped without copying as well, e.g. with
+    `numpy.frombuffer`. They are overwritten as new samples arrive, so copy them
+    (e.g. with `tolist()`) to keep them.
+
+    Args:
+        `capacity (int)`: The maximum number of samples kept.
+    """
+
+    FIELDS = {
+        "timestamp": "d",
+        "temperature": "d",
+        "humidity": "d",
+        "temperature_heater": "d",
+        "humidity_heater": "d",
+        "mode": "b",
+        "alarms": "i",
+    }
+    """The fields of each sample and their `array` type codes. The timestamp is in
+    seconds since the epoch, the mode is stored as its `MODE_CODES` value, and the
+    heater outputs are NaN when they were not sampled."""
+
+    def __init__(self, capacity: int):
+        assert capacity > 0
+
+        self.capacity = capacity
+        """The maximum number of samples kept"""
+
+        self._arrays: dict[str, array[Any]] = {
+            name: array(type_code, bytes(2 * capacity * array(type_code).itemsize))
+            for name, type_code in self.FIELDS.items()
+        }
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    @property
+    def total_samples(self) -> int:
+        """The number of samples appended since the buffer was created"""
+        return self._count
+
+    def append(
+        self,
+        timestamp: float,
+        test_area_state: TestAreaState,
+        heaters_status: Optional[HeatersStatus] = None,
+    ):
+        """
+        Appends a sample, overwriting the oldest one if the buffer is full.
+
+        Args:
+            `timestamp`: The time of the sample, in seconds since the epoch.
+            `test_area_state`: The test area state of the chamber.
+            `heaters_status`: The heaters status of the chamber, if sampled.
+        """
+        values: dict[str, Any] = {
+            "timestamp": timestamp,
+            "temperature": test_area_state.current_temperature,
+            "humidity": test_area_state.current_humidity,
+            "temperature_heater": math.nan,
+            "humidity_heater": math.nan,
+            "mode": MODE_CODES[test_area_state.operation_state],
+            "alarms": test_area_state.number_of_alarms,
+        }
+        if heaters_status is not None:
+            values["temperature_heater"] = heaters_status.temperature_heater
+            values["humidity_heater"] = heaters_status.humidity_heater
+
+        with self._lock:
+            index = self._count % self.capacity
+            for name, value in values.items():
+                self._arrays[name][index] = value
+                self._arrays[name][index + self.capacity] = value
+            self._count += 1
+
+    def latest(self, field: str, n: Optional[int] = None) -> memoryview:
+        """
+        Returns a zero-copy view of the latest samples of a field, oldest first.
+
+        Args:
+            `field`: The name of the field, one of `FIELDS`.
+            `n`: The number of samples. If None, or more than available, all the
+                available samples are returned.
+        """
+        return self.latest_samples(n)[field]
+
+    def latest_samples(self, n: Optional[int] = None) -> dict[str, memoryview]:
+        """
+        Returns zero-copy views of the latest samples of all the fields, oldest first.
+        All the views refer to the same samples.
+
+        Args:
+            `n`: The number of samples. If None, or more than available, all the
+                available samples are returned.
+        """
+        with self._lock:
+            available = min(self._count, self.capacity)
+            n = available if n is None else min(n, available)
+            end = (self._count - 1) % self.capacity + self.capacity + 1
+            if self._count == 0:
+                end = 0
+
+        return {
+            name: memoryview(values)[end - n : end]
+            for name, values in self._arrays.items()
+        }
+
+
+class TelemetrySampler:
+    """
+    Samples the test area state and the heaters of a chamber from a background thread
+    into a `TelemetryBuffer`. Readers of the buffer never touch the instrument.
+
+    Sampling errors are logged and counted, and the sampler keeps running.
+
+    Args:
+        `chamber (EspecPr3j)`: The environmental chamber to sample.
+        `interval (float)`: The sampling interval in seconds. Default is 1.
+        `capacity (int)`: The capacity of the buffer, in samples. Default is one day
+            at 1 Hz.
+        `heaters (bool)`: Whether to sample the heaters status (`%?`) besides the test
+            area state (`MON?`). Default is True.
+    """
+
+    def __init__(
+        self,
+        chamber: "EspecPr3j",
+        interval: float = 1.0,
+        capacity: int = 24 * 60 * 60,
+        heaters: bool = True,
+    ):
+        self.chamber = chamber
+        """The sampled environmental chamber"""
+
+        self.interval = interval
+        """The sampling interval in seconds"""
+
+        self.heaters = heaters
+        """Whether the heaters status is sampled"""
+
+        self.buffer = TelemetryBuffer(capacity)
+        """The buffer holding the samples"""
+
+        self.errors = 0
+        """The number of failed samples"""
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the sampler thread is running"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Starts the sampler thread.
+        """
+        if self.running:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="espec_pr3j_telemetry", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stops the sampler thread and waits for it to finish.
+
+        Args:
+            `timeout`: The maximum time in seconds to wait for the thread.
+        """
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def sample(self):
+        """
+        Takes a single sample and appends it to the buffer.
+        """
+        timestamp = time.time()
+        test_area_state = self.chamber.get_test_area_state()
+        heaters_status = self.chamber.get_heater_percentage() if self.heaters else None
+        self.buffer.append(timestamp, test_area_state, heaters_status)
+
+    def _run(self):
+        next_sample = time.monotonic()
+
+        while not self._stop_event.is_set():
+            try:
+                self.sample()
+            except Exception as error:
+                self.errors += 1
+                _LOGGER.error("Failed to sample the environmental chamber")
+                _LOGGER.debug(f"Error: '{error!r}'")
+
+            # keep the sampling rate even if a sample takes a while
+            next_sample += self.interval
+            delay = next_sample - time.monotonic()
+            if delay < 0:
+                next_sample = time.monotonic()
+                delay = 0
+            self._stop_event.wait(delay)
@@ -0,0 +1,392 @@
+import bisect
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Iterator, Optional, Union
+
+from . import protocol
+from .data_classes import (
+    CommandEvent,
+    HeatersStatus,
+    TelemetryRecord,
+    TestAreaState,
+)
+from .hooks import CommandHook
+from .telemetry import MODE_CODES
+
+if TYPE_CHECKING:
+    import numpy  # type: ignore[import-not-found]
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"EPR3JTLM"
+"""The first bytes of a telemetry log"""
+
+VERSION = 1
+"""The version of the telemetry log format"""
+
+HEADER = struct.Struct("<8sHH4x")
+"""The header of a telemetry log: `MAGIC`, the version and the size of a record"""
+
+RECORD = struct.Struct("<5dib3x")
+"""A record of a telemetry log: the timestamp, temperature, humidity, temperature
+heater and humidity heater as `float64`, the number of alarms as `int32` and the mode
+as its `MODE_CODES` value in an `int8`, padded to 48 bytes"""
+
+FIELDS = (
+    "timestamp",
+    "temperature",
+    "humidity",
+    "temperature_heater",
+    "humidity_heater",
+    "alarms",
+    "mode",
+)
+"""The fields of a record, in order"""
+
+_MODES = {code: mode for mode, code in MODE_CODES.items()}
+
+
+def numpy_dtype() -> "numpy.dtype":
+    """
+    Returns the NumPy structured type of the records of a telemetry log. Requires
+    NumPy.
+    """
+    import numpy  # type: ignore[import-not-found]
+
+    return numpy.dtype(
+        {
+            "names": list(FIELDS),
+            "formats": ["<f8"] * 5 + ["<i4", "i1"],
+            "offsets": [0, 8, 16, 24, 32, 40, 44],
+            "itemsize": RECORD.size,
+        }
+    )
+
+
+def _check_header(header: bytes, path: Union[str, Path]):
+    if len(header) < HEADER.size:
+        raise ValueError(f"Not a telemetry log: {path}")
+
+    magic, version, record_size = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError(f"Not a telemetry log: {path}")
+
+
+class TelemetryLogWriter(CommandHook):
+    """
+    Appends telemetry samples to a file of fixed-width records (see `RECORD`), to be
+    read with a `TelemetryLogReader` without loading it into memory.
+
+    Samples are appended with `append`, or taken from the chamber getters when the
+    writer is one of the hooks of a chamber: every `MON?` response is written, with
+    the `%?` response that follows it, if any.
+
+        chamber.hooks.append(TelemetryLogWriter("soak.tlm"))
+
+    Records are buffered, and reach the file when the buffer fills, on `flush` and on
+    `close`. A record left incomplete by a crash is dropped when the log is reopened.
+
+    Args:
+        `path (Union[str, Path])`: The telemetry log. New records are appended to it
+            if it exists.
+
+    Raises:
+        `ValueError`: If the file exists and is not a telemetry log.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+
+        self._file: Optional[BinaryIO] = self._open(self.path)
+        self._last_timestamp = -math.inf
+        if self._file.tell() > HEADER.size:
+            self._file.seek(-RECORD.size, os.SEEK_END)
+            self._last_timestamp = RECORD.unpack(self._file.read(RECORD.size))[0]
+        self._pending: Optional[tuple[float, TestAreaState]] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "TelemetryLogWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _open(path: Path) -> BinaryIO:
+        file: BinaryIO
+        if not path.exists() or path.stat().st_size == 0:
+            file = open(path, "wb")
+            file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+            file.flush()
+            return file
+
+        file = open(path, "r+b")
+        try:
+            _check_header(file.read(HEADER.size), path)
+        except ValueError:
+            file.close()
+            raise
+
+        size = file.seek(0, os.SEEK_END)
+        incomplete = (size - HEADER.size) % RECORD.size
+        if incomplete:
+            _LOGGER.warning(f"Dropping an incomplete record at the end of {path}")
+            file.truncate(size - incomplete)
+            file.seek(0, os.SEEK_END)
+        return file
+
+    def append(
+        self,
+        timestamp: float,
+        test_area_state: TestAreaState,
+        heaters_status: Optional[HeatersStatus] = None,
+    ):
+        """
+        Appends a sample.
+
+        Args:
+            `timestamp`: The time of the sample, in seconds since the epoch. Samples
+                must be appended in time order.
+            `test_area_state`: The test area state of the chamber.
+            `heaters_status`: The heaters status of the chamber, if sampled.
+
+        Raises:
+            `ValueError`: If the sample is older than the last one appended, or the
+                writer was closed.
+        """
+        with self._lock:
+            self._write(timestamp, test_area_state, heaters_status)
+
+    def _write(
+        self,
+        timestamp: float,
+        test_area_state: TestAreaState,
+        heaters_status: Optional[HeatersStatus] = None,
+    ):
+        if self._file is None:
+            raise ValueError("The telemetry log was closed")
+        if timestamp < self._last_timestamp:
+            raise ValueError(
+                f"Samples must be appended in time order ({timestamp} < "
+                f"{self._last_timestamp})"
+            )
+
+        heaters = (math.nan, math.nan)
+        if heaters_status is not None:
+            heaters = (
+                heaters_status.temperature_heater,
+                heaters_status.humidity_heater,
+            )
+
+        self._file.write(
+            RECORD.pack(
+                timestamp,
+                test_area_state.current_temperature,
+                test_area_state.current_humidity,
+                *heaters,
+                test_area_state.number_of_alarms,
+                MODE_CODES[test_area_state.operation_state],
+            )
+        )
+        self._last_timestamp = timestamp
+
+    def after_command(self, event: CommandEvent):
+        # cached responses were already written when they were fetched
+        if event.cached or event.error is not None or event.response is None:
+            return
+
+        if event.command == protocol.TEST_AREA_STATE.encode():
+            state = protocol.TEST_AREA_STATE.decode(event.response)
+            with self._lock:
+                self._write_pending()
+                self._pending = (time.time(), state)
+        elif event.command == protocol.HEATERS_STATUS.encode():
+            heaters = protocol.HEATERS_STATUS.decode(event.response)
+            with self._lock:
+                self._write_pending(heaters)
+
+    def _write_pending(self, heaters_status: Optional[HeatersStatus] = None):
+        if self._pending is not None:
+            timestamp, state = self._pending
+            self._pending = None
+            self._write(timestamp, state, heaters_status)
+
+    def flush(self):
+        """
+        Writes the buffered records to the file.
+        """
+        with self._lock:
+            self._write_pending()
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        """
+        Writes the buffered records and closes the file.
+        """
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class TelemetryLogReader:
+    """
+    Reads a telemetry log written by a `TelemetryLogWriter` through a memory map, so
+    only the records read are loaded, and time ranges are found by binary search on
+    the timestamps.
+
+        with TelemetryLogReader("soak.tlm") as log:
+            first, last = log.time_range(start, end)
+            temperatures = log.to_numpy(start, end)["temperature"]
+
+    The records appended after the log was opened are seen after `refresh`.
+
+    Args:
+        `path (Union[str, Path])`: The telemetry log.
+
+    Raises:
+        `ValueError`: If the file is not a telemetry log.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+
+        self._file = open(self.path, "rb")
+        try:
+            _check_header(self._file.read(HEADER.size), self.path)
+        except ValueError:
+            self._file.close()
+            raise
+
+        self._map: Optional[mmap.mmap] = None
+        self._count = 0
+        self.refresh()
+
+    def __enter__(self) -> "TelemetryLogReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> TelemetryRecord:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("Telemetry record index out of range")
+
+        assert self._map is not None
+        values = dict(
+            zip(
+                FIELDS, RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size)
+            )
+        )
+        values["mode"] = _MODES[values["mode"]]
+        return TelemetryRecord(**values)
+
+    def refresh(self):
+        """
+        Maps the records appended since the log was opened or last refreshed.
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        count = (size - HEADER.size) // RECORD.size
+        if count == self._count and self._map is not None:
+            return
+
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._count = count
+
+    def timestamp(self, index: int) -> float:
+        """
+        Returns the timestamp of a record, without reading the rest of it.
+        """
+        assert self._map is not None
+        return struct.unpack_from("<d", self._map, HEADER.size + index * RECORD.size)[0]
+
+    def time_range(
+        self, start: Optional[float] = None, end: Optional[float] = None
+    ) -> tuple[int, int]:
+        """
+        Returns the indices of the first record at or after `start` and of the first
+        record after `end`.
+
+        Args:
+            `start`: The start of the range, in seconds since the epoch. If None, the
+                range starts at the first record.
+            `end`: The end of the range, included. If None, the range ends at the last
+                record.
+        """
+        timestamps = _Timestamps(self)
+        first = 0 if start is None else bisect.bisect_left(timestamps, start)
+        last = self._count if end is None else bisect.bisect_right(timestamps, end)
+        return first, max(first, last)
+
+    def records(
+        self, start: Optional[float] = None, end: Optional[float] = None
+    ) -> Iterator[TelemetryRecord]:
+        """
+        Iterates over the records of a time range. See `time_range`.
+        """
+        first, last = self.time_range(start, end)
+        for index in range(first, last):
+            yield self[index]
+
+    def to_numpy(
+        self, start: Optional[float] = None, end: Optional[float] = None
+    ) -> "numpy.ndarray":
+        """
+        Returns the records of a time range as a read-only NumPy `memmap` of
+        `numpy_dtype`, so fields are read from the file as they are used, e.g.
+        `log.to_numpy(start, end)["temperature"].mean()`. Requires NumPy.
+
+        See `time_range`.
+        """
+        import numpy  # type: ignore[import-not-found]
+
+        first, last = self.time_range(start, end)
+        if first == last:
+            return numpy.empty(0, dtype=numpy_dtype())
+
+        return numpy.memmap(
+            self.path,
+            dtype=numpy_dtype(),
+            mode="r",
+            offset=HEADER.size + first * RECORD.size,
+            shape=(last - first,),
+        )
+
+    def close(self):
+        """
+        Unmaps and closes the log.
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class _Timestamps:
+    """
+    A sequence view of the timestamps of a log, for `bisect`.
+    """
+
+    def __init__(self, reader: TelemetryLogReader):
+        self._reader = reader
+
+    def __len__(self) -> int:
+        return len(self._reader)
+
+    def __getitem__(self, index: int) -> Any:
+        return self._reader.timestamp(index)
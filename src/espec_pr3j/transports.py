@@ -0,0 +1,316 @@
+import logging
+import re
+import socket
+import time
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Callable, Optional, cast
+
+from .clock import Clock, SystemClock
+
+if TYPE_CHECKING:
+    import pyvisa
+    from pyvisa.resources import MessageBasedResource
+
+_LOGGER = logging.getLogger(__name__)
+
+LINE_TERMINATION = "\r\n"
+"""The line termination character used by the environmental chamber"""
+
+TCP_PORT = 57732
+"""The TCP port of the environmental chamber"""
+
+ENCODING = "ascii"
+"""The encoding of the messages exchanged with the environmental chamber"""
+
+
+class Transport(ABC):
+    """
+    Exchanges line-based messages with an environmental chamber. Subclasses implement
+    `write`, `read` and `close`, and `open` if they need to connect.
+
+    Creating a transport does not connect it. The connection is opened by `open`, or
+    on the first message written.
+    """
+
+    resource_path: str
+    """A path identifying the chamber the transport is connected to"""
+
+    def open(self):
+        """
+        Opens the connection, if not open yet.
+        """
+
+    @abstractmethod
+    def write(self, message: str):
+        """
+        Writes a message, without line termination.
+        """
+
+    @abstractmethod
+    def read(self) -> str:
+        """
+        Reads a message, without line termination, blocking until it arrives or the
+        communication times out.
+        """
+
+    def query(self, message: str, delay: float = 0.0) -> str:
+        """
+        Writes a message and reads its response.
+
+        Args:
+            `message`: The message to write.
+            `delay`: The time in seconds to wait between writing and reading.
+        """
+        self.write(message)
+        if delay > 0:
+            time.sleep(delay)
+        return self.read()
+
+    @abstractmethod
+    def close(self):
+        """
+        Closes the connection.
+        """
+
+
+class VisaTransport(Transport):
+    """
+    A transport over a PyVISA resource. PyVISA is only imported when the transport
+    is opened.
+
+    Args:
+        `resource_path (str)`: The resource path of the environmental chamber.
+        `resource_manager (Optional[pyvisa.ResourceManager])`: An optional PyVISA
+            resource manager. If None, the default one is used. Default is None.
+        `timeout (Optional[int])`: The communication timeout in milliseconds. Default
+            is 5000.
+    """
+
+    def __init__(
+        self,
+        resource_path: str,
+        resource_manager: Optional["pyvisa.ResourceManager"] = None,
+        timeout: Optional[int] = None,
+    ):
+        self.resource_path = resource_path
+
+        self._resource_manager = resource_manager
+        self._timeout = timeout or 5000
+        self._resource: Optional["MessageBasedResource"] = None
+
+    def open(self):
+        if self._resource is not None:
+            return
+
+        import pyvisa
+
+        if self._resource_manager is None:
+            self._resource_manager = pyvisa.ResourceManager()
+
+        resource = cast(
+            "MessageBasedResource",
+            self._resource_manager.open_resource(self.resource_path),
+        )
+        _LOGGER.debug(f"Connected to the environmental chamber at {self.resource_path}")
+
+        resource.write_termination = LINE_TERMINATION
+        resource.read_termination = LINE_TERMINATION
+        resource.timeout = self._timeout
+        self._resource = resource
+
+    def _opened_resource(self) -> "MessageBasedResource":
+        self.open()
+        assert self._resource is not None
+        return self._resource
+
+    def write(self, message: str):
+        try:
+            self._opened_resource().write(message)
+        except Exception:
+            self._drop()
+            raise
+
+    def read(self) -> str:
+        try:
+            return self._opened_resource().read()
+        except Exception:
+            self._drop()
+            raise
+
+    def query(self, message: str, delay: float = 0.0) -> str:
+        try:
+            return self._opened_resource().query(message, delay=delay)
+        except Exception:
+            self._drop()
+            raise
+
+    def _drop(self):
+        """
+        Closes the resource after a failed exchange: a late response would be taken as
+        the one of the next command, so the next command reopens it instead.
+        """
+        try:
+            self.close()
+        except Exception as error:
+            _LOGGER.debug(f"Failed to close the resource: '{error!r}'")
+            self._resource = None
+
+    def close(self):
+        if self._resource is not None:
+            self._resource.close()
+            self._resource = None
+
+
+class SocketTransport(Transport):
+    """
+    A lightweight transport over a raw TCP socket, with `\\r\\n` framing.
+
+    Args:
+        `hostname (str)`: Host name of the environmental chamber. It can be an IP
+            address.
+        `port (Optional[int])`: The TCP port of the environmental chamber. Default is
+            `TCP_PORT`.
+        `timeout (Optional[int])`: The communication timeout in milliseconds. Default
+            is 5000.
+        `skip_delays (bool)`: If True, `query` reads right after writing, skipping the
+            delay of the client. Meant for a `ChamberMultiplexer`, which already waits
+            the delays before reading from the chamber. Default is False.
+    """
+
+    RESOURCE_PATH_PATTERN = re.compile(
+        r"TCPIP\d*::(?P<hostname>[^:]+)::(?P<port>\d+)::SOCKET", re.IGNORECASE
+    )
+    """The pattern of the VISA resource paths of raw TCP sockets"""
+
+    RECEIVE_SIZE = 4096
+    """The maximum number of bytes received at once"""
+
+    def __init__(
+        self,
+        hostname: str,
+        port: Optional[int] = None,
+        timeout: Optional[int] = None,
+        skip_delays: bool = False,
+    ):
+        self.hostname = hostname
+        self.port = port or TCP_PORT
+        self.resource_path = f"TCPIP0::{self.hostname}::{self.port}::SOCKET"
+        self.skip_delays = skip_delays
+
+        self._timeout = timeout or 5000
+        self._socket: Optional[socket.socket] = None
+        self._buffer = bytearray()
+        self._termination = LINE_TERMINATION.encode(ENCODING)
+
+    def open(self):
+        if self._socket is not None:
+            return
+
+        self._socket = socket.create_connection(
+            (self.hostname, self.port), timeout=self._timeout / 1000
+        )
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._buffer.clear()
+        _LOGGER.debug(f"Connected to the environmental chamber at {self.resource_path}")
+
+    def _opened_socket(self) -> socket.socket:
+        self.open()
+        assert self._socket is not None
+        return self._socket
+
+    @classmethod
+    def from_resource_path(
+        cls, resource_path: str, timeout: Optional[int] = None
+    ) -> "SocketTransport":
+        """
+        Creates a socket transport from a VISA resource path of a raw TCP socket
+        (e.g. `TCPIP0::mskclimate3::57732::SOCKET`).
+
+        Raises:
+            `ValueError`: If the resource path is not a raw TCP socket.
+        """
+        match = cls.RESOURCE_PATH_PATTERN.fullmatch(resource_path)
+        if match is None:
+            raise ValueError(f"Not a TCP socket resource path: '{resource_path}'")
+
+        return cls(match["hostname"], int(match["port"]), timeout=timeout)
+
+    def query(self, message: str, delay: float = 0.0) -> str:
+        return super().query(message, 0.0 if self.skip_delays else delay)
+
+    def write(self, message: str):
+        try:
+            self._opened_socket().sendall(message.encode(ENCODING) + self._termination)
+        except Exception:
+            self.close()
+            raise
+
+    def read(self) -> str:
+        try:
+            return self._read()
+        except Exception:
+            # a late response would be taken as the one of the next command, so the
+            # next command reconnects instead
+            self.close()
+            raise
+
+    def _read(self) -> str:
+        while True:
+            index = self._buffer.find(self._termination)
+            if index >= 0:
+                message = bytes(self._buffer[:index])
+                del self._buffer[: index + len(self._termination)]
+                return message.decode(ENCODING)
+
+            chunk = self._opened_socket().recv(self.RECEIVE_SIZE)
+            if not chunk:
+                raise ConnectionError("The environmental chamber closed the connection")
+            self._buffer += chunk
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        self._buffer.clear()
+
+
+class InProcessTransport(Transport):
+    """
+    A transport to a chamber implemented in the same process, such as a simulator.
+
+    Args:
+        `handler (Callable[[str], str])`: Returns the response to a message. A trailing
+            line termination in the response is removed.
+        `name (str)`: The name of the chamber, used in the resource path. Default is
+            `chamber`.
+        `clock (Optional[Clock])`: The clock used to wait between writing a message and
+            reading its response. Default is the system clock.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str], str],
+        name: str = "chamber",
+        clock: Optional[Clock] = None,
+    ):
+        self.resource_path = f"INPROCESS::{name}"
+        self._handler = handler
+        self._clock = clock or SystemClock()
+        self._responses: list[str] = []
+
+    def write(self, message: str):
+        response = self._handler(message)
+        self._responses.append(response.removesuffix(LINE_TERMINATION))
+
+    def read(self) -> str:
+        if not self._responses:
+            raise TimeoutError("No response to read")
+        return self._responses.pop(0)
+
+    def query(self, message: str, delay: float = 0.0) -> str:
+        self.write(message)
+        self._clock.sleep(delay)
+        return self.read()
+
+    def close(self):
+        self._responses.clear()
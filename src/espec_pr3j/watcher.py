@@ -0,0 +1,239 @@
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Optional
+
+from . import protocol
+from .data_classes import CommandEvent, StateChange, TestAreaState
+from .hooks import CommandHook
+from .scheduler import PollScheduler
+
+if TYPE_CHECKING:
+    from .espec_pr3j import EspecPr3j
+
+_LOGGER = logging.getLogger(__name__)
+
+ChangeCallback = Callable[[StateChange], None]
+"""A function called with every change of the alarms or operation mode"""
+
+
+class ChamberWatcher(CommandHook):
+    """
+    Watches the alarms and the operation mode of a chamber by polling `MON?`, and
+    calls its callbacks only when they change.
+
+    The poll interval adapts to the chamber: it drops to `min_interval` on a change,
+    while the temperature or humidity move by more than the chamber accuracy between
+    polls, and when a setting command is sent through the chamber. At steady state it
+    grows by `backoff` after every poll, up to `max_interval`.
+
+    Once started, the watcher is one of the hooks of the chamber, so the `MON?`
+    responses read by other users of the chamber (e.g. a telemetry sampler) count as
+    polls too, and its own polls are pushed back.
+
+        watcher = ChamberWatcher(chamber, callback=lambda change: print(change))
+        watcher.start()
+
+    The polls run on a `PollScheduler` on the clock of the chamber. Alternatively,
+    `step` polls once and returns the time to wait before the next poll, e.g. to drive
+    the watcher from a loop on the clock of the chamber.
+
+    Args:
+        `chamber (EspecPr3j)`: The environmental chamber.
+        `callback (Optional[ChangeCallback])`: A function called with every change.
+            More can be added with `add_callback`.
+        `min_interval (float)`: The poll interval around transitions, in seconds.
+            Default is 1.
+        `max_interval (float)`: The poll interval at steady state, in seconds. Default
+            is 30.
+        `backoff (float)`: The factor the interval grows by after every steady poll.
+            Default is 2.
+    """
+
+    def __init__(
+        self,
+        chamber: "EspecPr3j",
+        callback: Optional[ChangeCallback] = None,
+        min_interval: float = 1.0,
+        max_interval: float = 30.0,
+        backoff: float = 2.0,
+    ):
+        assert 0 < min_interval <= max_interval
+        assert backoff >= 1.0
+
+        self.chamber = chamber
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+
+        self.interval = min_interval
+        """The current poll interval in seconds"""
+
+        self.state: Optional[TestAreaState] = None
+        """The latest test area state seen. None before the first poll"""
+
+        self.polls = 0
+        """The number of `MON?` queries sent by the watcher"""
+
+        self._callbacks: list[ChangeCallback] = []
+        if callback is not None:
+            self._callbacks.append(callback)
+
+        self._last_seen: Optional[float] = None
+        self._poll_thread: Optional[int] = None
+        self._scheduler: Optional[PollScheduler] = None
+        self._generation = 0
+        self._lock = threading.RLock()
+
+    def add_callback(self, callback: ChangeCallback):
+        """
+        Adds a function called with every change, from the thread that read it. Errors
+        raised by the callback are logged.
+        """
+        self._callbacks.append(callback)
+
+    def start(self, scheduler: Optional[PollScheduler] = None):
+        """
+        Registers the watcher as a hook of the chamber and starts polling.
+
+        Args:
+            `scheduler`: The scheduler running the polls, on the clock of the chamber.
+                Default is the one shared by all the chambers, in real time.
+
+        Raises:
+            `ValueError`: If the scheduler does not run on the clock of the chamber.
+        """
+        scheduler = scheduler or PollScheduler.default()
+        scheduler.check_clock(self.chamber.clock)
+
+        with self._lock:
+            if self._scheduler is not None:
+                return
+            self._scheduler = scheduler
+            if self not in self.chamber.hooks:
+                self.chamber.hooks.append(self)
+            self._schedule(0.0, self._generation)
+
+    def stop(self):
+        """
+        Stops polling and unregisters the watcher from the chamber.
+        """
+        with self._lock:
+            self._scheduler = None
+            self._generation += 1
+            if self in self.chamber.hooks:
+                self.chamber.hooks.remove(self)
+
+    def _schedule(self, delay: float, generation: int):
+        """
+        Schedules a poll of a chain of polls. The chain is dropped once the generation
+        changes, i.e. when the watcher is stopped or a new chain is started.
+        """
+        scheduler = self._scheduler
+        assert scheduler is not None
+
+        def step():
+            with self._lock:
+                if generation != self._generation:
+                    return
+            delay = self.step()
+            with self._lock:
+                # a new chain may have been started while polling
+                if generation != self._generation:
+                    return
+                self._schedule(delay, generation)
+
+        scheduler.call_later(delay, step)
+
+    def step(self) -> float:
+        """
+        Polls the chamber, unless it was seen recently enough, and returns the time in
+        seconds to wait before the next poll.
+        """
+        if self._remaining() <= 1e-9:
+            self._poll_thread = threading.get_ident()
+            try:
+                state = self.chamber.get_test_area_state()
+            except Exception as error:
+                _LOGGER.error("Failed to poll the environmental chamber")
+                _LOGGER.debug(f"Error: '{error!r}'")
+                return self.min_interval
+            finally:
+                self._poll_thread = None
+
+            self.polls += 1
+            self._observe(state)
+
+        return max(self._remaining(), 0.0)
+
+    def _remaining(self) -> float:
+        with self._lock:
+            if self._last_seen is None:
+                return 0.0
+            return self._last_seen + self.interval - self.chamber.clock.time()
+
+    def before_command(self, chamber: str, command: str):
+        try:
+            kind = protocol.parse_request(command)[0].kind
+        except ValueError:
+            kind = protocol.CommandKind.SETTING
+        if kind == protocol.CommandKind.MONITOR:
+            return
+
+        _LOGGER.debug(f"'{command}' sent, polling every {self.min_interval}s")
+        with self._lock:
+            self.interval = self.min_interval
+            if self._scheduler is not None:
+                # drop the pending poll and watch the transition from now on
+                self._generation += 1
+                self._schedule(self.min_interval, self._generation)
+
+    def after_command(self, event: CommandEvent):
+        if (
+            event.command != protocol.TEST_AREA_STATE.encode()
+            or event.cached
+            or event.error is not None
+            or event.response is None
+            or self._poll_thread == threading.get_ident()
+        ):
+            return
+
+        self._observe(protocol.TEST_AREA_STATE.decode(event.response))
+
+    def _observe(self, state: TestAreaState):
+        with self._lock:
+            previous = self.state
+            self.state = state
+            self._last_seen = self.chamber.clock.time()
+            if previous is None:
+                return
+
+            change = StateChange(
+                timestamp=time.time(),
+                previous=previous,
+                current=state,
+                mode_changed=state.operation_state != previous.operation_state,
+                alarms_changed=state.number_of_alarms != previous.number_of_alarms,
+            )
+            moving = (
+                abs(state.current_temperature - previous.current_temperature)
+                > self.chamber.temperature_accuracy
+                or abs(state.current_humidity - previous.current_humidity)
+                > self.chamber.humidity_accuracy
+            )
+            if change.mode_changed or change.alarms_changed or moving:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+
+        if change.mode_changed or change.alarms_changed:
+            _LOGGER.info(
+                f"{previous.operation_state} -> {state.operation_state}, "
+                f"{state.number_of_alarms} alarms"
+            )
+            for callback in self._callbacks:
+                try:
+                    callback(change)
+                except Exception as error:
+                    _LOGGER.error("Change callback failed")
+                    _LOGGER.debug(f"Error: '{error!r}'")
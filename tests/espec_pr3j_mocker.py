@@ -1,12 +1,22 @@
 import random
-from typing import Optional
+from typing import Any, Optional
 
 from pyvisa_mock.base.base_mocker import BaseMocker, scpi
 
+from espec_pr3j import (
+    HeatersStatus,
+    HumidityStatus,
+    OperationMode,
+    TemperatureStatus,
+    TestAreaState,
+    protocol,
+)
+
 
 class EspecPr3jMocker(BaseMocker):
     """
-    A mocker for an Espec PR-3J environmental chamber.
+    A mocker for an Espec PR-3J environmental chamber. The responses are formatted
+    with the protocol command table used by the client.
     """
 
     LINE_TERMINATION = "\r\n"
@@ -37,6 +47,9 @@ class EspecPr3jMocker(BaseMocker):
 
         self._mode = "STANDBY"
 
+    def _respond(self, command: protocol.Command, value: Any = None) -> str:
+        return f"{command.format_response(value)}{self.LINE_TERMINATION}"
+
     @scpi("TEMP, S<temperature>")
     def _set_target_temperature(self, temperature: float) -> str:
         self._target_temperature = temperature
@@ -51,7 +64,7 @@ class EspecPr3jMocker(BaseMocker):
         for step in range(self._temperature_num_steps + 1):
             self._temperature_steps.append(current + step * step_size)
 
-        return f"OK:TEMP, S{temperature:.1f}{self.LINE_TERMINATION}"  # noqa E231
+        return self._respond(protocol.SET_TARGET_TEMPERATURE, temperature)
 
     @property
     def _current_temperature(self) -> float:
@@ -64,28 +77,28 @@ class EspecPr3jMocker(BaseMocker):
     @scpi("TEMP, H<temperature>")
     def _set_upper_temperature(self, temperature: float) -> str:
         self._upper_temperature = temperature
-        return f"OK:TEMP, H {temperature:.1f}{self.LINE_TERMINATION}"  # noqa E231
+        return self._respond(protocol.SET_UPPER_TEMPERATURE_LIMIT, temperature)
 
     @scpi("TEMP, L<temperature>")
     def _set_lower_temperature(self, temperature: float) -> str:
         self._lower_temperature = temperature
-        return f"OK:TEMP, L {temperature:.1f}{self.LINE_TERMINATION}"  # noqa E231
+        return self._respond(protocol.SET_LOWER_TEMPERATURE_LIMIT, temperature)
 
     @scpi("TEMP?")
     def _get_temperature_status(self) -> str:
-        response = f"{self._current_temperature:.1f}"  # noqa E231
-        response += f",{self._target_temperature:.1f}"  # noqa E231
-        response += f",{self._upper_temperature:.1f}"  # noqa E231
-        response += f",{self._lower_temperature:.1f}"  # noqa E231
-        response += f"{self.LINE_TERMINATION}"
-
-        return response
+        status = TemperatureStatus(
+            current_temperature=self._current_temperature,
+            target_temperature=self._target_temperature,
+            upper_limit=self._upper_temperature,
+            lower_limit=self._lower_temperature,
+        )
+        return self._respond(protocol.TEMPERATURE_STATUS, status)
 
     @scpi("HUMI, S<humidity>")
     def _set_target_humidity(self, humidity: str) -> str:
         if isinstance(humidity, str) and humidity == "OFF":
             self._target_humidity = None
-            return f"OK:HUMI, S{humidity}{self.LINE_TERMINATION}"  # noqa E231
+            return self._respond(protocol.DISABLE_HUMIDITY)
 
         self._target_humidity = float(humidity)
 
@@ -99,10 +112,7 @@ class EspecPr3jMocker(BaseMocker):
         for step in range(self._humidity_num_steps + 1):
             self._humidity_steps.append(current + step * step_size)
 
-        return (
-            f"OK:HUMI, S{self._target_humidity:.1f}"  # noqa E231
-            f"{self.LINE_TERMINATION}"
-        )
+        return self._respond(protocol.SET_TARGET_HUMIDITY, self._target_humidity)
 
     @property
     def _current_humidity(self) -> float:
@@ -119,27 +129,22 @@ class EspecPr3jMocker(BaseMocker):
     @scpi("HUMI, H<humidity>")
     def _set_upper_humidity(self, humidity: float) -> str:
         self._upper_humidity = humidity
-        return f"OK:HUMI, H{humidity:.0f}\r\n"  # noqa E231
+        return self._respond(protocol.SET_UPPER_HUMIDITY_LIMIT, humidity)
 
     @scpi("HUMI, L<humidity>")
     def _set_lower_humidity(self, humidity: float) -> str:
         self._lower_humidity = humidity
-        return f"OK:HUMI, L{humidity:.0f}{self.LINE_TERMINATION}"  # noqa E231
+        return self._respond(protocol.SET_LOWER_HUMIDITY_LIMIT, humidity)
 
     @scpi("HUMI?")
     def _get_humidity_status(self) -> str:
-        response = f"{self._current_humidity:.0f}"  # noqa E231
-
-        if self._target_humidity is None:
-            response += ",OFF"  # noqa E231
-        else:
-            response += f",{self._target_humidity:.0f}"  # noqa E231
-
-        response += f",{self._upper_humidity:.0f}"  # noqa E231
-        response += f",{self._lower_humidity:.0f}"  # noqa E231
-        response += f"{self.LINE_TERMINATION}"
-
-        return response
+        status = HumidityStatus(
+            current_humidity=self._current_humidity,
+            target_humidity=self._target_humidity,
+            upper_limit=self._upper_humidity,
+            lower_limit=self._lower_humidity,
+        )
+        return self._respond(protocol.HUMIDITY_STATUS, status)
 
     @scpi("MODE, <mode>")
     def _set_mode(self, mode: str) -> str:
@@ -147,28 +152,26 @@ class EspecPr3jMocker(BaseMocker):
             return f"NA:DATA NOT READY{self.LINE_TERMINATION}"  # noqa E231
 
         self._mode = mode
-        return f"OK:MODE, {mode}{self.LINE_TERMINATION}"  # noqa E231
+        return self._respond(protocol.SET_MODE, mode)
 
     @scpi("MODE?")
     def _get_mode(self) -> str:
-        return self._mode
+        return self._respond(protocol.MODE, self._mode)
 
     @scpi("MON?")
     def _get_monitor(self) -> str:
-        response = f"{self._current_temperature:.1f}"  # noqa E231
-        response += f",{self._current_humidity:.0f}"  # noqa E231
-        response += f",{self._mode}"  # noqa E231
-        response += ",0"  # noqa E231 number of alarms occurring
-        response += f"{self.LINE_TERMINATION}"
-
-        return response
+        state = TestAreaState(
+            current_temperature=self._current_temperature,
+            current_humidity=self._current_humidity,
+            operation_state=OperationMode.from_str(self._mode),
+            number_of_alarms=0,
+        )
+        return self._respond(protocol.TEST_AREA_STATE, state)
 
     @scpi("%?")
     def _get_heaters(self) -> str:
-        temperature_heater = random.random() * 100.0
-        humidity_heater = random.random() * 100.0
-
-        response = f"2,{temperature_heater},"  # noqa E231
-        response += f"{humidity_heater}{self.LINE_TERMINATION}"  # noqa E231
-
-        return response
+        status = HeatersStatus(
+            temperature_heater=random.random() * 100.0,
+            humidity_heater=random.random() * 100.0,
+        )
+        return self._respond(protocol.HEATERS_STATUS, status)
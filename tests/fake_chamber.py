@@ -0,0 +1,60 @@
+from typing import Any
+
+from espec_pr3j import (
+    HeatersStatus,
+    HumidityStatus,
+    OperationMode,
+    TemperatureStatus,
+    TestAreaState,
+    protocol,
+)
+
+
+class FakeChamber:
+    """
+    A minimal line-based chamber, with the temperature and humidity jumping straight
+    to their targets. It can answer in-process or over TCP.
+    """
+
+    def __init__(self):
+        self.temperature = 20.0
+        self.humidity = 40.0
+        self.mode = OperationMode.STANDBY
+        self.received: list[str] = []
+
+    def answer(self, command: str) -> str:
+        self.received.append(command)
+
+        try:
+            request, value = protocol.parse_request(command)
+        except ValueError:
+            return "NA:COMMAND ERR"
+
+        response: Any = value
+        if request is protocol.SET_TARGET_TEMPERATURE:
+            self.temperature = value
+        elif request is protocol.SET_TARGET_HUMIDITY:
+            self.humidity = value
+        elif request is protocol.SET_MODE:
+            if value == OperationMode.RUN:
+                return "NA:DATA NOT READY"
+            self.mode = value
+        elif request is protocol.TEMPERATURE_STATUS:
+            response = TemperatureStatus(self.temperature, self.temperature, 30.0, 10.0)
+        elif request is protocol.HUMIDITY_STATUS:
+            response = HumidityStatus(self.humidity, self.humidity, 90.0, 10.0)
+        elif request is protocol.TEST_AREA_STATE:
+            response = TestAreaState(self.temperature, self.humidity, self.mode, 0)
+        elif request is protocol.MODE:
+            response = self.mode
+        elif request is protocol.HEATERS_STATUS:
+            response = HeatersStatus(10.5, 20.5)
+
+        return request.format_response(response)
+
+    async def handle(self, reader, writer):
+        while line := await reader.readline():
+            command = line.decode("ascii").rstrip("\r\n")
+            writer.write(f"{self.answer(command)}\r\n".encode("ascii"))
+            await writer.drain()
+        writer.close()
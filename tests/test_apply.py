@@ -0,0 +1,107 @@
+import pytest
+
+from espec_pr3j import (
+    ChamberSettings,
+    ChamberSimulator,
+    EspecPr3j,
+    InProcessTransport,
+    OperationMode,
+    ResponseCache,
+    SettingError,
+    VirtualClock,
+)
+
+SETTINGS = ChamberSettings(
+    temperature=40.0,
+    humidity=60.0,
+    upper_temperature_limit=60.0,
+    lower_temperature_limit=20.0,
+    upper_humidity_limit=90.0,
+    lower_humidity_limit=10.0,
+    mode=OperationMode.CONSTANT,
+)
+
+
+@pytest.fixture
+def simulation():
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock, temperature=23.0)
+    requests = []
+
+    def handle(request):
+        requests.append(request)
+        return simulator.handle(request)
+
+    chamber = EspecPr3j(
+        transport=InProcessTransport(handle, clock=clock),
+        clock=clock,
+        cache=ResponseCache({"TEMP?": 60.0, "HUMI?": 60.0, "MODE?": 60.0}),
+    )
+    yield simulator, chamber, requests
+    chamber.close()
+
+
+def test_apply_sends_the_difference(simulation):
+    simulator, chamber, requests = simulation
+
+    sent = chamber.apply(SETTINGS)
+
+    assert sent == [
+        "TEMP, H 60.0",
+        "TEMP, L 20.0",
+        "HUMI, H90.0",
+        "HUMI, L10.0",
+        "TEMP, S40.0",
+        "HUMI, S60.0",
+        "MODE, CONSTANT",
+    ]
+    assert simulator.temperature_limits == (60.0, 20.0)
+    assert simulator.mode == OperationMode.CONSTANT
+    assert chamber._target_temperature == 40.0
+
+    # the chamber is already set up: the state comes from the cache
+    requests.clear()
+    assert chamber.apply(SETTINGS) == []
+    assert requests == []
+
+
+def test_apply_orders_stop_and_limits(simulation):
+    simulator, chamber, _ = simulation
+    simulator.mode = OperationMode.CONSTANT
+
+    sent = chamber.apply(
+        ChamberSettings(
+            upper_temperature_limit=-45.0,
+            lower_temperature_limit=-60.0,
+            humidity_control=False,
+            mode=OperationMode.STANDBY,
+        )
+    )
+
+    # the new range is below the current lower limit of -40
+    assert sent == ["MODE, STANDBY", "TEMP, L-60.0", "TEMP, H-45.0", "HUMI, SOFF"]
+    assert simulator.target_humidity is None
+
+
+def test_apply_verifies_readback(simulation):
+    simulator, chamber, _ = simulation
+
+    def ignore_temperature(request):
+        if request.startswith("TEMP, S"):
+            return f"OK:{request}"
+        return simulator.handle(request)
+
+    chamber._transport = InProcessTransport(ignore_temperature, clock=chamber.clock)
+
+    with pytest.raises(SettingError):
+        chamber.apply(ChamberSettings(temperature=50.0))
+    assert chamber.apply(ChamberSettings(temperature=50.0), verify=False) == [
+        "TEMP, S50.0"
+    ]
+
+
+def test_apply_rejects_programs(simulation):
+    _, chamber, _ = simulation
+
+    with pytest.raises(ValueError):
+        chamber.apply(ChamberSettings(mode=OperationMode.RUN))
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+from fake_chamber import FakeChamber
+
+from espec_pr3j import AsyncEspecPr3j, OperationMode, SettingError
+
+
+def run_with_chamber(test):
+    async def main():
+        fake = FakeChamber()
+        server = await asyncio.start_server(fake.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        async with server:
+            chamber = AsyncEspecPr3j(hostname="127.0.0.1", port=port)
+            chamber.MONITOR_COMMAND_DELAY = 0.0
+            chamber.SETTING_COMMAND_DELAY = 0.0
+            async with chamber:
+                await test(chamber, fake)
+
+    asyncio.run(main())
+
+
+def test_async_getters():
+    async def test(chamber: AsyncEspecPr3j, fake: FakeChamber):
+        temperature = await chamber.get_temperature_status()
+        assert temperature.current_temperature == 20.0
+        assert temperature.upper_limit == 30.0
+
+        humidity = await chamber.get_humidity_status()
+        assert humidity.target_humidity == 40.0
+
+        test_area = await chamber.get_test_area_state()
+        assert test_area.operation_state == OperationMode.STANDBY
+
+        heaters = await chamber.get_heater_percentage()
+        assert heaters.humidity_heater == 20.5
+
+    run_with_chamber(test)
+
+
+def test_async_concurrent_queries_are_serialized():
+    async def test(chamber: AsyncEspecPr3j, fake: FakeChamber):
+        results = await asyncio.gather(
+            chamber.get_mode(),
+            chamber.get_temperature_status(),
+            chamber.get_humidity_status(),
+        )
+        assert results[0] == OperationMode.STANDBY
+        assert results[1].current_temperature == 20.0
+        assert results[2].current_humidity == 40.0
+
+    run_with_chamber(test)
+
+
+def test_async_setting_error():
+    async def test(chamber: AsyncEspecPr3j, fake: FakeChamber):
+        with pytest.raises(SettingError):
+            await chamber.set_mode(OperationMode.RUN)
+
+    run_with_chamber(test)
+
+
+def test_async_constant_condition():
+    async def test(chamber: AsyncEspecPr3j, fake: FakeChamber):
+        await chamber.set_constant_condition(
+            temperature=23.0, humidity=50.0, stable_time=0.01, poll_interval=0.001
+        )
+        test_area = await chamber.get_test_area_state()
+
+        assert test_area.current_temperature == 23.0
+        assert test_area.current_humidity == 50.0
+        assert test_area.operation_state == OperationMode.CONSTANT
+        assert fake.received[:3] == ["TEMP, S23.0", "HUMI, S50.0", "MODE, CONSTANT"]
+
+    run_with_chamber(test)
+
+
+def test_async_late_response():
+    async def handle(reader, writer):
+        while line := await reader.readline():
+            command = line.decode("ascii").rstrip("\r\n")
+            if command == "MON?":
+                await asyncio.sleep(0.3)
+            writer.write(f"{command} answer\r\n".encode("ascii"))
+            await writer.drain()
+        writer.close()
+
+    async def main():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        async with server:
+            chamber = AsyncEspecPr3j(
+                hostname="127.0.0.1", port=port, communication_timeout=100
+            )
+            with pytest.raises(asyncio.TimeoutError):
+                await chamber._query("MON?")
+            await asyncio.sleep(0.4)
+
+            # the late response to MON? is not taken as the one to MODE?
+            assert await chamber._query("MODE?") == "MODE? answer"
+
+            # a cancelled query drops the connection as well
+            task = asyncio.create_task(chamber._query("MON?"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            await asyncio.sleep(0.4)
+            assert await chamber._query("MODE?") == "MODE? answer"
+            await chamber.close()
+
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from espec_pr3j import ChamberSimulator, EspecPr3j, OperationMode, VirtualClock
+from espec_pr3j.cache import ResponseCache
+from espec_pr3j.transports import InProcessTransport
+
+
+def test_cache_only_stores_listed_commands():
+    cache = ResponseCache({"TEMP?": 60.0})
+
+    cache.update("TEMP?", "23.0,23.0,30.0,20.0")
+    cache.update("MON?", "23.0,50,CONSTANT,0")
+
+    assert cache.get("TEMP?") == "23.0,23.0,30.0,20.0"
+    assert cache.get("MON?") is None
+
+
+def test_cache_expires():
+    cache = ResponseCache({"MODE?": 0.01})
+    cache.update("MODE?", "CONSTANT")
+
+    time.sleep(0.02)
+    assert cache.get("MODE?") is None
+
+
+def test_cache_setting_commands_invalidate():
+    cache = ResponseCache({"TEMP?": 60.0, "HUMI?": 60.0, "MODE?": 60.0})
+    cache.update("TEMP?", "23.0,23.0,30.0,20.0")
+    cache.update("HUMI?", "50,50,90,10")
+    cache.update("MODE?", "CONSTANT")
+
+    cache.update("TEMP, S25.0", "OK:TEMP, S25.0")
+    assert cache.get("TEMP?") is None
+    assert cache.get("HUMI?") is not None
+
+    cache.update("MODE, STANDBY", "OK:MODE, STANDBY")
+    assert cache.get("MODE?") is None
+    assert cache.get("HUMI?") is not None
+
+    cache.invalidate()
+    assert cache.get("HUMI?") is None
+
+
+def test_cache_expires_on_clock():
+    clock = VirtualClock()
+    cache = ResponseCache({"MODE?": 10.0}, clock=clock)
+    cache.update("MODE?", "CONSTANT")
+
+    clock.advance(9.0)
+    assert cache.get("MODE?") == "CONSTANT"
+    clock.advance(1.0)
+    assert cache.get("MODE?") is None
+
+
+def test_chamber_setters_invalidate_cache():
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock)
+    cache = ResponseCache({"TEMP?": 3600.0, "MON?": 3600.0, "MODE?": 3600.0})
+    chamber = EspecPr3j(transport=simulator.transport(), clock=clock, cache=cache)
+    assert cache.clock is clock
+
+    assert chamber.get_test_area_state().operation_state == OperationMode.STANDBY
+    target = chamber.get_temperature_status().target_temperature
+
+    # changes made behind the chamber are hidden by the cache
+    simulator.mode = OperationMode.OFF
+    assert chamber.get_test_area_state().operation_state == OperationMode.STANDBY
+
+    chamber.set_target_temperature(target + 10.0)
+    assert chamber.get_temperature_status().target_temperature == target + 10.0
+
+    chamber.set_mode(OperationMode.CONSTANT)
+    assert chamber.get_test_area_state().operation_state == OperationMode.CONSTANT
+    assert chamber.get_mode() == OperationMode.CONSTANT
+
+    # the time to live runs on the clock of the chamber
+    simulator.mode = OperationMode.STANDBY
+    clock.advance(3600.0)
+    assert chamber.get_mode() == OperationMode.STANDBY
+    chamber.close()
+
+
+def test_failed_setter_invalidates_cache():
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock)
+
+    def handle(request: str) -> str:
+        response = simulator.handle(request)
+        if request.startswith("TEMP, S"):
+            # the chamber applied the setting, but its response was lost
+            raise TimeoutError("No response to read")
+        return response
+
+    cache = ResponseCache({"TEMP?": 3600.0})
+    chamber = EspecPr3j(
+        transport=InProcessTransport(handle, clock=clock), clock=clock, cache=cache
+    )
+    target = chamber.get_temperature_status().target_temperature
+
+    with pytest.raises(TimeoutError):
+        chamber.set_target_temperature(target + 10.0)
+    assert chamber.get_temperature_status().target_temperature == target + 10.0
+    chamber.close()
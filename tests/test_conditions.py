@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+import pytest
+
+from espec_pr3j import (
+    ChamberSimulator,
+    ConditionWaiter,
+    EspecPr3j,
+    OperationMode,
+    PollScheduler,
+    VirtualClock,
+)
+
+
+@pytest.fixture
+def simulation():
+    # the polls advance the virtual clock by the monitor command delay
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock, temperature=25.0, humidity=50.0)
+    chamber = EspecPr3j(transport=simulator.transport(), clock=clock)
+    yield simulator, chamber
+    chamber.close()
+
+
+@pytest.fixture
+def scheduler(simulation):
+    _, chamber = simulation
+    scheduler = PollScheduler(max_workers=2, clock=chamber.clock)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def test_condition_future(simulation, scheduler):
+    _, chamber = simulation
+    progresses = []
+
+    future = chamber.start_constant_condition(
+        25.0,
+        50.0,
+        stable_time=1.0,
+        poll_interval=0.01,
+        progress_callback=progresses.append,
+        scheduler=scheduler,
+    )
+    progress = future.result(timeout=5.0)
+
+    assert progress.reached
+    assert progress.stable_time >= 1.0
+    assert progress.eta == 0.0
+    assert progresses[-1] is progress
+    assert len(progresses) > 1
+    assert future.progress is progress
+
+
+def test_condition_future_is_awaitable(simulation, scheduler):
+    _, chamber = simulation
+
+    async def wait():
+        future = chamber.start_constant_condition(
+            25.0, stable_time=0.0, poll_interval=0.01, scheduler=scheduler
+        )
+        return await asyncio.wrap_future(future)
+
+    assert asyncio.run(wait()).reached
+
+
+def test_condition_future_cancel(simulation, scheduler):
+    simulator, chamber = simulation
+
+    future = chamber.start_constant_condition(
+        80.0, stable_time=1.0, poll_interval=0.01, scheduler=scheduler
+    )
+    while future.progress is None and not future.done():
+        time.sleep(0.001)
+
+    assert future.cancel()
+    assert future.cancelled()
+    assert simulator.mode == OperationMode.CONSTANT
+
+
+def test_condition_future_timeout(simulation, scheduler):
+    _, chamber = simulation
+
+    future = chamber.start_constant_condition(
+        80.0,
+        stable_time=1.0,
+        poll_interval=0.01,
+        timeout=10.0,
+        scheduler=scheduler,
+    )
+
+    with pytest.raises(TimeoutError):
+        future.result(timeout=5.0)
+
+    progress = future.progress
+    assert progress is not None
+    assert not progress.reached
+    assert progress.temperature_error < 0.0
+    assert progress.eta is not None and progress.eta > 60.0
+
+
+def test_set_constant_condition_timeout(simulation):
+    _, chamber = simulation
+
+    with pytest.raises(TimeoutError):
+        chamber.set_constant_condition(80.0, stable_time=1.0, timeout=60.0)
+
+
+def test_polls_spread_by_distance():
+    def wait(max_poll_interval):
+        clock = VirtualClock()
+        simulator = ChamberSimulator(clock=clock, temperature=25.0, humidity=50.0)
+        chamber = EspecPr3j(transport=simulator.transport(), clock=clock)
+        chamber.set_target_temperature(80.0)
+        chamber.set_mode(OperationMode.CONSTANT)
+
+        waiter = ConditionWaiter(
+            chamber, stable_time=60.0, max_poll_interval=max_poll_interval
+        )
+        delays = []
+        while (delay := waiter.step()) is not None:
+            delays.append(delay)
+            clock.sleep(delay)
+        chamber.close()
+        return delays, clock.time()
+
+    fixed_delays, fixed_time = wait(1.0)
+    delays, time = wait(None)
+
+    assert len(delays) < len(fixed_delays) / 3
+    assert time == pytest.approx(fixed_time, abs=5.0)
+    # sparse while ramping, dense near the band edge
+    assert max(delays) > 10.0
+    assert delays[-1] == 1.0
+
+
+def test_condition_future_scheduler_shutdown(simulation, scheduler):
+    _, chamber = simulation
+
+    future = chamber.start_constant_condition(
+        80.0,
+        stable_time=1.0,
+        poll_interval=0.01,
+        progress_callback=lambda progress: scheduler.shutdown(wait=False),
+        scheduler=scheduler,
+    )
+
+    with pytest.raises(RuntimeError):
+        future.result(timeout=5.0)
+
+
+def test_condition_future_simulated_time(simulation, scheduler):
+    _, chamber = simulation
+
+    # hours of simulated ramp and soak, waited on the virtual clock
+    start = time.monotonic()
+    future = chamber.start_constant_condition(
+        80.0, stable_time=600.0, scheduler=scheduler
+    )
+    progress = future.result(timeout=5.0)
+
+    assert progress.reached
+    assert chamber.clock.time() > 600.0
+    assert time.monotonic() - start < 5.0
+
+
+def test_condition_future_rejects_other_clock(simulation):
+    simulator, chamber = simulation
+
+    with pytest.raises(ValueError):
+        chamber.start_constant_condition(80.0, scheduler=PollScheduler.default())
+    assert simulator.mode == OperationMode.STANDBY
@@ -0,0 +1,125 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from espec_pr3j import (
+    ChamberSimulator,
+    EspecPr3j,
+    InProcessTransport,
+    OperationMode,
+    VirtualClock,
+)
+from espec_pr3j.dispatcher import (
+    EMERGENCY_PRIORITY,
+    MONITOR_PRIORITY,
+    SETTING_PRIORITY,
+    CommandDispatcher,
+    command_priority,
+)
+from espec_pr3j.transports import Transport
+
+
+class BlockingTransport(Transport):
+    """
+    Records the commands and blocks on the first one until released.
+    """
+
+    resource_path = "BLOCKING"
+
+    def __init__(self):
+        self.commands = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, message):
+        self.commands.append(message)
+        self.started.set()
+
+    def read(self):
+        self.release.wait()
+        return f"OK:{self.commands[-1]}"
+
+    def query(self, message, delay=0.0):
+        self.write(message)
+        return self.read()
+
+    def close(self):
+        pass
+
+
+def test_command_priority():
+    assert command_priority("MODE, STANDBY") == EMERGENCY_PRIORITY
+    assert command_priority("MODE, CONSTANT") == SETTING_PRIORITY
+    assert command_priority("TEMP, S25.0") == SETTING_PRIORITY
+    assert command_priority("UNKNOWN") == SETTING_PRIORITY
+    assert command_priority("MON?") == MONITOR_PRIORITY
+
+
+def test_dispatcher_prioritizes_settings():
+    transport = BlockingTransport()
+    with CommandDispatcher(transport) as dispatcher:
+        first = dispatcher.submit("TEMP?", 0.0)
+        transport.started.wait()
+
+        futures = [
+            dispatcher.submit("MON?", 0.0),
+            dispatcher.submit("TEMP, S25.0", 0.0),
+            dispatcher.submit("MODE, STANDBY", 0.0),
+        ]
+        transport.release.set()
+
+        assert first.result() == "OK:TEMP?"
+        assert [future.result() for future in futures] == [
+            "OK:MON?",
+            "OK:TEMP, S25.0",
+            "OK:MODE, STANDBY",
+        ]
+
+    assert transport.commands == ["TEMP?", "MODE, STANDBY", "TEMP, S25.0", "MON?"]
+
+
+def test_dispatcher_coalesces_monitor_commands():
+    transport = BlockingTransport()
+    with CommandDispatcher(transport) as dispatcher:
+        in_flight = [dispatcher.submit("MON?", 0.0)]
+        transport.started.wait()
+
+        in_flight.append(dispatcher.submit("MON?", 0.0))
+        settings = [dispatcher.submit("TEMP, S25.0", 0.0) for _ in range(2)]
+        transport.release.set()
+
+        assert in_flight[0] is in_flight[1]
+        assert settings[0] is not settings[1]
+        for future in in_flight + settings:
+            future.result()
+
+        # once answered, the command is sent again
+        assert dispatcher.query("MON?", 0.0) == "OK:MON?"
+
+    assert transport.commands == ["MON?", "TEMP, S25.0", "TEMP, S25.0", "MON?"]
+
+
+def test_thread_safe_chamber():
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock, temperature=23.0)
+    commands = []
+
+    def handle(request):
+        commands.append(request)
+        return simulator.handle(request)
+
+    chamber = EspecPr3j(
+        transport=InProcessTransport(handle, clock=clock), clock=clock, thread_safe=True
+    )
+
+    def work(index):
+        if index % 10 == 0:
+            chamber.set_mode(OperationMode.STANDBY)
+        return chamber.get_temperature_status().current_temperature
+
+    with ThreadPoolExecutor(16) as executor:
+        temperatures = list(executor.map(work, range(100)))
+
+    chamber.close()
+    assert all(abs(temperature - 23.0) < 1.0 for temperature in temperatures)
+    assert commands.count("MODE, STANDBY") == 10
+    assert commands.count("TEMP?") <= 100
@@ -0,0 +1,57 @@
+import pytest
+from espec_pr3j_mocker import EspecPr3jMocker
+from pyvisa import ResourceManager
+from pyvisa_mock.base.register import register_resource
+
+from espec_pr3j import ChamberFleet, EspecPr3j, OperationMode
+from espec_pr3j.exceptions import MonitorError
+
+NUMBER_OF_CHAMBERS = 4
+
+
+class FailingChamber:
+    resource_path = "MOCK0::failing::INSTR"
+
+    def get_test_area_state(self):
+        raise MonitorError("Failed to get the test area state")
+
+
+@pytest.fixture(scope="module")
+def chambers():
+    resource_manager = ResourceManager(visa_library="@mock")
+
+    chambers = {}
+    for index in range(NUMBER_OF_CHAMBERS):
+        resource_path = f"MOCK0::fleet{index}::INSTR"
+        register_resource(resource_path, EspecPr3jMocker())
+        chambers[f"chamber{index}"] = EspecPr3j(
+            resource_path=resource_path, resource_manager=resource_manager
+        )
+
+    return chambers
+
+
+def test_fleet_poll(chambers):
+    with ChamberFleet(chambers) as fleet:
+        snapshot = fleet.poll()
+
+    assert not snapshot.errors
+    assert set(snapshot.chambers) == set(chambers)
+
+    for chamber_snapshot in snapshot.chambers.values():
+        assert chamber_snapshot.test_area is not None
+        assert chamber_snapshot.test_area.operation_state == OperationMode.STANDBY
+        assert chamber_snapshot.temperature is not None
+        assert chamber_snapshot.humidity is not None
+        assert chamber_snapshot.heaters is not None
+
+
+def test_fleet_poll_errors(chambers):
+    fleet_chambers = {"failing": FailingChamber(), "chamber0": chambers["chamber0"]}
+
+    with ChamberFleet(fleet_chambers) as fleet:
+        snapshot = fleet.poll(temperature=False, humidity=False, heaters=False)
+
+    assert set(snapshot.chambers) == {"chamber0"}
+    assert snapshot.chambers["chamber0"].temperature is None
+    assert isinstance(snapshot.errors["failing"], MonitorError)
@@ -0,0 +1,107 @@
+import pytest
+
+from espec_pr3j import (
+    ChamberFleet,
+    ChamberSimulator,
+    CommandHook,
+    EspecPr3j,
+    VirtualClock,
+    spans,
+)
+from espec_pr3j.exceptions import MonitorError
+
+
+class RecordingHook(CommandHook):
+    def __init__(self):
+        self.calls = []
+
+    def before_command(self, chamber, command):
+        self.calls.append(("before", command))
+
+    def after_command(self, event):
+        self.calls.append(("after", event))
+
+
+@pytest.fixture
+def simulation():
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock)
+    chamber = EspecPr3j(transport=simulator.transport("sim0"), clock=clock)
+    yield chamber
+    chamber.close()
+
+
+@pytest.fixture
+def recorded_spans():
+    recorded = []
+    spans.add_span_listener(recorded.append)
+    yield recorded
+    spans.remove_span_listener(recorded.append)
+
+
+def test_hooks_receive_exchanges(simulation):
+    hook = RecordingHook()
+    simulation.hooks.append(hook)
+
+    simulation.get_test_area_state()
+
+    (before, command), (after, event) = hook.calls
+    assert (before, command) == ("before", "MON?")
+    assert after == "after"
+    assert event.chamber == "INPROCESS::sim0"
+    assert event.command == "MON?"
+    assert event.response.count(",") == 3
+    assert event.delay == EspecPr3j.MONITOR_COMMAND_DELAY
+    assert event.io_time >= 0.0 and event.parse_time >= 0.0
+    assert not event.cached
+    assert event.error is None
+
+
+def test_hooks_receive_errors(simulation):
+    hook = RecordingHook()
+    simulation.hooks.append(hook)
+
+    with pytest.raises(MonitorError):
+        simulation.get_program_state()
+
+    _, (_, event) = hook.calls
+    assert event.response == "NA:DATA NOT READY"
+    assert isinstance(event.error, MonitorError)
+
+
+def test_failing_hook_is_ignored(simulation):
+    class FailingHook(CommandHook):
+        def after_command(self, event):
+            raise RuntimeError("broken hook")
+
+    simulation.hooks.append(FailingHook())
+    assert simulation.get_mode() is not None
+
+
+def test_spans_are_nested(simulation, recorded_spans):
+    with spans.span("calibration", run=1) as parent:
+        simulation.get_test_area_state()
+
+    io, parse, command, calibration = recorded_spans
+    assert (io.name, parse.name) == (spans.IO_SPAN, spans.PARSE_SPAN)
+    assert io.parent is command and parse.parent is command
+    assert command.name == spans.COMMAND_SPAN
+    assert command.attributes == {"chamber": "INPROCESS::sim0", "command": "MON?"}
+    assert command.parent is calibration is parent
+    assert calibration.duration >= command.duration >= io.duration
+
+
+def test_spans_propagate_to_fleet_threads(simulation, recorded_spans):
+    with ChamberFleet([simulation]) as fleet:
+        with spans.span("poll"):
+            fleet.poll(temperature=False, humidity=False, heaters=False)
+
+    command = next(span for span in recorded_spans if span.name == spans.COMMAND_SPAN)
+    assert command.parent.name == "poll"
+
+
+def test_spans_disabled_without_listeners():
+    assert not spans.enabled()
+    with spans.span("unused") as span:
+        assert span is None
+        assert spans.current_span() is None
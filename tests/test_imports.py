@@ -0,0 +1,24 @@
+import subprocess
+import sys
+
+import espec_pr3j
+
+
+def test_import_is_light():
+    # a fresh interpreter, as the other tests load everything
+    code = (
+        "import sys, espec_pr3j; "
+        "print(*sorted(set(sys.modules) & "
+        "{'asyncio', 'concurrent.futures', 'http.server', 'pyvisa'}))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+
+    assert output.split() == []
+
+
+def test_lazy_exports():
+    for name in espec_pr3j.__all__:
+        assert getattr(espec_pr3j, name).__name__ == name
+    assert set(espec_pr3j.__all__) <= set(dir(espec_pr3j))
@@ -0,0 +1,93 @@
+import math
+import urllib.request
+
+import pytest
+
+from espec_pr3j import (
+    ChamberSimulator,
+    CommandMetrics,
+    EspecPr3j,
+    MetricsServer,
+    ResponseCache,
+    VirtualClock,
+)
+from espec_pr3j.exceptions import MonitorError
+from espec_pr3j.metrics import CONTENT_TYPE
+
+
+@pytest.fixture
+def simulation():
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock)
+    metrics = CommandMetrics()
+    chamber = EspecPr3j(
+        transport=simulator.transport("sim0"), clock=clock, metrics=metrics
+    )
+    yield metrics, chamber
+    chamber.close()
+
+
+def test_metrics_record_exchanges(simulation):
+    metrics, chamber = simulation
+
+    chamber.get_test_area_state()
+    chamber.get_test_area_state()
+    chamber.set_target_temperature(30.0)
+
+    monitor, setting = metrics.statistics()
+    assert (monitor.chamber, monitor.command) == ("INPROCESS::sim0", "MON?")
+    assert monitor.count == 2
+    assert monitor.delay_sum == pytest.approx(2 * EspecPr3j.MONITOR_COMMAND_DELAY)
+    assert monitor.bytes_sent == 2 * len("MON?\r\n")
+    assert monitor.bytes_received > 0
+    assert monitor.buckets[-1] == (math.inf, 2)
+    assert not monitor.errors
+
+    assert setting.command == "TEMP"
+    assert setting.delay_sum == pytest.approx(EspecPr3j.SETTING_COMMAND_DELAY)
+
+
+def test_metrics_count_errors(simulation):
+    metrics, chamber = simulation
+
+    with pytest.raises(MonitorError):
+        chamber.get_program_state()
+
+    (statistics,) = metrics.statistics(chamber="INPROCESS::sim0")
+    assert statistics.count == 1
+    assert statistics.errors == {"MonitorError": 1}
+    assert metrics.statistics(chamber="other") == []
+
+
+def test_metrics_skip_cached_responses():
+    clock = VirtualClock()
+    metrics = CommandMetrics()
+    chamber = EspecPr3j(
+        transport=ChamberSimulator(clock=clock).transport(),
+        clock=clock,
+        metrics=metrics,
+        cache=ResponseCache({"TEMP?": 60.0}),
+    )
+
+    chamber.get_temperature_status()
+    chamber.get_temperature_status()
+
+    (statistics,) = metrics.statistics()
+    assert statistics.count == 1
+
+
+def test_metrics_server(simulation):
+    metrics, chamber = simulation
+    chamber.get_test_area_state()
+
+    with MetricsServer(metrics) as server:
+        url = f"http://127.0.0.1:{server.port}/metrics"
+        with urllib.request.urlopen(url) as response:
+            content_type = response.headers["Content-Type"]
+            body = response.read().decode()
+
+    assert content_type == CONTENT_TYPE
+    labels = 'chamber="INPROCESS::sim0",command="MON?"'
+    assert f'espec_pr3j_command_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in body
+    assert f"espec_pr3j_sent_bytes_total{{{labels}}} 6" in body
+    assert body.endswith("# EOF\n")
@@ -0,0 +1,75 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from espec_pr3j import ChamberSimulator, EspecPr3j, VirtualClock
+from espec_pr3j.multiplexer import ERROR_RESPONSE, ChamberMultiplexer, default_delay
+from espec_pr3j.transports import SocketTransport, Transport
+
+
+def test_default_delay():
+    assert default_delay("MON?") == 0.2
+    assert default_delay("TEMP, S25.0") == 0.5
+    assert default_delay("PRGM MON?") == 0.3
+    assert default_delay("MODE, RUN1") == 1.0
+
+
+def test_multiplexer_serves_many_clients():
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock, temperature=23.0)
+
+    with ChamberMultiplexer(simulator.transport()) as multiplexer:
+        clients = [SocketTransport("127.0.0.1", multiplexer.port) for _ in range(5)]
+
+        assert clients[0].query("TEMP, S30.0") == "OK:TEMP, S30.0"
+        with ThreadPoolExecutor(len(clients)) as executor:
+            responses = list(
+                executor.map(lambda client: client.query("TEMP?"), clients)
+            )
+
+        assert all(response.startswith("23.0,30.0,") for response in responses)
+        for client in clients:
+            client.close()
+
+
+def test_multiplexer_reports_chamber_errors():
+    class BrokenTransport(Transport):
+        resource_path = "BROKEN"
+
+        def write(self, message):
+            raise ConnectionError("chamber unreachable")
+
+        def read(self):
+            raise ConnectionError("chamber unreachable")
+
+        def close(self):
+            pass
+
+    with ChamberMultiplexer(BrokenTransport()) as multiplexer:
+        client = SocketTransport("127.0.0.1", multiplexer.port)
+        assert client.query("MON?") == ERROR_RESPONSE
+        client.close()
+
+
+@pytest.mark.parametrize("command", ["", "\r\n"])
+def test_multiplexer_ignores_empty_lines(command):
+    with ChamberMultiplexer(ChamberSimulator(clock=VirtualClock()).transport()) as mux:
+        client = SocketTransport("127.0.0.1", mux.port)
+        client.write(command)
+        assert client.query("MODE?") == "STANDBY"
+        client.close()
+
+
+def test_multiplexer_clients_skip_delays():
+    simulator = ChamberSimulator(clock=VirtualClock())
+
+    with ChamberMultiplexer(simulator.transport()) as multiplexer:
+        transport = SocketTransport("127.0.0.1", multiplexer.port, skip_delays=True)
+        chamber = EspecPr3j(transport=transport)
+
+        # the multiplexer waits the delays on the virtual clock of the simulator
+        start = time.perf_counter()
+        chamber.get_test_area_state()
+        assert time.perf_counter() - start < EspecPr3j.MONITOR_COMMAND_DELAY
+        chamber.close()
@@ -0,0 +1,56 @@
+from espec_pr3j.pacing import CommandPacer
+
+DEFAULT_DELAY = 0.2
+
+
+def test_pacer_shrinks_when_response_is_ready():
+    pacer = CommandPacer(shrink=0.5)
+
+    assert pacer.delay("MON?", DEFAULT_DELAY) == DEFAULT_DELAY
+
+    pacer.record_success("MON?", DEFAULT_DELAY, waited=DEFAULT_DELAY, read_time=0.0)
+    assert pacer.delay("MON?", DEFAULT_DELAY) == DEFAULT_DELAY * 0.5
+
+    # other command types are not affected
+    assert pacer.delay("TEMP?", DEFAULT_DELAY) == DEFAULT_DELAY
+
+
+def test_pacer_keeps_latency_percentile():
+    pacer = CommandPacer(percentile=1.0, margin=1.0, shrink=0.5)
+
+    # the read blocked, so the latency of the chamber is 0.05 seconds
+    pacer.record_success("TEMP, S23.0", 0.5, waited=0.02, read_time=0.03)
+    assert pacer.delay("TEMP, S25.0", 0.5) == 0.05
+
+    # a ready response does not go below the measured latency
+    pacer.record_success("TEMP, S23.0", 0.5, waited=0.05, read_time=0.0)
+    assert pacer.delay("TEMP, S25.0", 0.5) == 0.05
+
+
+def test_pacer_backs_off_on_failure():
+    pacer = CommandPacer()
+
+    for _ in range(10):
+        pacer.record_success("MON?", DEFAULT_DELAY, waited=0.0, read_time=0.0)
+    assert pacer.delay("MON?", DEFAULT_DELAY) < DEFAULT_DELAY
+
+    pacer.record_failure("MON?", DEFAULT_DELAY)
+    assert pacer.delay("MON?", DEFAULT_DELAY) == DEFAULT_DELAY
+    assert pacer.delays == {"MON?": DEFAULT_DELAY}
+
+
+def test_pacer_separates_limits_from_targets():
+    pacer = CommandPacer()
+
+    # the limits are set without delay, which must not apply to the targets
+    pacer.record_success("TEMP, H80.0", 0.0, waited=0.0, read_time=0.0)
+    pacer.record_success("HUMI, L10", 0.0, waited=0.0, read_time=0.0)
+    assert pacer.delay("TEMP, S23.0", 0.5) == 0.5
+    assert pacer.delay("HUMI, S50", 0.5) == 0.5
+
+    pacer.record_success("MODE, RUN1", 0.0, waited=0.0, read_time=0.0)
+    assert pacer.delay("MODE, STANDBY", 0.5) == 0.5
+
+    pacer.record_success("TEMP, S23.0", 0.5, waited=0.5, read_time=0.0)
+    assert pacer.delay("TEMP, L-20.0", 0.5) == 0.5
+    assert set(pacer.delays) == {"TEMP, H", "HUMI, L", "MODE, RUN", "TEMP, S"}
@@ -0,0 +1,53 @@
+import pytest
+
+from espec_pr3j import (
+    ChamberSimulator,
+    EspecPr3j,
+    InProcessTransport,
+    Profile,
+    ProfileExecutor,
+    SetpointChange,
+    VirtualClock,
+)
+
+
+def test_timeline():
+    profile = Profile(ramp_interval=10.0)
+    profile.add(25.0, 50.0, ramp_time=20.0, soak_time=60.0)
+    profile.add(25.0, 50.0, soak_time=30.0)
+    profile.add(-10.0)
+
+    assert profile.min_duration == 110.0
+    assert profile.timeline(23.0, 40.0) == [
+        SetpointChange(0, 0.0, 23.0, 40.0),
+        SetpointChange(0, 10.0, 24.0, 45.0),
+        SetpointChange(0, 20.0, 25.0, 50.0),
+        SetpointChange(2, 0.0, -10.0, None),
+    ]
+
+
+def test_profile_executor():
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock, temperature=23.0)
+    received = []
+
+    def handle(request):
+        received.append(request)
+        return simulator.handle(request)
+
+    chamber = EspecPr3j(transport=InProcessTransport(handle, clock=clock), clock=clock)
+
+    # ramps slower than the chamber, so the setpoints are followed closely
+    profile = Profile(ramp_interval=10.0)
+    profile.add(33.0, ramp_time=600.0, soak_time=300.0)
+    profile.add(23.0, ramp_time=600.0, soak_time=300.0)
+
+    start = clock.time()
+    buffer = ProfileExecutor(chamber, profile).run()
+    duration = clock.time() - start
+
+    # the soaks start when the setpoints are reached, about a time constant later
+    assert profile.min_duration < duration < profile.min_duration + 2 * 60.0
+    assert simulator.temperature == pytest.approx(23.0, abs=0.5)
+    assert len(buffer) > profile.min_duration / 2
+    assert sum(request.startswith("TEMP, S") for request in received) == 121
@@ -0,0 +1,96 @@
+import pytest
+
+from espec_pr3j import (
+    ChamberSimulator,
+    EspecPr3j,
+    InProcessTransport,
+    OperationMode,
+    Profile,
+    Program,
+    ProgramStep,
+    SettingError,
+    VirtualClock,
+)
+
+
+@pytest.fixture
+def simulation():
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock, temperature=23.0)
+    chamber = EspecPr3j(transport=simulator.transport(), clock=clock)
+    yield clock, simulator, chamber
+    chamber.close()
+
+
+def test_encode_program():
+    program = Program(end_mode=OperationMode.CONSTANT)
+    program.add(85.0, 1800.0, 60.0, temperature_ramp=True, humidity_ramp=True)
+    program.add(-10.0, 36000.0, guaranteed=True)
+
+    parameters = program.encode(2)
+
+    assert parameters == [
+        "2, EDIT START",
+        "2, STEP1, TEMP85.0, TRAMP ON, HUMI60, HRAMP ON, TIME0:30, GRANTY OFF"
+        ", PAUSE OFF",
+        "2, STEP2, TEMP-10.0, TRAMP OFF, HUMIOFF, HRAMP OFF, TIME10:00, GRANTY ON"
+        ", PAUSE OFF",
+        "2, END, CONSTANT",
+        "2, EDIT END",
+    ]
+    assert Program.parse_step(parameters[2]) == (2, 2, program.steps[1])
+
+    with pytest.raises(ValueError):
+        Program([ProgramStep(25.0, 90.0)]).encode(1)
+
+
+def test_program_from_profile():
+    profile = Profile().add(85.0, ramp_time=1800.0, soak_time=3600.0).add(25.0)
+    program = Program.from_profile(profile)
+
+    assert program.steps == [
+        ProgramStep(85.0, 1800.0, temperature_ramp=True),
+        ProgramStep(85.0, 3600.0, guaranteed=True),
+        ProgramStep(25.0, 60.0, guaranteed=True),
+    ]
+    assert program.duration == 5460.0
+
+
+def test_write_and_run_program(simulation):
+    clock, simulator, chamber = simulation
+
+    program = Program().add(40.0, 600.0).add(40.0, 1200.0, 80.0)
+    chamber.write_program(1, program)
+    assert simulator.programs[1].steps == program.steps
+
+    chamber.run_program(1)
+    assert chamber.get_mode() == OperationMode.RUN
+
+    clock.advance(900.0)
+    state = chamber.get_program_state()
+    assert (state.program, state.step) == (1, 2)
+    assert state.remaining_time == pytest.approx(900.0, abs=60.0)
+    assert chamber.get_temperature_status().target_temperature == 40.0
+    assert chamber.get_humidity_status().target_humidity == 80.0
+
+    clock.advance(1200.0)
+    assert chamber.get_mode() == OperationMode.STANDBY
+
+
+def test_failed_write_is_cancelled(simulation):
+    _, simulator, _ = simulation
+    received = []
+
+    def handle(request):
+        received.append(request)
+        if "STEP2" in request:
+            return "NA:DATA NOT READY"
+        return simulator.handle(request)
+
+    chamber = EspecPr3j(transport=InProcessTransport(handle, clock=simulator.clock))
+
+    with pytest.raises(SettingError):
+        chamber.write_program(1, Program().add(40.0, 60.0).add(50.0, 60.0))
+
+    assert received[-1] == "PRGM DATA WRITE, PGM1, EDIT CANCEL"
+    assert 1 not in simulator.programs
@@ -0,0 +1,78 @@
+import pytest
+
+from espec_pr3j import (
+    HeatersStatus,
+    HumidityStatus,
+    OperationMode,
+    ProgramState,
+    SettingError,
+    TemperatureStatus,
+    protocol,
+)
+from espec_pr3j import TestAreaState as AreaState
+from espec_pr3j.exceptions import MonitorError
+
+
+@pytest.mark.parametrize(
+    "command, value",
+    [
+        (protocol.TEMPERATURE_STATUS, TemperatureStatus(-20.5, -20.0, 100.0, -40.0)),
+        (protocol.HUMIDITY_STATUS, HumidityStatus(45.0, 50.0, 100.0, 0.0)),
+        (protocol.HUMIDITY_STATUS, HumidityStatus(45.0, None, 100.0, 0.0)),
+        (protocol.TEST_AREA_STATE, AreaState(-10.5, 45.0, OperationMode.CONSTANT, 1)),
+        (protocol.MODE, OperationMode.STANDBY),
+        (protocol.HEATERS_STATUS, HeatersStatus(10.5, 20.5)),
+        (protocol.SET_TARGET_TEMPERATURE, -25.0),
+        (protocol.SET_UPPER_TEMPERATURE_LIMIT, 100.0),
+        (protocol.SET_LOWER_TEMPERATURE_LIMIT, -40.0),
+        (protocol.SET_TARGET_HUMIDITY, 50),
+        (protocol.SET_MODE, OperationMode.CONSTANT),
+        (protocol.RUN_PROGRAM, 3),
+        (protocol.PROGRAM_STATE, ProgramState(1, 2, 5400.0, 0)),
+    ],
+)
+def test_round_trip(command, value):
+    assert command.decode(command.format_response(value)) == value
+
+
+def test_parse_request():
+    assert protocol.parse_request("TEMP?") == (protocol.TEMPERATURE_STATUS, None)
+    assert protocol.parse_request("TEMP, S-12.5") == (
+        protocol.SET_TARGET_TEMPERATURE,
+        -12.5,
+    )
+    assert protocol.parse_request("TEMP, H 100.0") == (
+        protocol.SET_UPPER_TEMPERATURE_LIMIT,
+        100.0,
+    )
+    assert protocol.parse_request("HUMI, SOFF") == (protocol.DISABLE_HUMIDITY, None)
+    assert protocol.parse_request("MODE, STANDBY") == (
+        protocol.SET_MODE,
+        OperationMode.STANDBY,
+    )
+
+    with pytest.raises(ValueError):
+        protocol.parse_request("FOO?")
+
+
+def test_decode_many():
+    responses = ["23.0,45,CONSTANT,0", "-5.5,50,STANDBY,2"]
+
+    assert protocol.TEST_AREA_STATE.decode_many(responses) == [
+        AreaState(23.0, 45.0, OperationMode.CONSTANT, 0),
+        AreaState(-5.5, 50.0, OperationMode.STANDBY, 2),
+    ]
+
+    with pytest.raises(MonitorError):
+        protocol.TEST_AREA_STATE.decode_many(responses + ["NA:DATA NOT READY"])
+
+
+def test_malformed_responses():
+    with pytest.raises(MonitorError):
+        protocol.TEMPERATURE_STATUS.decode("23.0,23.0")
+
+    with pytest.raises(MonitorError):
+        protocol.MODE.decode("UNKNOWN")
+
+    with pytest.raises(SettingError):
+        protocol.SET_TARGET_TEMPERATURE.decode("NA:DATA NOT READY")
@@ -0,0 +1,151 @@
+import gc
+import warnings
+
+import pytest
+
+from espec_pr3j import (
+    ChamberSimulator,
+    EspecPr3j,
+    InProcessTransport,
+    OperationMode,
+    RecordingTransport,
+    RecordKind,
+    ReplayTransport,
+    VirtualClock,
+)
+from espec_pr3j.recording import read_session
+
+
+@pytest.fixture
+def session(tmp_path):
+    path = tmp_path / "session.bin"
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock)
+    transport = RecordingTransport(simulator.transport("sim0"), path)
+    chamber = EspecPr3j(transport=transport, clock=clock)
+
+    chamber.set_target_temperature(40.0)
+    chamber.set_mode(OperationMode.CONSTANT)
+    states = [chamber.get_test_area_state() for _ in range(3)]
+    chamber.close()
+    return path, states
+
+
+def test_records_exchanges(session):
+    path, _ = session
+    resource_path, records = read_session(path)
+    records = list(records)
+
+    assert resource_path == "INPROCESS::sim0"
+    assert [record.kind for record in records[:2]] == [
+        RecordKind.WRITE,
+        RecordKind.READ,
+    ]
+    assert records[0].message == "TEMP, S40.0"
+    assert records[-2].message == "MON?"
+    assert len(records) == 2 * 5
+
+
+def test_replays_session(session):
+    path, states = session
+    chamber = EspecPr3j(transport=ReplayTransport(path))
+
+    chamber.set_target_temperature(40.0)
+    chamber.set_mode(OperationMode.CONSTANT)
+    assert [chamber.get_test_area_state() for _ in range(3)] == states
+
+    with pytest.raises(EOFError):
+        chamber.get_mode()
+
+
+def test_replay_pacing(tmp_path):
+    path = tmp_path / "session.bin"
+    clock = VirtualClock()
+    transport = RecordingTransport(
+        InProcessTransport(lambda request: "OK", clock=clock), path, clock=clock
+    )
+    transport.query("MODE?", delay=2.5)
+    transport.close()
+
+    replay_clock = VirtualClock()
+    replay = ReplayTransport(path, realtime=True, clock=replay_clock)
+    assert replay.query("MODE?") == "OK"
+    assert replay_clock.time() == pytest.approx(2.5)
+
+    fast_clock = VirtualClock()
+    fast = ReplayTransport(path, clock=fast_clock)
+    assert fast.query("MODE?") == "OK"
+    assert fast_clock.time() == 0.0
+
+
+def test_replay_divergence(session):
+    path, _ = session
+    replay = ReplayTransport(path)
+    with pytest.raises(ValueError):
+        replay.query("MON?")
+
+
+def test_replays_errors(tmp_path):
+    path = tmp_path / "session.bin"
+
+    def handler(request):
+        raise TimeoutError("no response")
+
+    transport = RecordingTransport(InProcessTransport(handler), path)
+    with pytest.raises(TimeoutError):
+        transport.query("MON?")
+    transport.close()
+
+    with pytest.raises(TimeoutError, match="no response"):
+        ReplayTransport(path).query("MON?")
+
+
+def test_not_a_session(tmp_path):
+    path = tmp_path / "session.bin"
+    path.write_bytes(b"not a session file")
+    with pytest.raises(ValueError):
+        ReplayTransport(path)
+
+
+def test_truncated_session(session, tmp_path):
+    path, _ = session
+    data = path.read_bytes()
+
+    empty = tmp_path / "empty.bin"
+    empty.write_bytes(b"")
+    with pytest.raises(ValueError):
+        read_session(empty)
+
+    truncated = tmp_path / "truncated.bin"
+    truncated.write_bytes(data[:-3])
+    _, records = read_session(truncated)
+    assert len(list(records)) == 2 * 5 - 1
+
+
+def test_records_non_ascii_errors(tmp_path):
+    path = tmp_path / "session.bin"
+
+    def handler(request):
+        raise ConnectionError("connexion refusée")
+
+    transport = RecordingTransport(InProcessTransport(handler), path)
+    with pytest.raises(ConnectionError, match="refusée"):
+        transport.query("MON?")
+    transport.close()
+
+    replay = ReplayTransport(path)
+    with pytest.raises(ConnectionError, match="connexion refus"):
+        replay.query("MON?")
+    replay.close()
+    assert replay._records.gi_frame is None
+
+
+def test_replay_closed_before_reading(session):
+    path, _ = session
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        ReplayTransport(path).close()
+        gc.collect()
+
+    assert not [w for w in caught if issubclass(w.category, ResourceWarning)]
@@ -0,0 +1,106 @@
+import math
+
+import pytest
+
+from espec_pr3j import (
+    ChamberSimulator,
+    EspecPr3j,
+    LttbDownsampler,
+    OperationMode,
+    TelemetryLogReader,
+    TelemetryLogWriter,
+    TelemetryRollups,
+    VirtualClock,
+)
+from espec_pr3j import TestAreaState as AreaState
+
+
+def state(temperature, humidity=50.0):
+    return AreaState(temperature, humidity, OperationMode.CONSTANT, 0)
+
+
+@pytest.fixture
+def rollups():
+    rollups = TelemetryRollups()
+    # two hours at 1 Hz of a sine of 10 minutes period
+    for second in range(7200):
+        rollups.append(second, state(20.0 + math.sin(2 * math.pi * second / 600)))
+    return rollups
+
+
+def test_buckets(rollups):
+    buckets = rollups.query("temperature", level=60.0)
+    assert len(buckets) == 120
+    first = buckets[0]
+    assert (first.start, first.duration, first.count) == (0.0, 60.0, 60)
+    assert first.minimum == 20.0
+    assert first.maximum == pytest.approx(20.0 + math.sin(2 * math.pi * 59 / 600))
+
+    (hour,) = rollups.query("humidity", 0.0, 3599.0, level=3600.0)
+    assert hour.count == 3600
+    assert hour.mean == pytest.approx(50.0)
+
+    ten_minutes = rollups.query("temperature", level=600.0)
+    assert all(bucket.mean == pytest.approx(20.0) for bucket in ten_minutes)
+    assert all(bucket.maximum == pytest.approx(21.0) for bucket in ten_minutes)
+
+
+def test_query_reads_coarsest_sufficient_level(rollups):
+    assert rollups.query("temperature", 0.0, 7199.0, max_points=10)[0].duration == 600
+    assert rollups.query("temperature", 0.0, 7199.0, max_points=100)[0].duration == 60
+    assert rollups.query("temperature", 0.0, 59.0, max_points=100)[0].duration == 10
+    assert rollups.query("temperature", 0.0, 7200.0, max_points=2)[0].duration == 3600
+
+    buckets = rollups.query("temperature", 615.0, 1205.0, level=600.0)
+    assert [bucket.start for bucket in buckets] == [600.0, 1200.0]
+
+
+def test_query_errors(rollups):
+    with pytest.raises(ValueError):
+        rollups.query("pressure")
+    with pytest.raises(ValueError):
+        rollups.query("temperature", level=30.0)
+    with pytest.raises(ValueError):
+        rollups.append(0.0, state(20.0))
+    assert TelemetryRollups().query("temperature") == []
+
+
+def test_downsampled(rollups):
+    points = rollups.downsampled("temperature")
+    assert points[0] == (0, 20.0)
+    assert points[-1][0] == 7199
+    assert len(points) == pytest.approx(7200 / 60, abs=2)
+    # the peaks of the sine are kept
+    assert max(value for _, value in points) > 20.99
+    assert min(value for _, value in points) < 19.01
+
+
+def test_lttb_keeps_spikes():
+    downsampler = LttbDownsampler(bucket_size=10)
+    for x in range(100):
+        downsampler.append(x, 100.0 if x == 42 else 0.0)
+    points = downsampler.points()
+    assert (42, 100.0) in points
+    assert points[0] == (0, 0.0) and points[-1] == (99, 0.0)
+
+
+def test_built_from_log_and_getters(tmp_path):
+    path = tmp_path / "soak.tlm"
+    with TelemetryLogWriter(path) as writer:
+        for second in range(100):
+            writer.append(second, state(25.0))
+
+    rollups = TelemetryRollups(levels=(10.0,))
+    with TelemetryLogReader(path) as log:
+        rollups.extend(log.records())
+    assert len(rollups.query("temperature")) == 10
+
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock)
+    chamber = EspecPr3j(transport=simulator.transport("sim0"), clock=clock)
+    live = TelemetryRollups()
+    chamber.hooks.append(live)
+    chamber.get_test_area_state()
+    chamber.close()
+    (bucket,) = live.query("temperature")
+    assert bucket.count == 1
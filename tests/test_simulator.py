@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from espec_pr3j import ChamberSimulator, Clock, EspecPr3j, OperationMode, VirtualClock
+
+
+@pytest.fixture
+def simulation():
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock, temperature=23.0, humidity=50.0)
+    chamber = EspecPr3j(transport=simulator.transport(), clock=clock)
+
+    yield clock, simulator, chamber
+
+    chamber.close()
+
+
+def test_first_order_response(simulation):
+    clock, simulator, chamber = simulation
+
+    simulator.target_temperature = 53.0
+    simulator.mode = OperationMode.CONSTANT
+
+    # saturated ramp at 0.05°C/s until the error is 3°C, then exponential
+    clock.advance(540.0)
+    assert simulator.temperature == pytest.approx(50.0, abs=0.1)
+    assert chamber.get_heater_percentage().temperature_heater > 95.0
+
+    clock.advance(600.0)
+    assert simulator.temperature == pytest.approx(53.0, abs=0.01)
+    assert chamber.get_heater_percentage().temperature_heater < 1.0
+
+
+def test_response_does_not_depend_on_polling():
+    polled = ChamberSimulator(clock=VirtualClock())
+    unpolled = ChamberSimulator(clock=VirtualClock())
+    for simulator in (polled, unpolled):
+        simulator.target_temperature = 30.0
+        simulator.mode = OperationMode.CONSTANT
+
+    for _ in range(100):
+        polled.clock.advance(3.0)
+        polled.handle("MON?")
+    unpolled.clock.advance(300.0)
+
+    assert polled.temperature == pytest.approx(unpolled.temperature)
+
+
+def test_standby_drifts_to_ambient(simulation):
+    clock, simulator, chamber = simulation
+
+    chamber.set_target_temperature(-20.0)
+    chamber.set_mode(OperationMode.CONSTANT)
+    clock.advance(3600.0)
+    assert chamber.get_test_area_state().current_temperature == pytest.approx(-20.0)
+
+    chamber.set_mode(OperationMode.STANDBY)
+    clock.advance(12 * 3600.0)
+    assert simulator.temperature == pytest.approx(23.0, abs=0.1)
+
+
+def test_set_constant_condition_on_virtual_clock(simulation):
+    clock, simulator, chamber = simulation
+
+    start = time.monotonic()
+    chamber.set_constant_condition(80.0, 85.0, stable_time=600.0)
+
+    assert time.monotonic() - start < 5.0
+    assert clock.time() > 600.0
+    assert simulator.temperature == pytest.approx(80.0, abs=0.5)
+    assert simulator.humidity == pytest.approx(85.0, abs=3.0)
+
+
+def test_clock_interface():
+    class IncompleteClock(Clock):
+        def time(self):
+            return 0.0
+
+    with pytest.raises(TypeError):
+        IncompleteClock()
@@ -0,0 +1,91 @@
+import math
+
+import pytest
+
+from espec_pr3j import (
+    BandStabilityDetector,
+    ChamberSimulator,
+    EspecPr3j,
+    OperationMode,
+    StabilityDetector,
+    VirtualClock,
+    WindowStabilityDetector,
+)
+
+
+def feed(detector, errors, interval=1.0, accuracy=0.5):
+    detector.reset(0.0)
+    stable = False
+    for index, error in enumerate(errors, start=1):
+        stable = detector.update(index * interval, error, None, accuracy, 3.0)
+    return stable
+
+
+def test_band_detector_restarts_on_outlier():
+    detector = BandStabilityDetector(stable_time=10.0)
+
+    assert feed(detector, [0.1] * 10)
+    assert not feed(detector, [0.1] * 9 + [0.8] + [0.1] * 9)
+    assert detector.stable_time == 9.0
+    assert detector.eta == 1.0
+
+
+def test_window_detector_tolerates_outlier():
+    detector = WindowStabilityDetector(window=30.0)
+
+    assert not feed(detector, [0.1] * 29)
+    assert feed(detector, [0.1] * 15 + [0.8] + [0.1] * 15)
+
+
+def test_window_detector_rejects_drift():
+    detector = WindowStabilityDetector(window=30.0, max_temperature_slope=0.1)
+
+    # within the accuracy, but drifting by 0.6°C/min
+    assert not feed(detector, [-0.45 + 0.01 * index for index in range(60)])
+    assert detector.stable_time == 0.0
+
+
+def test_window_detector_predicts_settling():
+    detector = WindowStabilityDetector(window=30.0, min_occupancy=0.9)
+
+    errors = [10.0 * math.exp(-time / 50.0) for time in range(1, 51)]
+    assert not feed(detector, errors)
+
+    # the error reaches the accuracy at 50 * ln(20), then the window has to fill
+    expected = 50.0 * math.log(20.0) - 50.0 + 0.9 * 30.0
+    assert detector.eta == pytest.approx(expected, rel=0.01)
+
+
+def test_set_constant_condition_with_window_detector():
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock, temperature=23.0)
+    chamber = EspecPr3j(transport=simulator.transport(), clock=clock)
+
+    chamber.set_constant_condition(
+        40.0, detector=WindowStabilityDetector(window=60.0), timeout=3600.0
+    )
+
+    assert simulator.temperature == pytest.approx(40.0, abs=0.5)
+    chamber.close()
+
+
+def test_detector_interface():
+    class IncompleteDetector(StabilityDetector):
+        def reset(self, time):
+            pass
+
+    with pytest.raises(TypeError):
+        IncompleteDetector()
+
+
+def test_stable_time_with_detector():
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock)
+    chamber = EspecPr3j(transport=simulator.transport(), clock=clock)
+
+    with pytest.raises(ValueError):
+        chamber.set_constant_condition(
+            40.0, stable_time=60.0, detector=WindowStabilityDetector(window=60.0)
+        )
+    # the condition is not set
+    assert simulator.mode == OperationMode.STANDBY
@@ -0,0 +1,51 @@
+import math
+
+import espec_pr3j
+from espec_pr3j import HeatersStatus, OperationMode
+from espec_pr3j.telemetry import MODE_CODES, TelemetryBuffer
+
+CAPACITY = 4
+
+
+def _state(temperature: float) -> espec_pr3j.TestAreaState:
+    return espec_pr3j.TestAreaState(
+        current_temperature=temperature,
+        current_humidity=50.0,
+        operation_state=OperationMode.CONSTANT,
+        number_of_alarms=0,
+    )
+
+
+def test_telemetry_buffer_empty():
+    buffer = TelemetryBuffer(CAPACITY)
+
+    assert len(buffer) == 0
+    assert buffer.latest("temperature").tolist() == []
+
+
+def test_telemetry_buffer_wraps_around():
+    buffer = TelemetryBuffer(CAPACITY)
+
+    for sample in range(CAPACITY + 2):
+        buffer.append(float(sample), _state(20.0 + sample))
+
+    assert len(buffer) == CAPACITY
+    assert buffer.total_samples == CAPACITY + 2
+    assert buffer.latest("timestamp").tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert buffer.latest("temperature", 2).tolist() == [24.0, 25.0]
+    assert buffer.latest("mode", 1).tolist() == [MODE_CODES[OperationMode.CONSTANT]]
+    assert math.isnan(buffer.latest("temperature_heater", 1)[0])
+
+
+def test_telemetry_buffer_views_are_not_copies():
+    buffer = TelemetryBuffer(CAPACITY)
+    buffer.append(0.0, _state(20.0), HeatersStatus(10.0, 20.0))
+
+    view = buffer.latest("temperature_heater", 1)
+    assert view.tolist() == [10.0]
+
+    # the whole ring is written, so the view now shows the newest sample
+    for sample in range(1, CAPACITY + 1):
+        buffer.append(float(sample), _state(20.0), HeatersStatus(11.0, 21.0))
+
+    assert view.tolist() == [11.0]
@@ -0,0 +1,121 @@
+import math
+
+import pytest
+
+from espec_pr3j import (
+    ChamberSimulator,
+    EspecPr3j,
+    HeatersStatus,
+    OperationMode,
+    TelemetryLogReader,
+    TelemetryLogWriter,
+    VirtualClock,
+)
+from espec_pr3j import (
+    TestAreaState as AreaState,
+)
+from espec_pr3j.telemetry_log import HEADER, RECORD
+
+
+def state(temperature, alarms=0):
+    return AreaState(temperature, 50.0, OperationMode.CONSTANT, alarms)
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = tmp_path / "soak.tlm"
+    with TelemetryLogWriter(path) as writer:
+        for second in range(1000):
+            writer.append(1000.0 + second, state(20.0 + second / 100))
+    return path
+
+
+def test_time_range(log_path):
+    with TelemetryLogReader(log_path) as log:
+        assert len(log) == 1000
+        assert log.time_range() == (0, 1000)
+        assert log.time_range(1100.0, 1199.0) == (100, 200)
+        assert log.time_range(1100.5, 1101.5) == (101, 102)
+        assert log.time_range(5000.0) == (1000, 1000)
+        assert log.time_range(1200.0, 1100.0) == (200, 200)
+
+        records = list(log.records(1500.0, 1502.0))
+        assert [record.timestamp for record in records] == [1500.0, 1501.0, 1502.0]
+        assert records[0].temperature == pytest.approx(25.0)
+        assert records[0].mode == OperationMode.CONSTANT
+        assert math.isnan(records[0].temperature_heater)
+        assert log[-1].timestamp == 1999.0
+
+
+def test_append_to_existing_log(log_path):
+    with log_path.open("ab") as file:
+        file.write(b"\x00" * (RECORD.size // 2))  # a record cut by a crash
+
+    with TelemetryLogWriter(log_path) as writer:
+        with pytest.raises(ValueError):
+            writer.append(0.0, state(20.0))
+        writer.append(2000.0, state(30.0, alarms=2), HeatersStatus(10.0, 20.0))
+
+    assert log_path.stat().st_size == HEADER.size + 1001 * RECORD.size
+    with TelemetryLogReader(log_path) as log:
+        record = log[-1]
+        assert (record.timestamp, record.alarms) == (2000.0, 2)
+        assert (record.temperature_heater, record.humidity_heater) == (10.0, 20.0)
+
+
+def test_reader_refresh(tmp_path):
+    path = tmp_path / "soak.tlm"
+    writer = TelemetryLogWriter(path)
+    log = TelemetryLogReader(path)
+    assert len(log) == 0
+
+    writer.append(1.0, state(20.0))
+    writer.flush()
+    log.refresh()
+    assert len(log) == 1
+
+    log.close()
+    writer.close()
+
+
+def test_written_from_chamber_getters(tmp_path):
+    path = tmp_path / "soak.tlm"
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock)
+    chamber = EspecPr3j(transport=simulator.transport("sim0"), clock=clock)
+    writer = TelemetryLogWriter(path)
+    chamber.hooks.append(writer)
+
+    chamber.get_test_area_state()
+    chamber.get_heater_percentage()
+    chamber.get_test_area_state()
+    chamber.get_temperature_status()
+    writer.close()
+    chamber.close()
+
+    with TelemetryLogReader(path) as log:
+        first, second = log.records()
+        assert not math.isnan(first.temperature_heater)
+        assert math.isnan(second.temperature_heater)
+        assert first.mode == OperationMode.STANDBY
+
+
+def test_not_a_telemetry_log(tmp_path):
+    path = tmp_path / "soak.tlm"
+    path.write_bytes(b"not a telemetry log")
+    with pytest.raises(ValueError):
+        TelemetryLogReader(path)
+    with pytest.raises(ValueError):
+        TelemetryLogWriter(path)
+
+
+def test_to_numpy(log_path):
+    numpy = pytest.importorskip("numpy")
+
+    with TelemetryLogReader(log_path) as log:
+        records = log.to_numpy(1100.0, 1199.0)
+        assert len(records) == 100
+        assert records["timestamp"][0] == 1100.0
+        assert records["temperature"].max() == pytest.approx(21.99)
+        assert numpy.all(records["mode"] == records["mode"][0])
+        assert len(log.to_numpy(5000.0)) == 0
@@ -0,0 +1,155 @@
+import socketserver
+import threading
+import time
+
+import pytest
+from fake_chamber import FakeChamber
+
+from espec_pr3j import EspecPr3j, OperationMode
+from espec_pr3j.transports import (
+    InProcessTransport,
+    SocketTransport,
+    Transport,
+    VisaTransport,
+)
+
+
+@pytest.fixture
+def chamber_server():
+    fake = FakeChamber()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            while line := self.rfile.readline():
+                command = line.decode("ascii").rstrip("\r\n")
+                self.wfile.write(f"{fake.answer(command)}\r\n".encode("ascii"))
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server.server_address[1], fake
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_socket_transport(chamber_server):
+    port, fake = chamber_server
+
+    chamber = EspecPr3j(transport=SocketTransport("127.0.0.1", port=port))
+    chamber.set_mode(OperationMode.CONSTANT)
+
+    assert chamber.get_mode() == OperationMode.CONSTANT
+    assert chamber.resource_path == f"TCPIP0::127.0.0.1::{port}::SOCKET"
+    assert fake.received == ["MODE, CONSTANT", "MODE?"]
+
+    chamber.close()
+
+
+def test_socket_transport_from_resource_path(chamber_server):
+    port, _ = chamber_server
+
+    transport = SocketTransport.from_resource_path(f"TCPIP0::127.0.0.1::{port}::SOCKET")
+    assert transport.query("MODE?") == "STANDBY"
+    transport.close()
+
+    with pytest.raises(ValueError):
+        SocketTransport.from_resource_path("MOCK0::mock1::INSTR")
+
+
+def test_in_process_transport():
+    fake = FakeChamber()
+    chamber = EspecPr3j(transport=InProcessTransport(fake.answer, name="fake"))
+
+    chamber.set_target_temperature(25.0)
+
+    assert chamber.get_temperature_status().target_temperature == 25.0
+    assert chamber.resource_path == "INPROCESS::fake"
+
+
+def test_lazy_connect(chamber_server):
+    port, fake = chamber_server
+
+    # nothing listens on this port, but no connection is attempted
+    EspecPr3j(transport=SocketTransport("127.0.0.1", port=1), lazy_connect=True)
+
+    chamber = EspecPr3j(
+        transport=SocketTransport("127.0.0.1", port=port), lazy_connect=True
+    )
+    chamber.connect()
+    assert chamber.get_mode() == OperationMode.STANDBY
+
+    chamber.close()
+
+
+def test_socket_transport_late_response():
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            while line := self.rfile.readline():
+                command = line.decode("ascii").rstrip("\r\n")
+                if command == "MON?":
+                    time.sleep(0.3)
+                self.wfile.write(f"{command} answer\r\n".encode("ascii"))
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    transport = SocketTransport("127.0.0.1", port=server.server_address[1], timeout=100)
+    with pytest.raises(TimeoutError):
+        transport.query("MON?")
+    time.sleep(0.4)
+
+    # the late response to MON? is not taken as the one to MODE?
+    assert transport.query("MODE?") == "MODE? answer"
+
+    transport.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_transport_interface():
+    class Incomplete(Transport):
+        resource_path = "INCOMPLETE"
+
+        def write(self, message):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()  # type: ignore[abstract]
+
+
+def test_visa_transport_reopens_after_timeout():
+    class Resource:
+        def __init__(self, late):
+            self.late = late
+            self.closed = False
+
+        def query(self, message, delay=0.0):
+            if self.late:
+                raise TimeoutError("VI_ERROR_TMO")
+            return f"{message} answer"
+
+        def close(self):
+            self.closed = True
+
+    class ResourceManager:
+        def __init__(self):
+            self.resources = []
+
+        def open_resource(self, resource_path):
+            self.resources.append(Resource(late=not self.resources))
+            return self.resources[-1]
+
+    manager = ResourceManager()
+    transport = VisaTransport("TCPIP0::chamber::57732::SOCKET", manager)
+    with pytest.raises(TimeoutError):
+        transport.query("MON?")
+    assert manager.resources[0].closed
+
+    # the next command does not read from the resource holding the late response
+    assert transport.query("MODE?") == "MODE? answer"
+    assert len(manager.resources) == 2
+    transport.close()
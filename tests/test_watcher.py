@@ -0,0 +1,148 @@
+import time
+
+import pytest
+
+from espec_pr3j import (
+    ChamberSimulator,
+    ChamberWatcher,
+    EspecPr3j,
+    OperationMode,
+    PollScheduler,
+    VirtualClock,
+)
+
+
+@pytest.fixture
+def simulation():
+    clock = VirtualClock()
+    simulator = ChamberSimulator(clock=clock)
+    chamber = EspecPr3j(transport=simulator.transport("sim0"), clock=clock)
+    yield clock, simulator, chamber
+    chamber.close()
+
+
+def run(watcher, clock, duration):
+    end = clock.time() + duration
+    while clock.time() < end:
+        clock.advance(watcher.step())
+
+
+def test_backs_off_at_steady_state(simulation):
+    clock, _, chamber = simulation
+    watcher = ChamberWatcher(chamber, min_interval=1.0, max_interval=30.0)
+
+    run(watcher, clock, 600.0)
+    assert watcher.interval == 30.0
+    # 1 + 2 + 4 + 8 + 16 s, then every 30 s
+    assert watcher.polls < 30
+
+
+def test_calls_back_on_changes(simulation):
+    clock, simulator, chamber = simulation
+    changes = []
+    watcher = ChamberWatcher(chamber, callback=changes.append)
+    chamber.hooks.append(watcher)
+
+    run(watcher, clock, 300.0)
+    assert changes == []
+
+    simulator.number_of_alarms = 2
+    changed = clock.time()
+    while not changes:
+        clock.advance(watcher.step())
+    assert clock.time() - changed <= watcher.max_interval
+    (change,) = changes
+    assert change.alarms_changed and not change.mode_changed
+    assert change.current.number_of_alarms == 2
+    assert watcher.interval == watcher.min_interval
+
+
+def test_fast_after_setting_commands(simulation):
+    clock, _, chamber = simulation
+    changes = []
+    watcher = ChamberWatcher(chamber, callback=changes.append)
+    chamber.hooks.append(watcher)
+
+    run(watcher, clock, 300.0)
+    assert watcher.interval == watcher.max_interval
+
+    chamber.set_target_temperature(60.0)
+    assert watcher.interval == watcher.min_interval
+
+    # MON? responses read by others count as polls
+    polls = watcher.polls
+    chamber.set_mode(OperationMode.CONSTANT)
+    chamber.get_test_area_state()
+    assert watcher.polls == polls
+    assert [change.current.operation_state for change in changes] == [
+        OperationMode.CONSTANT
+    ]
+
+    # polls fast while ramping
+    run(watcher, clock, 60.0)
+    assert watcher.interval < watcher.max_interval
+
+
+def test_runs_on_scheduler(simulation):
+    _, _, chamber = simulation
+    scheduler = PollScheduler(clock=chamber.clock)
+    watcher = ChamberWatcher(chamber, min_interval=10.0, max_interval=60.0)
+    watcher.start(scheduler)
+    assert watcher in chamber.hooks
+
+    # the polls are minutes apart on the virtual clock
+    for _ in range(200):
+        if watcher.polls >= 3:
+            break
+        time.sleep(0.01)
+    watcher.stop()
+    scheduler.shutdown()
+
+    assert watcher.polls >= 3
+    assert watcher not in chamber.hooks
+
+
+def test_single_poll_chain(simulation):
+    _, _, chamber = simulation
+
+    class ManualScheduler:
+        def __init__(self):
+            self.calls = []
+
+        def check_clock(self, clock):
+            pass
+
+        def call_later(self, delay, callback):
+            self.calls.append(callback)
+
+    scheduler = ManualScheduler()
+    watcher = ChamberWatcher(chamber)
+    watcher.start(scheduler)
+    (first,) = scheduler.calls
+    scheduler.calls.clear()
+
+    # a setting command sent while the first poll is in flight
+    step = watcher.step
+
+    def step_with_setting():
+        watcher.before_command(chamber.resource_path, "TEMP, S20.0")
+        return step()
+
+    watcher.step = step_with_setting
+    first()
+    # only the chain started by the setting command is left
+    assert len(scheduler.calls) == 1
+
+    watcher.step = step
+    scheduler.calls.pop()()
+    assert len(scheduler.calls) == 1
+    watcher.stop()
+
+
+def test_rejects_scheduler_on_other_clock(simulation):
+    _, _, chamber = simulation
+    watcher = ChamberWatcher(chamber)
+
+    with pytest.raises(ValueError):
+        watcher.start(PollScheduler.default())
+    assert watcher not in chamber.hooks